@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Mide `cache_resultados` simulando un proceso que resuelve y valida (cuenta
+hasta dos soluciones) una y otra vez los niveles de `niveles.NIVELES` y sus
+variantes rotadas, reflejadas y con los colores intercambiados.
+
+Compara el tiempo total con el de hacer lo mismo sin cache, y muestra cuánto
+tarda una consulta repetida (desde memoria y desde el archivo) y la tasa de
+aciertos.
+
+Uso: python bench_cache.py [--rondas 5]"""
+import argparse
+import os
+import tempfile
+import time
+
+import cache_resultados
+import niveles
+import resolvedor
+import simetrias
+
+CONSULTAS_REPETIDAS = 10000
+
+
+def variantes():
+    """Todas las variantes de todos los niveles, en un orden fijo."""
+    return [
+        simetrias.transformar(desc, simetria)
+        for simetria in simetrias.SIMETRIAS
+        for desc in niveles.NIVELES
+    ]
+
+
+def procesar(resolver, contar, descs):
+    for desc in descs:
+        resolver(desc)
+        contar(desc, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rondas", type=int, default=5)
+    argumentos = parser.parse_args()
+    descs = variantes()
+
+    inicio = time.perf_counter()
+    for _ in range(argumentos.rondas):
+        procesar(resolvedor.resolver, resolvedor.contar_soluciones, descs)
+    sin_cache = time.perf_counter() - inicio
+    print(f"{argumentos.rondas} rondas de {len(descs)} grillas sin cache: {sin_cache * 1000:.1f} ms")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "resultados.sqlite")
+        with cache_resultados.CacheResultados(ruta) as cache:
+            inicio = time.perf_counter()
+            for _ in range(argumentos.rondas):
+                procesar(cache.resolver, cache.contar_soluciones, descs)
+            con_cache = time.perf_counter() - inicio
+            print(
+                f"{argumentos.rondas} rondas de {len(descs)} grillas con cache: {con_cache * 1000:.1f} ms "
+                f"({sin_cache / con_cache:.1f}x)"
+            )
+
+            desc = descs[-1]
+            inicio = time.perf_counter()
+            for _ in range(CONSULTAS_REPETIDAS):
+                cache.contar_soluciones(desc, 2)
+            desde_memoria = (time.perf_counter() - inicio) / CONSULTAS_REPETIDAS
+            inicio = time.perf_counter()
+            for _ in range(CONSULTAS_REPETIDAS):
+                cache.recientes.clear()
+                cache.contar_soluciones(desc, 2)
+            desde_archivo = (time.perf_counter() - inicio) / CONSULTAS_REPETIDAS
+            print(
+                f"consulta repetida: {desde_memoria * 1e6:.1f} µs desde memoria, "
+                f"{desde_archivo * 1e6:.1f} µs desde el archivo"
+            )
+            for nombre, valor in cache.metricas().items():
+                print(f"    {nombre:20} {valor:.3f}" if isinstance(valor, float) else f"    {nombre:20} {valor}")
+
+
+if __name__ == "__main__":
+    main()
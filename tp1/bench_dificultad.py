@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Mide cuántos niveles por segundo califica `dificultad`, sobre niveles
+generados de 6x6 a 14x14, sin la solución (como al calificar niveles ya
+guardados) y con ella (como al calificar mientras se generan), y muestra
+cuántos niveles quedan en cada franja.
+
+Uso: python bench_dificultad.py [--cantidad 200]"""
+import argparse
+import collections
+import random
+import time
+
+import dificultad
+import generador
+
+TAMANIOS = (6, 8, 10, 14)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cantidad", type=int, default=200)
+    argumentos = parser.parse_args()
+    for lado in TAMANIOS:
+        azar = random.Random(lado)
+        generados = [generador.generar_celdas(lado, lado, azar) for _ in range(argumentos.cantidad)]
+
+        inicio = time.perf_counter()
+        calificaciones = [dificultad.calificar_celdas(nivel, lado, lado) for nivel, _ in generados]
+        sin_solucion = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        con_solucion = [
+            dificultad.calificar_celdas(nivel, lado, lado, solucion) for nivel, solucion in generados
+        ]
+        con_solucion_tiempo = time.perf_counter() - inicio
+        assert con_solucion == calificaciones
+
+        franjas = collections.Counter(calificacion.franja for calificacion in calificaciones)
+        puntajes = sorted(calificacion.puntaje for calificacion in calificaciones)
+        print(
+            f"{lado}x{lado}: {len(generados) / sin_solucion:,.0f} niveles/s sin la solución, "
+            f"{len(generados) / con_solucion_tiempo:,.0f} niveles/s con ella; "
+            f"puntaje mediano {puntajes[len(puntajes) // 2]}; "
+            + ", ".join(f"{franja} {franjas[franja]}" for franja in dificultad.FRANJAS)
+        )
+
+
+if __name__ == "__main__":
+    main()
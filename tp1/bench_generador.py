@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Mide cuántos niveles con solución única por segundo genera
+`generador.generar_niveles` para cada tamaño.
+
+Uso: python bench_generador.py [procesos]"""
+import sys
+import time
+
+import generador
+
+# (lado, cantidad de niveles a generar)
+TAMANIOS = ((4, 200), (6, 200), (8, 100), (10, 40), (14, 8))
+
+
+def main():
+    procesos = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    for lado, cantidad in TAMANIOS:
+        inicio = time.perf_counter()
+        generador.generar_niveles(lado, lado, cantidad, procesos=procesos)
+        tiempo = time.perf_counter() - inicio
+        print(f"{lado}x{lado}: {cantidad / tiempo:.1f} niveles/s ({cantidad} en {tiempo:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
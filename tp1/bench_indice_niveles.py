@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Mide `indice_niveles`: cuánto tarda en indexar un paquete de niveles
+generados, en agregarle niveles al paquete y al índice, en cargarse y en
+verificar que está al día, y cuánto tarda elegir un nivel por tamaño y
+franja con el índice frente a calificar niveles del paquete al azar hasta
+dar con uno de la franja.
+
+Uso: python bench_indice_niveles.py [--cantidad 2000] [--agregados 200]"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import dificultad
+import generador
+import indice_niveles
+import paquete_niveles
+
+TAMANIOS = ((6, 6), (8, 8), (10, 10))
+CONSULTAS = 100000
+
+
+def generar(cantidad, azar):
+    return [generador.generar_nivel(*TAMANIOS[i % len(TAMANIOS)], azar) for i in range(cantidad)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cantidad", type=int, default=2000)
+    parser.add_argument("--agregados", type=int, default=200)
+    argumentos = parser.parse_args()
+    azar = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_paquete = os.path.join(carpeta, "niveles.bin")
+        ruta_indice = os.path.join(carpeta, "niveles.idx")
+        paquete_niveles.escribir_paquete(ruta_paquete, generar(argumentos.cantidad, azar))
+
+        inicio = time.perf_counter()
+        indice = indice_niveles.indexar(ruta_paquete, ruta_indice)
+        armado = time.perf_counter() - inicio
+        print(f"índice de {argumentos.cantidad} niveles: {armado:.2f} s ({argumentos.cantidad / armado:,.0f} niveles/s)")
+
+        agregados = generar(argumentos.agregados, azar)
+        inicio = time.perf_counter()
+        indice = indice_niveles.agregar_niveles(ruta_paquete, agregados, ruta_indice)
+        actualizado = time.perf_counter() - inicio
+        print(f"agregado de {argumentos.agregados} niveles con su índice: {actualizado:.2f} s")
+
+        inicio = time.perf_counter()
+        indice = indice_niveles.IndiceNiveles.cargar(ruta_indice)
+        print(
+            f"carga del índice ({os.path.getsize(ruta_indice):,} bytes): "
+            f"{(time.perf_counter() - inicio) * 1000:.2f} ms"
+        )
+        with paquete_niveles.PaqueteNiveles(ruta_paquete) as paquete:
+            inicio = time.perf_counter()
+            assert indice.al_dia(paquete)
+            print(f"verificación de que está al día: {(time.perf_counter() - inicio) * 1000:.2f} ms")
+
+        ancho, alto, franja = max(indice.cubetas, key=lambda cubeta: len(indice.cubetas[cubeta]))
+        inicio = time.perf_counter()
+        for _ in range(CONSULTAS):
+            indice.elegir(azar, ancho, alto, franja)
+        con_indice = (time.perf_counter() - inicio) / CONSULTAS
+
+        with paquete_niveles.PaqueteNiveles(ruta_paquete) as paquete:
+            cantidad = paquete.cantidad(ancho, alto)
+            consultas = 200
+            inicio = time.perf_counter()
+            for _ in range(consultas):
+                while dificultad.calificar(paquete.nivel(ancho, alto, azar.randrange(cantidad))).franja != franja:
+                    pass
+            sin_indice = (time.perf_counter() - inicio) / consultas
+        print(
+            f"elegir un nivel {ancho}x{alto} {franja}: {con_indice * 1e6:.2f} µs con el índice, "
+            f"{sin_indice * 1e6:,.0f} µs calificando al azar ({sin_indice / con_indice:,.0f}x)"
+        )
+        for (ancho, alto, franja), numeros in sorted(indice.cubetas.items()):
+            print(f"    {f'{ancho}x{alto}':6} {franja:12} {len(numeros)}")
+
+
+if __name__ == "__main__":
+    main()
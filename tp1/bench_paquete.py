@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Mide cuánto tarda abrir un paquete de niveles grande y decodificar niveles
+sueltos de él.
+
+Uso: python bench_paquete.py [cantidad de niveles]"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import paquete_niveles
+
+CASILLEROS = " 01"
+
+
+def niveles_sinteticos(cantidad, azar):
+    """Genera `cantidad` niveles de 8x8, repitiendo mil niveles con casilleros
+    al azar (no son niveles jugables; sólo sirven para medir el formato)."""
+    distintos = [
+        ["".join(azar.choice(CASILLEROS) for _ in range(8)) for _ in range(8)]
+        for _ in range(1000)
+    ]
+    for numero in range(cantidad):
+        yield distintos[numero % len(distintos)]
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    azar = random.Random(8)
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "bench.bin")
+
+        inicio = time.perf_counter()
+        paquete_niveles.escribir_paquete(ruta, niveles_sinteticos(cantidad, azar))
+        print(f"Escritura de {cantidad} niveles: {time.perf_counter() - inicio:.2f} s, "
+              f"{os.path.getsize(ruta) / 1e6:.1f} MB")
+
+        inicio = time.perf_counter()
+        paquete = paquete_niveles.PaqueteNiveles(ruta)
+        print(f"Apertura: {(time.perf_counter() - inicio) * 1e6:.1f} µs")
+
+        lecturas = 100_000
+        inicio = time.perf_counter()
+        for _ in range(lecturas):
+            paquete.nivel_al_azar(azar)
+        tiempo = time.perf_counter() - inicio
+        print(f"Decodificación de un nivel al azar: {tiempo / lecturas * 1e6:.2f} µs")
+        paquete.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Compara guardar y cargar partidas con `partida` contra guardar la grilla
+(lista de listas) como JSON, en grillas de 20x20 a 1000x1000.
+
+Uso: python bench_partida.py"""
+import json
+import os
+import random
+import tempfile
+import time
+
+import partida
+import unruly
+
+TAMANIOS = (20, 100, 500, 1000)
+RONDAS = 5
+
+
+def mejor_tiempo(funcion):
+    """Devuelve el menor tiempo de RONDAS ejecuciones de `funcion`."""
+    mejor = None
+    for _ in range(RONDAS):
+        inicio = time.perf_counter()
+        funcion()
+        tiempo = time.perf_counter() - inicio
+        mejor = tiempo if mejor is None else min(mejor, tiempo)
+    return mejor
+
+
+def guardar_json(ruta, grilla):
+    with open(ruta, "w") as archivo:
+        json.dump(grilla, archivo)
+
+
+def cargar_json(ruta):
+    with open(ruta) as archivo:
+        return json.load(archivo)
+
+
+def main():
+    azar = random.Random(0)
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_binaria = os.path.join(carpeta, "partida.bin")
+        ruta_json = os.path.join(carpeta, "partida.json")
+        for lado in TAMANIOS:
+            desc = [
+                "".join(azar.choice((unruly.UNO, unruly.CERO, unruly.VACIO)) for _ in range(lado))
+                for _ in range(lado)
+            ]
+            grilla = unruly.crear_grilla(desc)
+            guardar = mejor_tiempo(lambda: partida.guardar_partida(ruta_binaria, grilla, 7, 123))
+            cargar = mejor_tiempo(lambda: partida.cargar_partida(ruta_binaria))
+            assert partida.cargar_partida(ruta_binaria) == (grilla, 7, 123)
+            guardar_j = mejor_tiempo(lambda: guardar_json(ruta_json, grilla))
+            cargar_j = mejor_tiempo(lambda: cargar_json(ruta_json))
+            print(
+                f"{lado}x{lado}: partida guardar {guardar * 1000:.2f} ms, "
+                f"cargar {cargar * 1000:.2f} ms, {os.path.getsize(ruta_binaria):,} bytes | "
+                f"JSON guardar {guardar_j * 1000:.2f} ms, cargar {cargar_j * 1000:.2f} ms, "
+                f"{os.path.getsize(ruta_json):,} bytes"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Mide el tiempo de `resolvedor.resolver` sobre los niveles de
+`niveles.NIVELES` y sobre grillas grandes, y el de
+`resolvedor.contar_soluciones` sobre niveles generados por `generador` de
+6x6 a 14x14 (con la densidad de pistas de los niveles reales) y sobre
+grillas vacías.
+
+Uso: python bench_resolvedor.py"""
+import random
+import time
+
+import generador
+import niveles
+import resolvedor
+import unruly
+
+CONTEOS_POR_TAMANIO = 5
+
+
+def medir(desc):
+    """Resuelve `desc` y devuelve (tiempo en segundos, solución)."""
+    inicio = time.perf_counter()
+    solucion = resolvedor.resolver(desc)
+    return time.perf_counter() - inicio, solucion
+
+
+def con_pistas(solucion, proporcion, semilla):
+    """Devuelve la descripción de un tablero que conserva una `proporcion`
+    de los casilleros de `solucion`, elegidos con la semilla dada."""
+    azar = random.Random(semilla)
+    return [
+        "".join(c if azar.random() < proporcion else unruly.VACIO for c in fila)
+        for fila in solucion
+    ]
+
+
+def medir_conteo():
+    """Cuenta las soluciones de niveles generados de 6x6 a 14x14, con y sin
+    límite, y verifica la unicidad de grillas vacías (las más difíciles de
+    contar) cuadradas y muy altas."""
+    for lado in range(6, 16, 2):
+        azar = random.Random(lado)
+        descs = [generador.generar_nivel(lado, lado, azar) for _ in range(CONTEOS_POR_TAMANIO)]
+        pistas = sum(lado * lado - "".join(desc).count(unruly.VACIO) for desc in descs)
+        totales = []
+        unicidades = []
+        for desc in descs:
+            inicio = time.perf_counter()
+            assert resolvedor.contar_soluciones(desc) == 1
+            totales.append(time.perf_counter() - inicio)
+            inicio = time.perf_counter()
+            assert resolvedor.contar_soluciones(desc, limite=2) == 1
+            unicidades.append(time.perf_counter() - inicio)
+        print(
+            f"contar_soluciones {lado}x{lado} ({pistas / (lado * lado * len(descs)):.0%} de pistas): "
+            f"sin límite promedio {sum(totales) / len(totales) * 1000:.1f} ms "
+            f"(máximo {max(totales) * 1000:.1f} ms), unicidad (limite=2) promedio "
+            f"{sum(unicidades) / len(unicidades) * 1000:.1f} ms (máximo {max(unicidades) * 1000:.1f} ms)"
+        )
+    for ancho, alto in ((14, 14), (30, 30), (4, 100), (4, 400)):
+        inicio = time.perf_counter()
+        assert resolvedor.contar_soluciones([unruly.VACIO * ancho] * alto, limite=2) == 2
+        print(f"unicidad de {ancho}x{alto} vacía: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+
+def main():
+    tiempos = []
+    for desc in niveles.NIVELES:
+        tiempo, solucion = medir(desc)
+        assert solucion is not None and unruly.grilla_terminada(solucion)
+        tiempos.append(tiempo)
+    print(
+        f"niveles.NIVELES ({len(tiempos)} niveles): "
+        f"promedio {sum(tiempos) / len(tiempos) * 1000:.2f} ms, "
+        f"máximo {max(tiempos) * 1000:.2f} ms"
+    )
+
+    for lado in (10, 20, 30):
+        tiempo, solucion = medir([unruly.VACIO * lado] * lado)
+        assert unruly.grilla_terminada(solucion)
+        print(f"{lado}x{lado} vacía: {tiempo * 1000:.1f} ms")
+        for proporcion in (0.2, 0.4):
+            desc = con_pistas(solucion, proporcion, lado)
+            tiempo, resuelta = medir(desc)
+            assert unruly.grilla_terminada(resuelta)
+            print(f"{lado}x{lado} con {proporcion:.0%} de pistas: {tiempo * 1000:.1f} ms")
+
+    medir_conteo()
+
+
+if __name__ == "__main__":
+    main()
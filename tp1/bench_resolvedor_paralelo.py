@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Mide la aceleración de `resolvedor_paralelo` según la cantidad de
+procesos, sobre un conjunto fijo de tableros de 30x30 a 50x50 (soluciones
+de tableros vacíos con una proporción de pistas, como en
+`bench_resolvedor`).
+
+Para cada cantidad de procesos muestra el tiempo total de resolver todos los
+tableros (y de buscar dos soluciones en los de unicidad) y la aceleración
+respecto de la primera cantidad medida (por defecto, un proceso).
+
+Uso: python bench_resolvedor_paralelo.py [--procesos 1 2 4 8]"""
+import argparse
+import multiprocessing
+import time
+
+import resolvedor
+import resolvedor_paralelo
+import unruly
+from bench_resolvedor import con_pistas
+
+# (lado, proporción de pistas) de los tableros a resolver y de aquellos en
+# los que se buscan dos soluciones
+RESOLVER = ((40, 0.2), (40, 0.3), (50, 0.2), (50, 0.3))
+UNICIDAD = ((30, 0.3), (30, 0.4))
+
+
+def tableros(especificaciones):
+    for lado, proporcion in especificaciones:
+        solucion = resolvedor.resolver([unruly.VACIO * lado] * lado)
+        yield f"{lado}x{lado} con {proporcion:.0%}", con_pistas(solucion, proporcion, lado)
+
+
+def main():
+    cantidad_nucleos = multiprocessing.cpu_count()
+    potencias = [1 << i for i in range(cantidad_nucleos.bit_length()) if 1 << i <= cantidad_nucleos]
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procesos", type=int, nargs="+", default=sorted({*potencias, cantidad_nucleos}))
+    argumentos = parser.parse_args()
+
+    a_resolver = list(tableros(RESOLVER))
+    de_unicidad = list(tableros(UNICIDAD))
+    print(f"{cantidad_nucleos} núcleos")
+    base = None
+    for procesos in argumentos.procesos:
+        total = 0.0
+        for nombre, desc in a_resolver:
+            inicio = time.perf_counter()
+            solucion = resolvedor_paralelo.resolver(desc, procesos)
+            tiempo = time.perf_counter() - inicio
+            assert unruly.grilla_terminada(solucion)
+            total += tiempo
+            print(f"    {procesos} procesos, resolver {nombre}: {tiempo * 1000:.0f} ms")
+        for nombre, desc in de_unicidad:
+            inicio = time.perf_counter()
+            encontradas = resolvedor_paralelo.soluciones(desc, 2, procesos)
+            tiempo = time.perf_counter() - inicio
+            total += tiempo
+            print(f"    {procesos} procesos, unicidad {nombre} ({len(encontradas)} soluciones): {tiempo * 1000:.0f} ms")
+        base = base or total
+        print(f"{procesos} procesos: {total:.2f} s, aceleración {base / total:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Prueba de carga de `servidor`: abre muchos clientes a la vez, cada uno
+hace jugadas al azar, y muestra los percentiles de la latencia de cada
+jugada (desde que se envía hasta que llega la respuesta).
+
+Si no se indica un puerto, levanta el servidor en otro proceso en un puerto
+libre de localhost, con a lo sumo `--maximo-en-memoria` sesiones en memoria.
+Al final muestra las métricas del almacén de sesiones del servidor.
+
+Uso:
+    python bench_servidor.py [--clientes 2000] [--jugadas 20]
+                             [--host 127.0.0.1] [--puerto 8765]
+                             [--maximo-en-memoria 10000]
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+import servidor
+import sesiones
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def percentil(ordenados, p):
+    """Devuelve el percentil `p` de una lista ordenada."""
+    indice = min(len(ordenados) - 1, int(len(ordenados) * p / 100))
+    return ordenados[indice]
+
+
+async def cliente(host, puerto, jugadas, azar, latencias, listos, empezar):
+    """Se conecta, espera a que estén todos conectados y hace `jugadas`
+    jugadas al azar, agregando la latencia de cada una a `latencias`."""
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    estado = json.loads(await lector.readline())
+    listos.append(estado["sesion"])
+    await empezar.wait()
+    for _ in range(jugadas):
+        pedido = {
+            "accion": "jugar",
+            "col": azar.randrange(estado["ancho"]),
+            "fil": azar.randrange(estado["alto"]),
+            "valor": azar.choice(servidor.VALORES),
+        }
+        inicio = time.perf_counter()
+        escritor.write(json.dumps(pedido).encode() + b"\n")
+        respuesta = json.loads(await lector.readline())
+        latencias.append(time.perf_counter() - inicio)
+        assert respuesta["ok"], respuesta
+    escritor.close()
+    await escritor.wait_closed()
+
+
+async def cargar(host, puerto, clientes, jugadas):
+    latencias = []
+    listos = []
+    empezar = asyncio.Event()
+    azar = random.Random(0)
+    tareas = [
+        asyncio.create_task(
+            cliente(host, puerto, jugadas, random.Random(azar.random()), latencias, listos, empezar)
+        )
+        for _ in range(clientes)
+    ]
+    while len(listos) < clientes:
+        await asyncio.sleep(0.01)
+    print(f"{clientes} clientes conectados")
+    inicio = time.perf_counter()
+    empezar.set()
+    await asyncio.gather(*tareas)
+    total = time.perf_counter() - inicio
+
+    latencias.sort()
+    print(f"{len(latencias)} jugadas en {total:.2f} s: {len(latencias) / total:,.0f} jugadas/s")
+    for p in PERCENTILES:
+        print(f"    p{p:<5} {percentil(latencias, p) * 1000:8.2f} ms")
+    print(f"    máximo {latencias[-1] * 1000:8.2f} ms")
+
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    await lector.readline()
+    escritor.write(b'{"accion": "metricas"}\n')
+    metricas = json.loads(await lector.readline())["metricas"]
+    escritor.close()
+    print("Almacén de sesiones del servidor:")
+    for nombre, valor in metricas.items():
+        if nombre.startswith("carga_"):
+            print(f"    {nombre:18} {valor * 1000:8.2f} ms")
+        else:
+            print(f"    {nombre:18} {valor:8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clientes", type=int, default=2000)
+    parser.add_argument("--jugadas", type=int, default=20)
+    parser.add_argument("--host", default=servidor.HOST)
+    parser.add_argument("--puerto", type=int)
+    parser.add_argument("--maximo-en-memoria", type=int, default=sesiones.MAXIMO_EN_MEMORIA)
+    argumentos = parser.parse_args()
+
+    proceso = None
+    puerto = argumentos.puerto
+    if puerto is None:
+        proceso = subprocess.Popen(
+            [
+                sys.executable, "servidor.py", "--host", argumentos.host, "--puerto", "0",
+                "--maximo-en-memoria", str(argumentos.maximo_en_memoria),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        puerto = int(proceso.stdout.readline().rsplit(":", 1)[1])
+    try:
+        asyncio.run(cargar(argumentos.host, puerto, argumentos.clientes, argumentos.jugadas))
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks de las funciones de `unruly` sobre grillas de 4x4 a 1000x1000.
+
+Para cada representación y tamaño mide las operaciones por segundo de
+`crear_grilla`, `posicion_*`, `cambiar_a_*`, `fila_es_valida`,
+`columna_es_valida` y `grilla_terminada`, y la memoria que ocupa la grilla
+(según `tracemalloc`). Los resultados se guardan en un archivo JSON que se
+puede comparar con el de una corrida anterior.
+
+Uso:
+    python bench_unruly.py [--salida bench.json] [--comparar anterior.json]
+                           [--tolerancia 0.2] [--tamanios 4x4,8x8,...]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import unruly
+
+TAMANIOS = (
+    (4, 4), (8, 8), (16, 16), (64, 64), (200, 200), (1000, 1000),
+    (8, 4), (64, 16), (1000, 200), (16, 1000), (64, 4000),
+)
+REPRESENTACIONES = (unruly.LISTAS, unruly.INCREMENTAL, unruly.BITS, unruly.COLUMNAS)
+# Tiempo mínimo que se repite cada medición, en segundos, y cantidad de
+# veces que se hace cada medición (se queda la mejor, la menos afectada por
+# otros procesos)
+TIEMPO_MINIMO = 0.1
+RONDAS = 3
+
+
+def grilla_terminada_de(ancho, alto):
+    """Devuelve la descripción de una grilla terminada de `ancho` x `alto`
+    (ambos múltiplos de 4), para que las validaciones recorran todo."""
+    a = "01" * (ancho // 2)
+    b = "10" * (ancho // 2)
+    return [(a, b, b, a)[fil % 4] for fil in range(alto)]
+
+
+def ops_por_segundo(funcion):
+    """Busca cuántas repeticiones de `funcion` superan TIEMPO_MINIMO, las
+    mide RONDAS veces y devuelve la mayor cantidad de ejecuciones por
+    segundo obtenida."""
+    repeticiones = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        tiempo = time.perf_counter() - inicio
+        if tiempo >= TIEMPO_MINIMO:
+            break
+        repeticiones *= 2 if tiempo == 0 else max(2, int(TIEMPO_MINIMO / tiempo * 1.2))
+    mejor = repeticiones / tiempo
+    for _ in range(RONDAS - 1):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        mejor = max(mejor, repeticiones / (time.perf_counter() - inicio))
+    return mejor
+
+
+def medir(ancho, alto, representacion):
+    """Devuelve un diccionario {nombre de la medición: valor} para un tamaño
+    y una representación."""
+    desc = grilla_terminada_de(ancho, alto)
+    tracemalloc.start()
+    grilla = unruly.crear_grilla(desc, representacion)
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    col, fil = ancho // 2, alto // 2
+    valor = desc[fil][col]
+
+    def cambiar():
+        unruly.cambiar_a_vacio(grilla, col, fil)
+        if valor == unruly.UNO:
+            unruly.cambiar_a_uno(grilla, col, fil)
+        else:
+            unruly.cambiar_a_cero(grilla, col, fil)
+
+    return {
+        "memoria_bytes": memoria,
+        "crear_grilla": ops_por_segundo(lambda: unruly.crear_grilla(desc, representacion)),
+        "posicion_es_vacia": ops_por_segundo(lambda: unruly.posicion_es_vacia(grilla, col, fil)),
+        "posicion_hay_uno": ops_por_segundo(lambda: unruly.posicion_hay_uno(grilla, col, fil)),
+        "posicion_hay_cero": ops_por_segundo(lambda: unruly.posicion_hay_cero(grilla, col, fil)),
+        "cambiar_a_vacio+valor": ops_por_segundo(cambiar),
+        "fila_es_valida": ops_por_segundo(lambda: unruly.fila_es_valida(grilla, fil)),
+        "columna_es_valida": ops_por_segundo(lambda: unruly.columna_es_valida(grilla, col)),
+        "grilla_terminada": ops_por_segundo(lambda: unruly.grilla_terminada(grilla)),
+    }
+
+
+def comparar(actuales, anteriores, tolerancia):
+    """Devuelve una lista de mensajes con las mediciones que empeoraron más
+    que `tolerancia` (proporción) respecto de la corrida anterior."""
+    regresiones = []
+    for clave, mediciones in actuales.items():
+        for nombre, valor in mediciones.items():
+            anterior = anteriores.get(clave, {}).get(nombre)
+            if not anterior:
+                continue
+            if nombre == "memoria_bytes":
+                empeoro = valor > anterior * (1 + tolerancia)
+            else:
+                empeoro = valor < anterior * (1 - tolerancia)
+            if empeoro:
+                regresiones.append(f"{clave} {nombre}: {anterior:.0f} -> {valor:.0f}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--salida", default="bench_unruly.json")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    parser.add_argument("--tamanios", help="por ejemplo 4x4,8x4")
+    parser.add_argument("--representaciones", default=",".join(REPRESENTACIONES))
+    argumentos = parser.parse_args()
+
+    tamanios = TAMANIOS
+    if argumentos.tamanios:
+        tamanios = [tuple(int(n) for n in t.split("x")) for t in argumentos.tamanios.split(",")]
+
+    resultados = {}
+    for representacion in argumentos.representaciones.split(","):
+        for ancho, alto in tamanios:
+            clave = f"{representacion} {ancho}x{alto}"
+            resultados[clave] = medir(ancho, alto, representacion)
+            print(clave)
+            for nombre, valor in resultados[clave].items():
+                unidad = "bytes" if nombre == "memoria_bytes" else "ops/s"
+                print(f"    {nombre:24} {valor:14,.0f} {unidad}")
+
+    with open(argumentos.salida, "w") as archivo:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+                "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "resultados": resultados,
+            },
+            archivo,
+            indent=2,
+        )
+    print(f"Resultados guardados en {argumentos.salida}")
+
+    if argumentos.comparar:
+        with open(argumentos.comparar) as archivo:
+            anteriores = json.load(archivo)["resultados"]
+        regresiones = comparar(resultados, anteriores, argumentos.tolerancia)
+        for regresion in regresiones:
+            print(f"REGRESIÓN {regresion}")
+        if regresiones:
+            sys.exit(1)
+        print("Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
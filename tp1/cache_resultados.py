@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""Cache persistente de los resultados de `resolvedor`.
+
+Guarda en un archivo SQLite la solución (o la falta de solución) y la
+cantidad de soluciones de cada grilla, con la clave de su forma canónica
+(ver `simetrias`): una grilla rotada, reflejada o con los unos y ceros
+intercambiados usa el resultado de la original, y su solución se
+transforma de vuelta.
+
+El archivo no pasa de `tamanio_maximo` bytes de resultados: cuando se
+llena, se borran las entradas usadas hace más tiempo. Las últimas entradas
+usadas y las formas canónicas de las últimas grillas consultadas se
+mantienen también en memoria, así que repetir una consulta no toca el disco
+ni recalcula la forma canónica.
+
+`metricas` informa la cantidad de consultas y la tasa de aciertos."""
+import collections
+import sqlite3
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import paquete_niveles
+import resolvedor
+import simetrias
+import unruly
+from unruly import Grilla
+
+TAMANIO_MAXIMO = 64 * 1024 * 1024
+# Entradas y formas canónicas que se mantienen en memoria
+EN_MEMORIA = 4096
+# Al llenarse, se borran entradas hasta ocupar esta fracción del máximo
+FRACCION_TRAS_DESALOJO = 0.9
+# Bytes que se le suman a cada entrada por la clave y las demás columnas
+BYTES_POR_ENTRADA = 48
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resultados (
+    clave BLOB PRIMARY KEY,
+    ancho INTEGER NOT NULL,
+    alto INTEGER NOT NULL,
+    resuelta INTEGER NOT NULL DEFAULT 0,
+    solucion BLOB,
+    soluciones INTEGER,
+    es_cota INTEGER NOT NULL DEFAULT 0,
+    tamanio INTEGER NOT NULL,
+    uso INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS resultados_por_uso ON resultados (uso);
+"""
+_COLUMNAS = "ancho, alto, resuelta, solucion, soluciones, es_cota"
+
+
+class Entrada:
+    """Resultados conocidos de una forma canónica. `solucion` sólo tiene
+    sentido si `resuelta`; `soluciones` es la cantidad de soluciones, o una
+    cota inferior si `es_cota` (porque se contó con un límite)."""
+
+    __slots__ = ("ancho", "alto", "resuelta", "solucion", "soluciones", "es_cota", "_filas")
+
+    def __init__(self, ancho, alto, resuelta=False, solucion=None, soluciones=None, es_cota=False):
+        self.ancho = ancho
+        self.alto = alto
+        self.resuelta = bool(resuelta)
+        self.solucion = solucion
+        self.soluciones = soluciones
+        self.es_cota = bool(es_cota)
+        self._filas = None
+
+    def tamanio(self) -> int:
+        return BYTES_POR_ENTRADA + (len(self.solucion) if self.solucion else 0)
+
+    def anotar_solucion(self, solucion: Optional[Grilla]):
+        """Anota la solución obtenida por `resolvedor.resolver` (o None si no
+        tiene), codificada a 2 bits por casillero."""
+        self.resuelta = True
+        self.solucion = self._filas = None
+        if solucion is not None:
+            self._filas = ["".join(fila) for fila in solucion]
+            self.solucion = paquete_niveles.codificar_casilleros("".join(self._filas).encode("ascii"))
+
+    def filas_solucion(self) -> List[str]:
+        """Devuelve las filas de la solución (que no debe ser None),
+        decodificándolas sólo la primera vez."""
+        if self._filas is None:
+            cantidad = self.ancho * self.alto
+            texto = paquete_niveles.decodificar_casilleros(self.solucion, cantidad).decode("ascii")
+            self._filas = [texto[fil * self.ancho:(fil + 1) * self.ancho] for fil in range(self.alto)]
+        return self._filas
+
+
+@lru_cache(maxsize=EN_MEMORIA)
+def _forma_canonica(desc: Tuple[str, ...]) -> Tuple[bytes, simetrias.Simetria, List[str]]:
+    forma = simetrias.forma_canonica(desc)
+    return simetrias.clave_de_forma(forma), forma.simetria, forma.descripcion()
+
+
+def _descripcion(grilla: Grilla) -> Tuple[str, ...]:
+    _ancho, alto = unruly.dimensiones(grilla)
+    return tuple("".join(grilla[fil]) for fil in range(alto))
+
+
+class CacheResultados:
+    """Cache de resultados en el archivo SQLite `ruta` (se crea si no
+    existe). Se puede usar como administrador de contexto."""
+
+    def __init__(self, ruta: str, tamanio_maximo: int = TAMANIO_MAXIMO):
+        self.tamanio_maximo = tamanio_maximo
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.executescript(_ESQUEMA)
+        ocupado, uso = self.conexion.execute(
+            "SELECT COALESCE(SUM(tamanio), 0), COALESCE(MAX(uso), 0) FROM resultados"
+        ).fetchone()
+        self.ocupado = ocupado
+        self.uso = uso
+        # Clave -> Entrada, de la usada hace más tiempo a la más reciente
+        self.recientes = collections.OrderedDict()
+        # Clave -> último uso, de las entradas usadas desde memoria que
+        # todavía no se anotaron en el archivo
+        self.usos_pendientes: Dict[bytes, int] = {}
+        self.consultas = 0
+        self.aciertos = 0
+        self.aciertos_en_memoria = 0
+        self.desalojos = 0
+        if self.ocupado > self.tamanio_maximo:
+            self._desalojar()
+            self.conexion.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_excepcion):
+        self.cerrar()
+
+    def _buscar(self, clave: bytes) -> Optional[Entrada]:
+        self.uso += 1
+        entrada = self.recientes.get(clave)
+        if entrada is not None:
+            self.recientes.move_to_end(clave)
+            self.usos_pendientes[clave] = self.uso
+            return entrada
+        fila = self.conexion.execute(
+            f"SELECT {_COLUMNAS} FROM resultados WHERE clave = ?", (clave,)
+        ).fetchone()
+        if fila is None:
+            return None
+        entrada = Entrada(*fila)
+        self.conexion.execute("UPDATE resultados SET uso = ? WHERE clave = ?", (self.uso, clave))
+        self._recordar(clave, entrada)
+        return entrada
+
+    def _recordar(self, clave: bytes, entrada: Entrada):
+        self.recientes[clave] = entrada
+        self.recientes.move_to_end(clave)
+        if len(self.recientes) > EN_MEMORIA:
+            self.recientes.popitem(last=False)
+
+    def _contar_consulta(self, acierto: bool, en_memoria: bool):
+        self.consultas += 1
+        if acierto:
+            self.aciertos += 1
+            self.aciertos_en_memoria += en_memoria
+
+    def _guardar(self, clave: bytes, entrada: Entrada):
+        self.uso += 1
+        anterior = self.conexion.execute(
+            "SELECT tamanio FROM resultados WHERE clave = ?", (clave,)
+        ).fetchone()
+        if anterior is not None:
+            self.ocupado -= anterior[0]
+        tamanio = entrada.tamanio()
+        self.conexion.execute(
+            f"INSERT OR REPLACE INTO resultados (clave, {_COLUMNAS}, tamanio, uso) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                clave, entrada.ancho, entrada.alto, entrada.resuelta, entrada.solucion,
+                entrada.soluciones, entrada.es_cota, tamanio, self.uso,
+            ),
+        )
+        self.usos_pendientes.pop(clave, None)
+        self.ocupado += tamanio
+        self._recordar(clave, entrada)
+        if self.ocupado > self.tamanio_maximo:
+            self._desalojar()
+        self.conexion.commit()
+
+    def _anotar_usos(self):
+        if self.usos_pendientes:
+            self.conexion.executemany(
+                "UPDATE resultados SET uso = ? WHERE clave = ?",
+                [(uso, clave) for clave, uso in self.usos_pendientes.items()],
+            )
+            self.usos_pendientes.clear()
+
+    def _desalojar(self):
+        """Borra las entradas usadas hace más tiempo hasta ocupar
+        FRACCION_TRAS_DESALOJO del tamaño máximo."""
+        self._anotar_usos()
+        objetivo = self.tamanio_maximo * FRACCION_TRAS_DESALOJO
+        cursor = self.conexion.execute("SELECT clave, tamanio FROM resultados ORDER BY uso")
+        borradas = []
+        for clave, tamanio in cursor:
+            if self.ocupado <= objetivo:
+                break
+            borradas.append((clave,))
+            self.ocupado -= tamanio
+        cursor.close()
+        self.conexion.executemany("DELETE FROM resultados WHERE clave = ?", borradas)
+        for (clave,) in borradas:
+            self.recientes.pop(clave, None)
+        self.desalojos += len(borradas)
+
+    def _consultar(self, grilla: Grilla):
+        """Devuelve la clave de la grilla, la simetría que la lleva a su
+        forma canónica, la forma canónica, la entrada de la cache (o None) y
+        si la entrada estaba en memoria."""
+        clave, simetria, canonica = _forma_canonica(_descripcion(grilla))
+        en_memoria = clave in self.recientes
+        return clave, simetria, canonica, self._buscar(clave), en_memoria
+
+    def resolver(self, grilla: Grilla) -> Optional[Grilla]:
+        """Como `resolvedor.resolver`, usando la cache."""
+        clave, simetria, canonica, entrada, en_memoria = self._consultar(grilla)
+        acierto = entrada is not None and entrada.resuelta
+        self._contar_consulta(acierto, en_memoria)
+        if not acierto:
+            solucion = resolvedor.resolver(canonica)
+            if entrada is None:
+                entrada = Entrada(len(canonica[0]), len(canonica))
+            entrada.anotar_solucion(solucion)
+            self._guardar(clave, entrada)
+        if entrada.solucion is None:
+            return None
+        return [list(fila) for fila in simetrias.destransformar(entrada.filas_solucion(), simetria)]
+
+    def contar_soluciones(self, grilla: Grilla, limite: Optional[int] = None) -> int:
+        """Como `resolvedor.contar_soluciones`, usando la cache. Una cuenta
+        hecha con límite sirve para consultas con un límite igual o menor."""
+        clave, _simetria, canonica, entrada, en_memoria = self._consultar(grilla)
+        if entrada is not None and entrada.soluciones is not None:
+            if not entrada.es_cota:
+                self._contar_consulta(True, en_memoria)
+                return entrada.soluciones if limite is None else min(entrada.soluciones, limite)
+            if limite is not None and limite <= entrada.soluciones:
+                self._contar_consulta(True, en_memoria)
+                return limite
+        self._contar_consulta(False, en_memoria)
+        cantidad = resolvedor.contar_soluciones(canonica, limite)
+        if entrada is None:
+            entrada = Entrada(len(canonica[0]), len(canonica))
+        entrada.soluciones = cantidad
+        entrada.es_cota = limite is not None and cantidad >= limite
+        self._guardar(clave, entrada)
+        return cantidad
+
+    def metricas(self) -> Dict[str, float]:
+        """Devuelve la cantidad de consultas y de aciertos (en total y sin
+        leer el archivo), la tasa de aciertos y el estado del archivo."""
+        entradas = self.conexion.execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+        return {
+            "consultas": self.consultas,
+            "aciertos": self.aciertos,
+            "aciertos_en_memoria": self.aciertos_en_memoria,
+            "tasa_de_aciertos": self.aciertos / self.consultas if self.consultas else 0.0,
+            "entradas": entradas,
+            "bytes": self.ocupado,
+            "tamanio_maximo": self.tamanio_maximo,
+            "desalojos": self.desalojos,
+        }
+
+    def cerrar(self):
+        """Anota en el archivo los usos pendientes y lo cierra."""
+        self._anotar_usos()
+        self.conexion.commit()
+        self.conexion.close()
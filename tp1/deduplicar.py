@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""Elimina grillas repetidas de un flujo de grillas, considerando iguales las
+que son rotaciones, reflexiones o intercambios de colores unas de otras.
+
+Lee una grilla por línea, como arreglo JSON de filas (el formato de
+`unruly.crear_grilla`), y escribe cada una la primera vez que aparece ella o
+alguna equivalente, sin cambiarla. Para cada grilla se calcula la clave de su
+forma canónica (ver `simetrias.clave_canonica`) y se la busca en un
+`ConjuntoClaves`, que guarda en memoria hasta `maximo_en_memoria` claves y
+baja las demás a disco, así que el flujo puede tener decenas de millones de
+grillas sin cargarlo entero.
+
+Uso: python deduplicar.py [entrada.jsonl] [salida.jsonl]
+                          [--maximo-en-memoria 1000000] [--carpeta DIR]
+(sin archivos, se lee de la entrada estándar y se escribe en la salida
+estándar; al final se informa en la salida de errores cuántas grillas se
+leyeron y cuántas se descartaron)."""
+import argparse
+import bisect
+import heapq
+import json
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Optional, TextIO
+
+import simetrias
+import unruly
+
+LARGO_CLAVE = simetrias.LARGO_CLAVE
+MAXIMO_EN_MEMORIA = 1_000_000
+# Cantidad de tramos en disco a partir de la cual se funden en uno solo
+MAXIMO_TRAMOS = 8
+# Bits del filtro de Bloom por clave en disco, y posiciones por clave (con
+# estos valores, una clave nueva se busca en disco sin necesidad una de
+# cada 400 veces)
+BITS_POR_CLAVE = 16
+POSICIONES_POR_CLAVE = 4
+# Claves que se leen de una vez al recorrer un tramo
+CLAVES_POR_LECTURA = 4096
+
+_MASCARA_64 = (1 << 64) - 1
+_CASILLEROS = frozenset(unruly.UNO + unruly.CERO + unruly.VACIO)
+
+
+class _FiltroBloom:
+    """Filtro de Bloom para `capacidad` claves. Como las claves ya son
+    hashes, las posiciones salen de sus propios bits."""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self.bits = max(64, capacidad * BITS_POR_CLAVE)
+        self.arreglo = bytearray((self.bits + 7) // 8)
+
+    def _posiciones(self, clave: bytes) -> Iterator[int]:
+        numero = int.from_bytes(clave, "little")
+        base, paso = numero & _MASCARA_64, (numero >> 64) | 1
+        return ((base + i * paso) % self.bits for i in range(POSICIONES_POR_CLAVE))
+
+    def agregar(self, clave: bytes):
+        for posicion in self._posiciones(clave):
+            self.arreglo[posicion >> 3] |= 1 << (posicion & 7)
+
+    def __contains__(self, clave: bytes) -> bool:
+        return all(self.arreglo[posicion >> 3] >> (posicion & 7) & 1 for posicion in self._posiciones(clave))
+
+
+class _Tramo:
+    """Archivo de claves ordenadas, que se busca por bisección sobre un
+    `mmap`."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.archivo = open(ruta, "rb")
+        self.mapa = mmap.mmap(self.archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self.cantidad = len(self.mapa) // LARGO_CLAVE
+
+    @classmethod
+    def escribir(cls, ruta: str, claves: Iterable[bytes]) -> "_Tramo":
+        """Escribe las claves (ya ordenadas) en `ruta` y abre el tramo."""
+        with open(ruta, "wb") as archivo:
+            lote = []
+            for clave in claves:
+                lote.append(clave)
+                if len(lote) == CLAVES_POR_LECTURA:
+                    archivo.write(b"".join(lote))
+                    lote.clear()
+            archivo.write(b"".join(lote))
+        return cls(ruta)
+
+    def __len__(self) -> int:
+        return self.cantidad
+
+    def __getitem__(self, indice: int) -> bytes:
+        return self.mapa[indice * LARGO_CLAVE:(indice + 1) * LARGO_CLAVE]
+
+    def __contains__(self, clave: bytes) -> bool:
+        indice = bisect.bisect_left(self, clave)
+        return indice < self.cantidad and self[indice] == clave
+
+    def __iter__(self) -> Iterator[bytes]:
+        for inicio in range(0, self.cantidad, CLAVES_POR_LECTURA):
+            bloque = self.mapa[inicio * LARGO_CLAVE:(inicio + CLAVES_POR_LECTURA) * LARGO_CLAVE]
+            for posicion in range(0, len(bloque), LARGO_CLAVE):
+                yield bloque[posicion:posicion + LARGO_CLAVE]
+
+    def borrar(self):
+        self.mapa.close()
+        self.archivo.close()
+        os.remove(self.ruta)
+
+
+class ConjuntoClaves:
+    """Conjunto de claves de LARGO_CLAVE bytes. Guarda hasta
+    `maximo_en_memoria` en un `set`; al llenarse, las baja ordenadas a un
+    tramo en `carpeta` (por defecto, una carpeta temporal que se borra con
+    `cerrar`). Cuando hay más de MAXIMO_TRAMOS tramos se funden en uno.
+
+    Un filtro de Bloom de todas las claves en disco evita buscar en los
+    tramos casi todas las claves que no están, que en un flujo con pocas
+    repeticiones son la mayoría."""
+
+    def __init__(self, maximo_en_memoria: int = MAXIMO_EN_MEMORIA, carpeta: Optional[str] = None):
+        self.maximo_en_memoria = maximo_en_memoria
+        if carpeta is not None:
+            os.makedirs(carpeta, exist_ok=True)
+        self.carpeta = carpeta or tempfile.mkdtemp(prefix="claves-")
+        self._carpeta_temporal = carpeta is None
+        self.en_memoria = set()
+        self.tramos: List[_Tramo] = []
+        self.en_disco = 0
+        self.filtro = None
+        self._numeros_de_tramo = 0
+
+    def __len__(self) -> int:
+        return len(self.en_memoria) + self.en_disco
+
+    def __contains__(self, clave: bytes) -> bool:
+        if clave in self.en_memoria:
+            return True
+        if self.filtro is None or clave not in self.filtro:
+            return False
+        return any(clave in tramo for tramo in self.tramos)
+
+    def agregar(self, clave: bytes) -> bool:
+        """Agrega la clave y devuelve True si no estaba."""
+        if clave in self:
+            return False
+        self.en_memoria.add(clave)
+        if len(self.en_memoria) >= self.maximo_en_memoria:
+            self._bajar_a_disco()
+        return True
+
+    def _nuevo_tramo(self, claves: Iterable[bytes]) -> _Tramo:
+        self._numeros_de_tramo += 1
+        return _Tramo.escribir(os.path.join(self.carpeta, f"{self._numeros_de_tramo}.claves"), claves)
+
+    def _bajar_a_disco(self):
+        nuevas = sorted(self.en_memoria)
+        self.en_memoria.clear()
+        self.tramos.append(self._nuevo_tramo(nuevas))
+        self.en_disco += len(nuevas)
+        if len(self.tramos) > MAXIMO_TRAMOS:
+            fundido = self._nuevo_tramo(heapq.merge(*self.tramos))
+            for tramo in self.tramos:
+                tramo.borrar()
+            self.tramos = [fundido]
+        if self.filtro is None or self.en_disco > self.filtro.capacidad:
+            # Se rehace el filtro con lugar para el doble de claves, así que
+            # cada clave se vuelve a agregar pocas veces en total
+            self.filtro = _FiltroBloom(2 * self.en_disco)
+            for tramo in self.tramos:
+                for clave in tramo:
+                    self.filtro.agregar(clave)
+        else:
+            for clave in nuevas:
+                self.filtro.agregar(clave)
+
+    def cerrar(self):
+        """Borra los tramos y, si la carpeta era temporal, la carpeta."""
+        for tramo in self.tramos:
+            tramo.borrar()
+        self.tramos = []
+        self.en_memoria.clear()
+        self.en_disco = 0
+        if self._carpeta_temporal:
+            shutil.rmtree(self.carpeta, ignore_errors=True)
+
+
+class Resumen(NamedTuple):
+    leidas: int
+    unicas: int
+
+    @property
+    def repetidas(self) -> int:
+        return self.leidas - self.unicas
+
+
+def deduplicar(entrada: Iterable[str], salida: TextIO, claves: ConjuntoClaves) -> Resumen:
+    """Copia a `salida` las líneas de `entrada` cuya grilla (o alguna
+    equivalente) no apareció antes ni está en `claves`. Las líneas en blanco
+    se ignoran; una línea que no es una grilla (o que tiene casilleros que no
+    son "1", "0" o " ") lanza ValueError."""
+    leidas = unicas = 0
+    for numero, linea in enumerate(entrada, 1):
+        if not linea.strip():
+            continue
+        try:
+            desc = json.loads(linea)
+        except ValueError:
+            raise ValueError(f"La línea {numero} no es JSON") from None
+        if not (
+            isinstance(desc, list) and desc and all(isinstance(fila, str) for fila in desc)
+            and len({len(fila) for fila in desc}) == 1
+        ):
+            raise ValueError(f"La línea {numero} no es una grilla")
+        if not _CASILLEROS.issuperset("".join(desc)):
+            raise ValueError(f"La línea {numero} tiene casilleros que no son 1, 0 ni vacíos")
+        leidas += 1
+        if claves.agregar(simetrias.clave_canonica(desc)):
+            unicas += 1
+            salida.write(linea if linea.endswith("\n") else linea + "\n")
+    return Resumen(leidas, unicas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("entrada", nargs="?")
+    parser.add_argument("salida", nargs="?")
+    parser.add_argument("--maximo-en-memoria", type=int, default=MAXIMO_EN_MEMORIA)
+    parser.add_argument("--carpeta")
+    argumentos = parser.parse_args()
+
+    entrada = open(argumentos.entrada) if argumentos.entrada else sys.stdin
+    salida = open(argumentos.salida, "w") if argumentos.salida else sys.stdout
+    claves = ConjuntoClaves(argumentos.maximo_en_memoria, argumentos.carpeta)
+    inicio = time.perf_counter()
+    try:
+        resumen = deduplicar(entrada, salida, claves)
+    finally:
+        claves.cerrar()
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+    tiempo = time.perf_counter() - inicio
+    print(
+        f"{resumen.leidas} grillas leídas, {resumen.unicas} únicas, {resumen.repetidas} repetidas "
+        f"en {tiempo:.1f} s ({resumen.leidas / max(tiempo, 1e-9):,.0f} grillas/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Calificación de la dificultad de los niveles.
+
+Un nivel se resuelve como lo haría una persona, con técnicas cada vez más
+difíciles: en cada paso se usa la más sencilla que permita completar algún
+casillero, aplicándola a todas las líneas de la grilla, y se vuelve a
+empezar por la más sencilla. Las técnicas son:
+
+    VENTANAS   al lado o en medio de dos casilleros iguales va el opuesto
+               (las reglas PAR y HUECO de
+               `resolvedor.reglas_de_linea`)
+    CUOTA      si una línea ya tiene la mitad de casilleros con un valor, el
+               resto lleva el otro (la regla CUOTA)
+    LINEA      un casillero tiene el mismo valor en todas las formas de
+               completar su línea (ver `resolvedor.valores_posibles`)
+    ADIVINAR   ninguna de las anteriores alcanza y hay que probar un valor;
+               se cuenta un intento por casillero adivinado
+
+La calificación guarda cuántos pasos necesitó cada técnica y cuántos
+casilleros completó. El puntaje es la suma de los pasos pesados por PESOS, y
+la franja es la de la técnica más difícil que hizo falta.
+
+Como una línea que no cambió no puede dar nada nuevo con una técnica que ya
+falló en ella, cada técnica sólo vuelve a mirar las líneas que cambiaron
+desde la última vez; así se califican miles de niveles chicos por segundo.
+
+`indice_niveles` agrupa los niveles por tamaño y franja para elegirlos."""
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import resolvedor
+from resolvedor import Celdas, LIBRE
+from unruly import Grilla
+
+VENTANAS = "ventanas"
+CUOTA = "cuota"
+LINEA = "linea"
+ADIVINAR = "adivinar"
+TECNICAS = (VENTANAS, CUOTA, LINEA, ADIVINAR)
+PESOS = (1, 2, 5, 20)
+
+# Franjas de dificultad, según la técnica más difícil que hizo falta
+FACIL = "facil"
+MEDIO = "medio"
+DIFICIL = "dificil"
+MUY_DIFICIL = "muy_dificil"
+FRANJAS = (FACIL, MEDIO, DIFICIL, MUY_DIFICIL)
+
+
+class Calificacion(NamedTuple):
+    """Dificultad de un nivel. `pasos` y `casilleros` tienen una posición
+    por técnica, en el orden de TECNICAS."""
+    puntaje: int
+    franja: str
+    pasos: Tuple[int, ...]
+    casilleros: Tuple[int, ...]
+
+
+def _reglas(valores: Tuple[int, ...]) -> resolvedor.ReglasDeLinea:
+    reglas = resolvedor.reglas_de_linea(valores)
+    if reglas.contradiccion is not None:
+        raise ValueError("El nivel no tiene solución")
+    return reglas
+
+
+def _por_ventanas(valores: Tuple[int, ...]) -> Dict[int, int]:
+    reglas = _reglas(valores)
+    return {**reglas.pares, **reglas.huecos}
+
+
+def _por_cuota(valores: Tuple[int, ...]) -> Dict[int, int]:
+    return _reglas(valores).cuota
+
+
+def _por_linea(valores: Tuple[int, ...]) -> Dict[int, int]:
+    posibles = resolvedor.valores_posibles(valores)
+    if posibles is None:
+        raise ValueError("El nivel no tiene solución")
+    return {
+        i: posibles[i] >> 1
+        for i, valor in enumerate(valores)
+        if valor == LIBRE and posibles[i] != 0b11
+    }
+
+
+_DEDUCCIONES = (_por_ventanas, _por_cuota, _por_linea)
+
+
+def calificar_celdas(
+    celdas: Celdas, ancho: int, alto: int, solucion: Optional[Celdas] = None
+) -> Calificacion:
+    """Califica los casilleros dados (que no se modifican). Lanza ValueError
+    si no tienen solución.
+
+    Los valores adivinados se toman de `solucion`; si no se la pasa, se
+    resuelve la grilla la primera vez que hay que adivinar. Al calificar
+    niveles recién generados conviene pasarla, porque resolver es lo más
+    costoso en las grillas que necesitan adivinar."""
+    celdas = list(celdas)
+    lineas, lineas_de_celda = resolvedor.geometria(ancho, alto)
+    pasos = [0] * len(TECNICAS)
+    casilleros = [0] * len(TECNICAS)
+    # Líneas en las que cada técnica ya no encuentra nada
+    agotadas: List[Set[int]] = [set() for _ in _DEDUCCIONES]
+    libres = celdas.count(LIBRE)
+    while libres:
+        for tecnica, deducir in enumerate(_DEDUCCIONES):
+            cambiadas = set()
+            completados = 0
+            for numero, linea in enumerate(lineas):
+                if numero in agotadas[tecnica]:
+                    continue
+                forzados = deducir(tuple([celdas[i] for i in linea]))
+                for posicion, valor in forzados.items():
+                    indice = linea[posicion]
+                    if celdas[indice] == LIBRE:
+                        celdas[indice] = valor
+                        completados += 1
+                        cambiadas.update(lineas_de_celda[indice])
+                agotadas[tecnica].add(numero)
+            if completados:
+                pasos[tecnica] += 1
+                casilleros[tecnica] += completados
+                libres -= completados
+                for agotadas_de_tecnica in agotadas:
+                    agotadas_de_tecnica -= cambiadas
+                break
+        else:
+            if solucion is None:
+                solucion = resolvedor.resolver_celdas(celdas, ancho, alto)
+                if solucion is None:
+                    raise ValueError("El nivel no tiene solución")
+            indice = resolvedor.celda_mas_restringida(celdas, ancho, alto)
+            celdas[indice] = solucion[indice]
+            libres -= 1
+            pasos[-1] += 1
+            casilleros[-1] += 1
+            for agotadas_de_tecnica in agotadas:
+                agotadas_de_tecnica.difference_update(lineas_de_celda[indice])
+    # Las líneas completas se repiten mucho entre niveles, así que conviene
+    # validarlas con `valores_posibles`, que recuerda sus resultados
+    if any(resolvedor.valores_posibles(tuple([celdas[i] for i in linea])) is None for linea in lineas):
+        raise ValueError("El nivel no tiene solución")
+    usadas = [tecnica for tecnica, cantidad in enumerate(pasos) if cantidad]
+    return Calificacion(
+        sum(peso * cantidad for peso, cantidad in zip(PESOS, pasos)),
+        FRANJAS[usadas[-1]] if usadas else FACIL,
+        tuple(pasos),
+        tuple(casilleros),
+    )
+
+
+def calificar(grilla: Grilla) -> Calificacion:
+    """Califica un nivel (una grilla o su descripción, en el formato de
+    `unruly.crear_grilla`). Lanza ValueError si no tiene solución."""
+    celdas, ancho, alto = resolvedor.celdas_desde_grilla(grilla)
+    return calificar_celdas(celdas, ancho, alto)
+
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Generación de niveles de Unruly con solución única.
+
+Los niveles se devuelven en el mismo formato que `niveles.NIVELES` (una
+lista de cadenas por nivel), listos para `unruly.crear_grilla`."""
+import multiprocessing
+import random
+from typing import List, Optional, Tuple
+
+import dificultad
+import resolvedor
+from resolvedor import LIBRE
+
+
+def semilla_de_nivel(semilla: int, ancho: int, alto: int, numero: int) -> str:
+    """Devuelve la semilla del nivel número `numero` de una corrida. Depende
+    sólo de sus argumentos, no del proceso que genere el nivel, así que una
+    corrida se puede repetir con cualquier cantidad de procesos."""
+    return f"{semilla}:{ancho}x{alto}:{numero}"
+
+
+def solucion_aleatoria(ancho: int, alto: int, azar: random.Random) -> resolvedor.Celdas:
+    """Devuelve una grilla completa y válida elegida al azar, como lista plana
+    de casilleros (ver `resolvedor`)."""
+    return resolvedor.resolver_celdas([LIBRE] * (ancho * alto), ancho, alto, azar)
+
+
+def generar_celdas(
+    ancho: int, alto: int, azar: random.Random
+) -> Tuple[resolvedor.Celdas, resolvedor.Celdas]:
+    """Genera un nivel de `ancho` x `alto` con solución única y devuelve sus
+    casilleros y los de la solución, como listas planas.
+
+    Parte de una solución al azar y recorre sus casilleros en orden aleatorio,
+    quitando cada uno si la solución sigue siendo única. Como el nivel antes
+    de quitar el casillero tiene solución única, alcanza con verificar que no
+    haya solución con el valor opuesto en ese casillero."""
+    solucion = solucion_aleatoria(ancho, alto, azar)
+    nivel = list(solucion)
+    orden = list(range(ancho * alto))
+    azar.shuffle(orden)
+    for indice in orden:
+        valor = nivel[indice]
+        nivel[indice] = 1 - valor
+        hay_otra = resolvedor.resolver_celdas(nivel, ancho, alto) is not None
+        nivel[indice] = valor if hay_otra else LIBRE
+    return nivel, solucion
+
+
+def descripcion_de_celdas(nivel: resolvedor.Celdas, ancho: int, alto: int) -> List[str]:
+    """Devuelve los casilleros de un nivel en el formato de
+    `niveles.NIVELES`."""
+    return [
+        "".join(resolvedor.SIMBOLOS[valor] for valor in nivel[fil * ancho:(fil + 1) * ancho])
+        for fil in range(alto)
+    ]
+
+
+def generar_nivel(ancho: int, alto: int, azar: random.Random) -> List[str]:
+    """Genera un nivel de `ancho` x `alto` con solución única (ver
+    `generar_celdas`)."""
+    nivel, _solucion = generar_celdas(ancho, alto, azar)
+    return descripcion_de_celdas(nivel, ancho, alto)
+
+
+def generar_nivel_calificado(
+    ancho: int, alto: int, azar: random.Random
+) -> Tuple[List[str], dificultad.Calificacion]:
+    """Como `generar_nivel`, pero devuelve también la dificultad del nivel,
+    calificada con la solución que ya se conoce (ver `dificultad`)."""
+    nivel, solucion = generar_celdas(ancho, alto, azar)
+    calificacion = dificultad.calificar_celdas(nivel, ancho, alto, solucion)
+    return descripcion_de_celdas(nivel, ancho, alto), calificacion
+
+
+def _generar_numero(argumentos) -> List[str]:
+    """Genera el nivel de una corrida dado por (semilla, ancho, alto, numero).
+    Se usa desde los procesos de `generar_niveles`."""
+    semilla, ancho, alto, numero = argumentos
+    azar = random.Random(semilla_de_nivel(semilla, ancho, alto, numero))
+    return generar_nivel(ancho, alto, azar)
+
+
+def generar_niveles(
+    ancho: int,
+    alto: int,
+    cantidad: int,
+    semilla: int = 0,
+    procesos: Optional[int] = None,
+) -> List[List[str]]:
+    """Genera `cantidad` niveles de `ancho` x `alto` con solución única,
+    repartiendo el trabajo entre `procesos` procesos (por defecto, uno por
+    núcleo). Con la misma semilla se obtienen siempre los mismos niveles, en
+    el mismo orden."""
+    tareas = [(semilla, ancho, alto, numero) for numero in range(cantidad)]
+    if procesos == 1:
+        return [_generar_numero(tarea) for tarea in tareas]
+    with multiprocessing.Pool(procesos) as pool:
+        tamanio_lote = max(1, cantidad // (4 * (procesos or multiprocessing.cpu_count())))
+        return pool.map(_generar_numero, tareas, chunksize=tamanio_lote)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Historial de jugadas con deshacer y rehacer.
+
+Cada jugada se hace con `Historial.cambiar`, que la aplica con las funciones
+`cambiar_a_*` de `unruly` y la anota como `Movimiento`. Deshacer o rehacer
+una jugada es aplicar un solo cambio, así que cualquier estado incremental
+de la grilla (por ejemplo el de `unruly.GrillaIncremental`, o los motores de
+`pistas` y `viabilidad`) se actualiza sin recorrerla.
+
+Cada `intervalo` jugadas se guarda una instantánea de la grilla con 2 bits
+por casillero (ver `paquete_niveles.codificar_nivel`). Para ir a una jugada
+lejana (`ir_a`) se restaura la instantánea más cercana y se rehacen las
+jugadas que faltan, si eso es más barato que deshacer una por una."""
+from typing import List, NamedTuple, Optional
+
+import paquete_niveles
+import unruly
+from unruly import Grilla
+
+# Jugadas entre instantáneas como mínimo; en grillas grandes el intervalo se
+# agranda para que guardar instantáneas cueste lo mismo por jugada
+INTERVALO_MINIMO = 64
+CASILLEROS_POR_JUGADA = 64
+# Comparar la grilla con una instantánea cuesta más o menos lo mismo que
+# deshacer una jugada por cada tantos casilleros; además, cada casillero que
+# difiere cuesta una jugada
+CASILLEROS_POR_DESHACER = 512
+
+_CAMBIOS = {
+    unruly.UNO: unruly.cambiar_a_uno,
+    unruly.CERO: unruly.cambiar_a_cero,
+    unruly.VACIO: unruly.cambiar_a_vacio,
+}
+
+
+class Movimiento(NamedTuple):
+    """Cambio del casillero (col, fil) de `anterior` a `nuevo`."""
+    col: int
+    fil: int
+    anterior: str
+    nuevo: str
+
+
+def _valor(grilla: Grilla, col: int, fil: int) -> str:
+    if unruly.posicion_hay_uno(grilla, col, fil):
+        return unruly.UNO
+    if unruly.posicion_hay_cero(grilla, col, fil):
+        return unruly.CERO
+    return unruly.VACIO
+
+
+def _descripcion(grilla: Grilla) -> List[str]:
+    return ["".join(grilla[fil]) for fil in range(len(grilla))]
+
+
+class Historial:
+    """Historial de las jugadas hechas sobre `grilla`, de cualquier
+    representación.
+
+    `posicion` es la cantidad de jugadas aplicadas: las de `movimientos`
+    después de esa posición son las que se pueden rehacer, y se descartan al
+    hacer una jugada nueva."""
+
+    def __init__(self, grilla: Grilla, intervalo: Optional[int] = None):
+        self.grilla = grilla
+        self.ancho, self.alto = unruly.dimensiones(grilla)
+        if intervalo is None:
+            intervalo = max(INTERVALO_MINIMO, self.ancho * self.alto // CASILLEROS_POR_JUGADA)
+        self.intervalo = intervalo
+        self.movimientos: List[Movimiento] = []
+        self.posicion = 0
+        # La instantánea i es la grilla luego de i * intervalo jugadas
+        self.instantaneas: List[bytes] = [self._instantanea()]
+
+    def __len__(self) -> int:
+        return len(self.movimientos)
+
+    def _instantanea(self) -> bytes:
+        return paquete_niveles.codificar_nivel(_descripcion(self.grilla))
+
+    def puede_deshacer(self) -> bool:
+        return self.posicion > 0
+
+    def puede_rehacer(self) -> bool:
+        return self.posicion < len(self.movimientos)
+
+    def cambiar(self, col: int, fil: int, valor: str) -> Optional[Movimiento]:
+        """Coloca `valor` (UNO, CERO o VACIO) en la posición dada y devuelve la
+        jugada anotada, o None si el casillero ya tenía ese valor."""
+        anterior = _valor(self.grilla, col, fil)
+        if anterior == valor:
+            return None
+        del self.movimientos[self.posicion:]
+        del self.instantaneas[self.posicion // self.intervalo + 1:]
+        movimiento = Movimiento(col, fil, anterior, valor)
+        self.movimientos.append(movimiento)
+        _CAMBIOS[valor](self.grilla, col, fil)
+        self.posicion += 1
+        if self.posicion % self.intervalo == 0:
+            self.instantaneas.append(self._instantanea())
+        return movimiento
+
+    def deshacer(self) -> Optional[Movimiento]:
+        """Deshace la última jugada aplicada y la devuelve, o devuelve None si
+        no hay ninguna."""
+        if not self.puede_deshacer():
+            return None
+        self.posicion -= 1
+        movimiento = self.movimientos[self.posicion]
+        _CAMBIOS[movimiento.anterior](self.grilla, movimiento.col, movimiento.fil)
+        return movimiento
+
+    def rehacer(self) -> Optional[Movimiento]:
+        """Vuelve a aplicar la última jugada deshecha y la devuelve, o devuelve
+        None si no hay ninguna."""
+        if not self.puede_rehacer():
+            return None
+        movimiento = self.movimientos[self.posicion]
+        _CAMBIOS[movimiento.nuevo](self.grilla, movimiento.col, movimiento.fil)
+        self.posicion += 1
+        if self.posicion % self.intervalo == 0 and len(self.instantaneas) == self.posicion // self.intervalo:
+            self.instantaneas.append(self._instantanea())
+        return movimiento
+
+    def _restaurar(self, numero: int):
+        """Deja la grilla como en la instantánea `numero`, cambiando sólo los
+        casilleros que difieren (las filas iguales se comparan enteras)."""
+        desc = paquete_niveles.decodificar_nivel(self.instantaneas[numero], self.ancho, self.alto)
+        for fil, fila in enumerate(desc):
+            actual = "".join(self.grilla[fil])
+            if actual == fila:
+                continue
+            for col, valor in enumerate(fila):
+                if actual[col] != valor:
+                    _CAMBIOS[valor](self.grilla, col, fil)
+        self.posicion = numero * self.intervalo
+
+    def ir_a(self, posicion: int):
+        """Deja la grilla como estaba luego de `posicion` jugadas (entre 0 y
+        `len(self)`)."""
+        if not 0 <= posicion <= len(self.movimientos):
+            raise IndexError(f"No hay jugada {posicion}")
+        numero = min(posicion // self.intervalo, len(self.instantaneas) - 1)
+        casilleros = self.ancho * self.alto
+        # Los casilleros que difieren de la instantánea no pueden ser más que
+        # las jugadas que las separan
+        diferentes = min(casilleros, abs(self.posicion - numero * self.intervalo))
+        desde_instantanea = (
+            casilleros // CASILLEROS_POR_DESHACER + diferentes
+            + posicion - numero * self.intervalo
+        )
+        if desde_instantanea < abs(self.posicion - posicion):
+            self._restaurar(numero)
+        while self.posicion > posicion:
+            self.deshacer()
+        while self.posicion < posicion:
+            self.rehacer()
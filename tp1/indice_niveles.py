@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""Índice de niveles por tamaño y dificultad.
+
+Agrupa los niveles en cubetas por (ancho, alto, franja de dificultad) (ver
+`dificultad`). Cada cubeta es un arreglo con el número de cada nivel dentro
+de su tamaño, que es su posición en el paquete de niveles: el nivel está en
+`posicion + numero * bytes_por_nivel(ancho, alto)` (ver `paquete_niveles`).
+Elegir un nivel al azar de un tamaño y una franja es elegir una posición
+de un arreglo, sin importar cuántos niveles haya.
+
+El índice se arma de a un nivel por vez y recuerda, para cada tamaño,
+cuántos niveles ya vio y una huella (un hash) de sus bytes en el paquete.
+Si se agregan niveles al paquete (ver `agregar_niveles`), `actualizar` sólo
+califica los nuevos; si los niveles ya vistos cambiaron, vuelve a indexar
+ese tamaño. El índice se guarda junto al paquete (ver `ruta_de_indice`) y
+se actualiza al escribir niveles, para que elegir un nivel nunca tenga que
+calificar el paquete.
+
+Uso para armar o actualizar el índice de un paquete:
+
+    python indice_niveles.py niveles.bin
+
+Formato del archivo (enteros little-endian):
+
+    Encabezado   "UNRI", versión (1 byte), 3 bytes de relleno, cantidad de
+                 tamaños T (4 bytes), cantidad de cubetas C (4 bytes),
+                 huella del paquete indexado (LARGO_HUELLA bytes, ver
+                 `paquete_niveles`)
+    Tamaños      T entradas de: ancho (2 bytes), alto (2 bytes), niveles
+                 vistos (4 bytes), huella de los niveles vistos
+                 (LARGO_HUELLA bytes)
+    Cubetas      C entradas de: ancho (2 bytes), alto (2 bytes), número de
+                 franja en `dificultad.FRANJAS` (1 byte), 3 bytes de relleno,
+                 cantidad de niveles (4 bytes), posición de sus números en
+                 el archivo (8 bytes)
+    Números      los números de nivel de cada cubeta, de 4 bytes cada uno"""
+import argparse
+import array
+import hashlib
+import os
+import struct
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import dificultad
+import paquete_niveles
+
+FIRMA = b"UNRI"
+VERSION = 3
+LARGO_HUELLA = paquete_niveles.LARGO_HUELLA
+ENCABEZADO = struct.Struct(f"<4sB3xII{LARGO_HUELLA}s")
+TAMANIO = struct.Struct(f"<HHI{LARGO_HUELLA}s")
+CUBETA = struct.Struct("<HHB3xIQ")
+
+Cubeta = Tuple[int, int, str]
+
+
+def _numeros(datos: bytes = b"") -> array.array:
+    numeros = array.array("I", datos)
+    if sys.byteorder == "big":
+        numeros.byteswap()
+    return numeros
+
+
+def _huella(paquete: paquete_niveles.PaqueteNiveles, ancho: int, alto: int, desde: int = 0,
+            hasta: Optional[int] = None, huella=None):
+    """Devuelve el hash de los niveles `desde` a `hasta` de un tamaño del
+    paquete, continuando `huella` si se la pasa."""
+    if huella is None:
+        huella = hashlib.blake2b(digest_size=LARGO_HUELLA)
+    for trozo in paquete.trozos(ancho, alto, desde, hasta):
+        huella.update(trozo)
+    return huella
+
+
+def ruta_de_indice(ruta_paquete: str) -> str:
+    """Devuelve dónde se guarda el índice del paquete `ruta_paquete`: al
+    lado, con extensión ".idx"."""
+    return os.path.splitext(ruta_paquete)[0] + ".idx"
+
+
+class IndiceNiveles:
+    """Números de nivel por (ancho, alto, franja). `vistos` guarda cuántos
+    niveles de cada tamaño se agregaron (incluidos los que no tienen
+    solución, que no quedan en ninguna cubeta) y `huellas`, la huella de
+    esos niveles en el paquete, para los tamaños indexados con
+    `actualizar`. `huella_paquete` es la huella del paquete indexado (la de
+    su encabezado), o None si se agregaron niveles de otra forma."""
+
+    def __init__(self):
+        self.cubetas: Dict[Cubeta, array.array] = {}
+        self.vistos: Dict[Tuple[int, int], int] = {}
+        self.huellas: Dict[Tuple[int, int], bytes] = {}
+        self.huella_paquete: Optional[bytes] = None
+
+    def __len__(self) -> int:
+        return sum(len(numeros) for numeros in self.cubetas.values())
+
+    def agregar(self, desc: List[str]) -> Optional[Cubeta]:
+        """Califica un nivel y lo agrega como el siguiente de su tamaño.
+        Devuelve su cubeta, o None si no tiene solución."""
+        tamanio = (len(desc[0]), len(desc))
+        numero = self.vistos.get(tamanio, 0)
+        self.vistos[tamanio] = numero + 1
+        self.huellas.pop(tamanio, None)
+        self.huella_paquete = None
+        try:
+            franja = dificultad.calificar(desc).franja
+        except ValueError:
+            return None
+        cubeta = (*tamanio, franja)
+        if cubeta not in self.cubetas:
+            self.cubetas[cubeta] = _numeros()
+        self.cubetas[cubeta].append(numero)
+        return cubeta
+
+    def olvidar_tamanio(self, ancho: int, alto: int):
+        for cubeta in [cubeta for cubeta in self.cubetas if cubeta[:2] == (ancho, alto)]:
+            del self.cubetas[cubeta]
+        self.vistos.pop((ancho, alto), None)
+        self.huellas.pop((ancho, alto), None)
+        self.huella_paquete = None
+
+    def actualizar(self, paquete: paquete_niveles.PaqueteNiveles) -> int:
+        """Agrega los niveles del paquete que todavía no están en el índice,
+        leyéndolos de a uno, y devuelve cuántos fueron. Si los niveles ya
+        vistos de un tamaño no son los del paquete (su huella no coincide),
+        ese tamaño se vuelve a indexar entero. Como lee todo el paquete, se
+        usa al escribir niveles, no al elegirlos."""
+        agregados = 0
+        for (ancho, alto), (cantidad, _posicion) in paquete.tamanios.items():
+            vistos = self.vistos.get((ancho, alto), 0)
+            huella = None
+            if vistos <= cantidad:
+                huella = _huella(paquete, ancho, alto, 0, vistos)
+            if (ancho, alto) in self.vistos and (
+                huella is None or huella.digest() != self.huellas.get((ancho, alto))
+            ):
+                self.olvidar_tamanio(ancho, alto)
+                vistos, huella = 0, None
+            for numero in range(vistos, cantidad):
+                self.agregar(paquete.nivel(ancho, alto, numero))
+                agregados += 1
+            self.vistos[ancho, alto] = cantidad
+            self.huellas[ancho, alto] = _huella(paquete, ancho, alto, vistos, cantidad, huella).digest()
+        for tamanio in [tamanio for tamanio in self.vistos if tamanio not in paquete.tamanios]:
+            self.olvidar_tamanio(*tamanio)
+        self.huella_paquete = paquete.huella
+        return agregados
+
+    def al_dia(self, paquete: paquete_niveles.PaqueteNiveles) -> bool:
+        """Indica si el índice tiene exactamente los niveles del paquete.
+        Compara la huella del encabezado del paquete con la guardada, sin
+        leer los niveles; sólo los paquetes sin huella (de la versión 1) se
+        leen enteros."""
+        if paquete.huella is not None:
+            return self.huella_paquete == paquete.huella
+        if self.vistos != {tamanio: cantidad for tamanio, (cantidad, _) in paquete.tamanios.items()}:
+            return False
+        return all(
+            self.huellas.get(tamanio) == _huella(paquete, *tamanio).digest() for tamanio in self.vistos
+        )
+
+    def cantidad(self, ancho: Optional[int] = None, alto: Optional[int] = None, franja: Optional[str] = None) -> int:
+        """Devuelve cuántos niveles hay con el tamaño y la franja dados (los
+        que no se dan pueden ser cualquiera)."""
+        return sum(len(numeros) for numeros in self._coincidentes(ancho, alto, franja).values())
+
+    def _coincidentes(self, ancho, alto, franja) -> Dict[Cubeta, array.array]:
+        if ancho is not None and alto is not None and franja is not None:
+            numeros = self.cubetas.get((ancho, alto, franja))
+            return {(ancho, alto, franja): numeros} if numeros else {}
+        return {
+            cubeta: numeros
+            for cubeta, numeros in self.cubetas.items()
+            if (ancho is None or cubeta[0] == ancho)
+            and (alto is None or cubeta[1] == alto)
+            and (franja is None or cubeta[2] == franja)
+        }
+
+    def elegir(
+        self, azar, ancho: Optional[int] = None, alto: Optional[int] = None, franja: Optional[str] = None
+    ) -> Optional[Tuple[int, int, int]]:
+        """Elige al azar (con `azar`, el módulo `random` o un
+        `random.Random`) un nivel con el tamaño y la franja dados, y devuelve
+        (ancho, alto, número dentro del tamaño), o None si no hay ninguno.
+
+        Con los tres datos es una consulta directa a una cubeta; si falta
+        alguno, se recorren las cubetas (no los niveles)."""
+        coincidentes = self._coincidentes(ancho, alto, franja)
+        total = sum(len(numeros) for numeros in coincidentes.values())
+        if not total:
+            return None
+        posicion = azar.randrange(total)
+        for (ancho_cubeta, alto_cubeta, _), numeros in coincidentes.items():
+            if posicion < len(numeros):
+                return ancho_cubeta, alto_cubeta, numeros[posicion]
+            posicion -= len(numeros)
+
+    def guardar(self, ruta: str):
+        """Guarda el índice en el archivo `ruta`, reemplazándolo de una vez
+        para que nunca quede a medio escribir."""
+        cubetas = sorted(self.cubetas)
+        posicion = ENCABEZADO.size + TAMANIO.size * len(self.vistos) + CUBETA.size * len(cubetas)
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as archivo:
+            archivo.write(ENCABEZADO.pack(FIRMA, VERSION, len(self.vistos), len(cubetas), self.huella_paquete or b""))
+            for (ancho, alto), vistos in sorted(self.vistos.items()):
+                archivo.write(TAMANIO.pack(ancho, alto, vistos, self.huellas.get((ancho, alto), b"")))
+            for ancho, alto, franja in cubetas:
+                cantidad = len(self.cubetas[ancho, alto, franja])
+                archivo.write(CUBETA.pack(ancho, alto, dificultad.FRANJAS.index(franja), cantidad, posicion))
+                posicion += 4 * cantidad
+            for cubeta in cubetas:
+                numeros = self.cubetas[cubeta]
+                if sys.byteorder == "big":
+                    numeros = _numeros(numeros.tobytes())
+                archivo.write(numeros.tobytes())
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str) -> "IndiceNiveles":
+        """Carga un índice guardado con `guardar`. Lanza ValueError si el
+        archivo no es un índice."""
+        with open(ruta, "rb") as archivo:
+            datos = archivo.read()
+        if len(datos) < ENCABEZADO.size:
+            raise ValueError(f"{ruta} no es un índice de niveles")
+        firma, version, cantidad_tamanios, cantidad_cubetas, huella_paquete = ENCABEZADO.unpack_from(datos)
+        if firma != FIRMA or version != VERSION:
+            raise ValueError(f"{ruta} no es un índice de niveles")
+        indice = cls()
+        if any(huella_paquete):
+            indice.huella_paquete = huella_paquete
+        desplazamiento = ENCABEZADO.size
+        try:
+            for ancho, alto, vistos, huella in TAMANIO.iter_unpack(
+                datos[desplazamiento:desplazamiento + TAMANIO.size * cantidad_tamanios]
+            ):
+                indice.vistos[ancho, alto] = vistos
+                if any(huella):
+                    indice.huellas[ancho, alto] = huella
+            desplazamiento += TAMANIO.size * cantidad_tamanios
+            for ancho, alto, franja, cantidad, posicion in CUBETA.iter_unpack(
+                datos[desplazamiento:desplazamiento + CUBETA.size * cantidad_cubetas]
+            ):
+                numeros = datos[posicion:posicion + 4 * cantidad]
+                if len(numeros) != 4 * cantidad:
+                    raise ValueError(f"{ruta} está incompleto")
+                indice.cubetas[ancho, alto, dificultad.FRANJAS[franja]] = _numeros(numeros)
+        except (struct.error, IndexError):
+            raise ValueError(f"{ruta} no es un índice de niveles") from None
+        return indice
+
+
+def indexar(ruta_paquete: str, ruta_indice: Optional[str] = None) -> IndiceNiveles:
+    """Devuelve el índice del paquete `ruta_paquete`, cargándolo de
+    `ruta_indice` (por defecto, `ruta_de_indice(ruta_paquete)`) si existe y
+    agregando (y guardando) los niveles nuevos del paquete. Si el índice no
+    existe o no se puede leer, se arma de cero."""
+    if ruta_indice is None:
+        ruta_indice = ruta_de_indice(ruta_paquete)
+    try:
+        indice = IndiceNiveles.cargar(ruta_indice)
+    except (OSError, ValueError):
+        indice = IndiceNiveles()
+    antes = (dict(indice.vistos), dict(indice.huellas), indice.huella_paquete)
+    with paquete_niveles.PaqueteNiveles(ruta_paquete) as paquete:
+        indice.actualizar(paquete)
+    if (indice.vistos, indice.huellas, indice.huella_paquete) != antes or not os.path.exists(ruta_indice):
+        indice.guardar(ruta_indice)
+    return indice
+
+
+def agregar_niveles(ruta_paquete: str, descs: Iterable[List[str]], ruta_indice: Optional[str] = None) -> IndiceNiveles:
+    """Agrega los niveles al paquete (ver `paquete_niveles.agregar_al_paquete`)
+    y actualiza su índice, calificando sólo los niveles nuevos. Devuelve el
+    índice."""
+    paquete_niveles.agregar_al_paquete(ruta_paquete, descs)
+    return indexar(ruta_paquete, ruta_indice)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paquete", nargs="?", default="niveles.bin")
+    parser.add_argument("--indice", help="dónde guardar el índice (por defecto, junto al paquete)")
+    argumentos = parser.parse_args()
+    indice = indexar(argumentos.paquete, argumentos.indice)
+    for (ancho, alto, franja), numeros in sorted(indice.cubetas.items()):
+        print(f"{ancho}x{alto} {franja}: {len(numeros)} niveles")
+    print(f"Índice escrito en {argumentos.indice or ruta_de_indice(argumentos.paquete)}")
+
+
+if __name__ == "__main__":
+    main()
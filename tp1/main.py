@@ -1,12 +1,33 @@
+import argparse
+import os
 import random
+import sys
+import time
+from typing import NamedTuple, Optional
 
+import dificultad
+import historial
+import indice_niveles
 import niveles
+import paquete_niveles
+import partida
+import pistas
 import unruly
+import viabilidad
 
 VACIO= " "
 UNO= "1"
 CERO= "0"
 
+# Si existe este paquete (ver paquete_niveles.py) se eligen los niveles de
+# ahí; si no, de niveles.NIVELES
+RUTA_PAQUETE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "niveles.bin")
+# Partida que se guarda al salir con "stop" y se puede retomar al empezar
+RUTA_PARTIDA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "partida.bin")
+# Índice del paquete por tamaño y dificultad (ver indice_niveles.py), que se
+# escribe junto con el paquete
+RUTA_INDICE = indice_niveles.ruta_de_indice(RUTA_PAQUETE)
+
 
 def grafico_visual(grilla):
     grilla_alineada=[]
@@ -39,28 +60,271 @@ def pedir_valor_a_usuario(grilla):
         return fila, columna, valor_del_usuario
 
 
-def main():
-    nivel = random.choice(niveles.NIVELES)
-    grilla = unruly.crear_grilla(nivel)
+def nivel_numero(numero):
+    """Devuelve el nivel número `numero` (del paquete, si existe, o de
+    niveles.NIVELES)."""
+    if os.path.exists(RUTA_PAQUETE):
+        with paquete_niveles.PaqueteNiveles(RUTA_PAQUETE) as paquete:
+            return paquete.nivel_por_indice(numero)
+    return niveles.NIVELES[numero]
+
+
+def indice_de_niveles():
+    """Devuelve el índice por tamaño y dificultad de los niveles (ver
+    indice_niveles.py), o None si el del paquete no existe o no está al día
+    (se arma al escribir el paquete, no al jugar). El de niveles.NIVELES se
+    arma en el momento."""
+    if os.path.exists(RUTA_PAQUETE):
+        try:
+            indice = indice_niveles.IndiceNiveles.cargar(RUTA_INDICE)
+        except (OSError, ValueError):
+            return None
+        with paquete_niveles.PaqueteNiveles(RUTA_PAQUETE) as paquete:
+            return indice if indice.al_dia(paquete) else None
+    indice = indice_niveles.IndiceNiveles()
+    for nivel in niveles.NIVELES:
+        indice.agregar(nivel)
+    return indice
+
+
+def numero_y_nivel(ancho, alto, numero):
+    """Devuelve el número (como en `nivel_numero`) del nivel número `numero`
+    de tamaño `ancho` x `alto`, y el nivel."""
+    if os.path.exists(RUTA_PAQUETE):
+        with paquete_niveles.PaqueteNiveles(RUTA_PAQUETE) as paquete:
+            return paquete.indice_de(ancho, alto, numero), paquete.nivel(ancho, alto, numero)
+    del_tamanio = [
+        indice for indice, nivel in enumerate(niveles.NIVELES) if (len(nivel[0]), len(nivel)) == (ancho, alto)
+    ]
+    return del_tamanio[numero], niveles.NIVELES[del_tamanio[numero]]
+
+
+def elegir_nivel(franja=None, medidas=None):
+    """Devuelve el número de un nivel al azar (del paquete, si existe, o de
+    niveles.NIVELES) y el nivel. Si se da una franja de dificultad (ver
+    dificultad.FRANJAS) o unas medidas (ancho, alto), el nivel se elige
+    entre los que las cumplen usando el índice de niveles, salvo que no haya
+    ninguno o que el índice no esté al día."""
+    if franja is not None or medidas is not None:
+        ancho, alto = medidas or (None, None)
+        indice = indice_de_niveles()
+        if indice is None:
+            print(
+                f"El índice de niveles no está al día (se arma con python indice_niveles.py "
+                f"{RUTA_PAQUETE}), se elige uno cualquiera"
+            )
+        else:
+            elegido = indice.elegir(random, ancho, alto, franja)
+            if elegido is not None:
+                return numero_y_nivel(*elegido)
+            print("No hay niveles así, se elige uno cualquiera")
+    if os.path.exists(RUTA_PAQUETE):
+        with paquete_niveles.PaqueteNiveles(RUTA_PAQUETE) as paquete:
+            numero = random.randrange(len(paquete))
+            return numero, paquete.nivel_por_indice(numero)
+    numero = random.randrange(len(niveles.NIVELES))
+    return numero, niveles.NIVELES[numero]
+
+
+def empezar_partida(franja=None, medidas=None):
+    """Devuelve la grilla, el número de nivel y las jugadas hechas de la
+    partida guardada, si el usuario quiere retomarla, o de una nueva (de la
+    franja de dificultad y las medidas dadas, si se dan)."""
+    if os.path.exists(RUTA_PARTIDA):
+        retomar = input("hay una partida guardada, desea retomarla? (s/n): ")
+        if retomar.lower() == "s":
+            return partida.cargar_partida(RUTA_PARTIDA, representacion=unruly.INCREMENTAL)
+    numero, nivel = elegir_nivel(franja, medidas)
+    return unruly.crear_grilla(nivel, representacion=unruly.INCREMENTAL), numero, 0
+
+
+def mostrar_pista(grilla):
+    pista = pistas.pista(grilla)
+    if pista is None:
+        print("No hay casilleros forzados a la vista")
+        return
+    print(
+        f"Pista: en la columna {pista.col}, fila {pista.fil} va un {pista.valor} "
+        f"({pistas.DESCRIPCION_REGLAS[pista.regla]})"
+    )
+
+
+def avisar_si_no_tiene_solucion(grilla):
+    callejon = viabilidad.sin_salida(grilla)
+    if callejon is None:
+        return
+    if callejon.fil is not None:
+        linea = f"la fila {callejon.fil}"
+    else:
+        linea = f"la columna {callejon.col}"
+    print(
+        f"Atención: el tablero ya no tiene solución, {linea} "
+        f"{viabilidad.DESCRIPCION_MOTIVOS[callejon.motivo]}"
+    )
+
+
+# Valores que se aceptan en las jugadas del modo sin interfaz; el vacío no se
+# puede escribir como un espacio porque separa los campos
+VALORES_SIN_INTERFAZ = {"1": UNO, "0": CERO, "-": VACIO, "vacio": VACIO}
+
+
+class Resumen(NamedTuple):
+    jugadas: int
+    invalidas: int
+    terminada_en: Optional[int]
+    segundos: float
+
+
+def aplicar_jugadas(grilla, lineas, cada=0, salida=sys.stdout):
+    """Aplica a `grilla` las jugadas de `lineas`, cada una de la forma
+    "col fil valor" (ver VALORES_SIN_INTERFAZ), hasta que se terminen o la
+    grilla quede terminada. Las líneas vacías se ignoran y las que no son
+    jugadas válidas se cuentan como inválidas. Si `cada` no es 0, escribe un
+    resumen en `salida` cada esa cantidad de jugadas."""
+    cambios = {
+        UNO: unruly.cambiar_a_uno,
+        CERO: unruly.cambiar_a_cero,
+        VACIO: unruly.cambiar_a_vacio,
+    }
+    funciones = {texto: cambios[valor] for texto, valor in VALORES_SIN_INTERFAZ.items()}
+    ancho, alto = unruly.dimensiones(grilla)
+    jugadas = invalidas = 0
+    terminada_en = None
+    inicio = time.perf_counter()
+    for linea in lineas:
+        partes = linea.split()
+        if not partes:
+            continue
+        try:
+            columna, fila, valor = partes
+            columna = int(columna)
+            fila = int(fila)
+            cambiar = funciones[valor.lower()]
+        except (ValueError, KeyError):
+            invalidas += 1
+            continue
+        if not (0 <= columna < ancho and 0 <= fila < alto):
+            invalidas += 1
+            continue
+        cambiar(grilla, columna, fila)
+        jugadas += 1
+        if unruly.grilla_terminada(grilla):
+            terminada_en = jugadas
+            break
+        if cada and jugadas % cada == 0:
+            mostrar_resumen(Resumen(jugadas, invalidas, None, time.perf_counter() - inicio), salida)
+    return Resumen(jugadas, invalidas, terminada_en, time.perf_counter() - inicio)
+
+
+def mostrar_resumen(resumen, salida=sys.stdout):
+    por_segundo = resumen.jugadas / resumen.segundos if resumen.segundos else 0
+    print(
+        f"{resumen.jugadas} jugadas ({resumen.invalidas} inválidas) en "
+        f"{resumen.segundos:.2f} s: {por_segundo:,.0f} jugadas/s",
+        file=salida,
+    )
+
+
+def medidas(texto):
+    """Convierte "ANCHOxALTO" en (ancho, alto). Se usa como `type=` de
+    argparse, así que ante un texto inválido levanta
+    argparse.ArgumentTypeError en vez de ValueError."""
+    partes = texto.lower().split("x")
+    if len(partes) != 2 or not all(parte.strip().isdigit() for parte in partes):
+        raise argparse.ArgumentTypeError(f"medidas inválidas {texto!r}, se esperaba ANCHOxALTO, por ejemplo 8x8")
+    ancho, alto = (int(parte) for parte in partes)
+    if not ancho or not alto:
+        raise argparse.ArgumentTypeError(f"medidas inválidas {texto!r}, el ancho y el alto deben ser positivos")
+    return ancho, alto
+
+
+def jugar_sin_interfaz(argumentos):
+    """Modo sin interfaz: aplica las jugadas de un archivo (o de la entrada
+    estándar) y muestra sólo resúmenes."""
+    if argumentos.partida:
+        grilla = partida.cargar_partida(argumentos.partida, representacion=unruly.INCREMENTAL).grilla
+    elif argumentos.tamanio:
+        ancho, alto = argumentos.tamanio
+        grilla = unruly.crear_grilla([VACIO * ancho] * alto, representacion=unruly.INCREMENTAL)
+    else:
+        if argumentos.nivel is None:
+            _, nivel = elegir_nivel(argumentos.dificultad, argumentos.medidas)
+        else:
+            nivel = nivel_numero(argumentos.nivel)
+        grilla = unruly.crear_grilla(nivel, representacion=unruly.INCREMENTAL)
+
+    if argumentos.jugadas == "-":
+        resumen = aplicar_jugadas(grilla, sys.stdin, argumentos.cada)
+    else:
+        with open(argumentos.jugadas) as archivo:
+            resumen = aplicar_jugadas(grilla, archivo, argumentos.cada)
+    mostrar_resumen(resumen)
+    if resumen.terminada_en is not None:
+        print(f"Grilla terminada en la jugada {resumen.terminada_en}")
+    else:
+        print("La grilla no quedó terminada")
+    if argumentos.mostrar:
+        print(grafico_visual(grilla))
+
+
+def jugar(franja=None, medidas=None):
+    grilla, numero, jugadas_previas = empezar_partida(franja, medidas)
+    jugadas = historial.Historial(grilla)
+    print(grafico_visual(grilla))
     while not unruly.grilla_terminada(grilla):
         fila, columna, valor_del_usuario= pedir_valor_a_usuario(grilla)
-        grilla[fila][columna]= valor_del_usuario
-        if valor_del_usuario== 0:
-            unruly.cambiar_a_cero(grilla, columna, fila)
-        if valor_del_usuario== 1:
-            unruly.cambiar_a_uno(grilla, columna, fila)
-        if valor_del_usuario== VACIO:
-            unruly.cambiar_a_vacio(grilla, columna, fila)
+        jugadas.cambiar(columna, fila, valor_del_usuario)
         print(grafico_visual(grilla))
+        avisar_si_no_tiene_solucion(grilla)
         if unruly.grilla_terminada(grilla):
             print("Felicitaciones, has ganado :) ")
+            if os.path.exists(RUTA_PARTIDA):
+                os.remove(RUTA_PARTIDA)
             return
 
-        salir_del_juego=(input("si desea salir del juego, ingrese stop: "))
+        salir_del_juego=(input("si desea salir del juego, ingrese stop (o pista, deshacer o rehacer): "))
+        while salir_del_juego.lower() in ("deshacer", "rehacer"):
+            if salir_del_juego.lower()=="deshacer":
+                jugadas.deshacer()
+            else:
+                jugadas.rehacer()
+            print(grafico_visual(grilla))
+            salir_del_juego=(input("si desea salir del juego, ingrese stop (o pista, deshacer o rehacer): "))
         if salir_del_juego.lower()=="stop":
+            partida.guardar_partida(RUTA_PARTIDA, grilla, numero, jugadas_previas + jugadas.posicion)
+            print("Partida guardada")
             return
+        if salir_del_juego.lower()=="pista":
+            mostrar_pista(grilla)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unruly")
+    parser.add_argument(
+        "--jugadas",
+        help='archivo con una jugada "col fil valor" por línea ("-" para la '
+             "entrada estándar); sin esta opción se juega de forma interactiva",
+    )
+    parser.add_argument("--nivel", type=int, help="número de nivel a jugar")
+    parser.add_argument(
+        "--dificultad", choices=dificultad.FRANJAS, help="elegir un nivel al azar de esta dificultad"
+    )
+    parser.add_argument(
+        "--medidas", type=medidas, help="elegir un nivel al azar de estas medidas, por ejemplo 8x8"
+    )
+    parser.add_argument("--partida", help="partida guardada desde la cual jugar")
+    parser.add_argument("--tamanio", type=medidas, help="empezar de una grilla vacía, por ejemplo 100x100")
+    parser.add_argument("--cada", type=int, default=0, help="mostrar un resumen cada tantas jugadas")
+    parser.add_argument("--mostrar", action="store_true", help="mostrar la grilla al final")
+    argumentos = parser.parse_args()
+    if argumentos.jugadas:
+        jugar_sin_interfaz(argumentos)
+    else:
+        jugar(argumentos.dificultad, argumentos.medidas)
+
 
-main()
+if __name__ == "__main__":
+    main()
 
     
         
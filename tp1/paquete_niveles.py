@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""Paquetes de niveles: un archivo binario con muchos niveles, que se lee
+con `mmap` decodificando sólo el nivel pedido.
+
+Formato (enteros little-endian):
+
+    Encabezado   "UNRP", versión (1 byte), 3 bytes de relleno,
+                 cantidad de tamaños T (4 bytes), huella (LARGO_HUELLA
+                 bytes: un hash blake2b de todo lo que sigue al encabezado)
+    Índice       T entradas de: ancho (2 bytes), alto (2 bytes),
+                 cantidad de niveles (4 bytes), posición del primer nivel
+                 en el archivo (8 bytes)
+    Niveles      los niveles de cada tamaño, uno detrás de otro, cada uno
+                 con 2 bits por casillero (ver `codificar_nivel`)
+
+La huella permite saber si un paquete cambió sin leerlo entero (ver
+`indice_niveles`). Los paquetes de la versión 1, sin huella, se siguen
+pudiendo leer.
+
+Uso como conversor de `niveles.NIVELES` (también escribe el índice del
+paquete, ver `indice_niveles`):
+
+    python paquete_niveles.py niveles.bin
+"""
+import bisect
+import hashlib
+import itertools
+import mmap
+import os
+import struct
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import niveles
+import unruly
+from unruly import Grilla
+
+FIRMA = b"UNRP"
+VERSION = 2
+LARGO_HUELLA = 16
+ENCABEZADO = struct.Struct(f"<4sB3xI{LARGO_HUELLA}s")
+_ENCABEZADO_VERSION_1 = struct.Struct("<4sB3xI")
+ENTRADA = struct.Struct("<HHIQ")
+# Bytes que se leen de una vez al recorrer los niveles de un tamaño
+BYTES_POR_TROZO = 1 << 20
+
+# Código de 2 bits de cada casillero: el bit 1 indica que está ocupado y el
+# bit 0 que está ocupado por un 1
+CODIGOS = {unruly.VACIO: 0b00, unruly.CERO: 0b10, unruly.UNO: 0b11}
+_TEXTO_A_CODIGOS = bytes.maketrans(
+    "".join(CODIGOS).encode("ascii"), bytes(CODIGOS.values())
+)
+_SIMBOLOS = {0b00: unruly.VACIO, 0b01: unruly.VACIO, 0b10: unruly.CERO, 0b11: unruly.UNO}
+_CODIGOS_A_TEXTO = bytes.maketrans(
+    bytes(_SIMBOLOS), "".join(_SIMBOLOS.values()).encode("ascii")
+)
+# Los cuatro casilleros que representa cada valor posible de un byte
+_BYTE_A_TEXTO = tuple(
+    "".join(_SIMBOLOS[(byte >> (2 * k)) & 0b11] for k in range(4))
+    for byte in range(256)
+)
+
+
+def bytes_por_nivel(ancho: int, alto: int) -> int:
+    """Devuelve cuántos bytes ocupa un nivel de `ancho` x `alto`."""
+    return (ancho * alto + 3) // 4
+
+
+@lru_cache(maxsize=8)
+def _mascaras(cantidad: int) -> Tuple[int, int, int]:
+    """Devuelve las máscaras que usan `codificar_casilleros` y
+    `decodificar_casilleros` para `cantidad` bytes codificados."""
+    return (
+        int.from_bytes(b"\x0f\x00" * (2 * cantidad), "little"),
+        int.from_bytes(b"\xff\x00\x00\x00" * cantidad, "little"),
+        int.from_bytes(b"\x03" * (4 * cantidad), "little"),
+    )
+
+
+def codificar_casilleros(texto: bytes) -> bytes:
+    """Codifica casilleros dados como texto ASCII ("1", "0" o " " cada uno)
+    con 2 bits por casillero, como `codificar_nivel`.
+
+    En lugar de recorrer los casilleros, trata los códigos como un único
+    entero con un casillero cada 8 bits y los junta con dos desplazamientos
+    y máscaras: primero de a pares (un casillero cada 4 bits dentro de cada
+    16) y después de a cuatro (un byte cada 32 bits)."""
+    cantidad = -(-len(texto) // 4)
+    codigos = texto.translate(_TEXTO_A_CODIGOS) + bytes(4 * cantidad - len(texto))
+    pares, octetos, _ = _mascaras(cantidad)
+    x = int.from_bytes(codigos, "little")
+    x = (x | x >> 6) & pares
+    x = (x | x >> 12) & octetos
+    return x.to_bytes(4 * cantidad, "little")[0::4]
+
+
+def decodificar_casilleros(datos: bytes, cantidad: int) -> bytes:
+    """Inversa de `codificar_casilleros`: devuelve los primeros `cantidad`
+    casilleros como texto ASCII, separando los bits de la misma forma."""
+    separados = bytearray(4 * len(datos))
+    separados[0::4] = datos
+    pares, _, casilleros = _mascaras(len(datos))
+    x = int.from_bytes(separados, "little")
+    x = (x | x << 12) & pares
+    x = (x | x << 6) & casilleros
+    return x.to_bytes(4 * len(datos), "little")[:cantidad].translate(_CODIGOS_A_TEXTO)
+
+
+def codificar_nivel(desc: List[str]) -> bytes:
+    """Codifica un nivel (en el formato de `niveles.NIVELES`) con 2 bits por
+    casillero, recorriendo las filas en orden y empezando por los bits menos
+    significativos de cada byte."""
+    return codificar_casilleros("".join(desc).encode("ascii"))
+
+
+def decodificar_nivel(datos: bytes, ancho: int, alto: int) -> List[str]:
+    """Inversa de `codificar_nivel`."""
+    texto = "".join([_BYTE_A_TEXTO[byte] for byte in datos])
+    return [texto[fil * ancho:(fil + 1) * ancho] for fil in range(alto)]
+
+
+def _escribir(ruta: str, cantidades: Dict[Tuple[int, int], int], bloques: Dict[Tuple[int, int], Iterable[bytes]]):
+    """Escribe en `ruta` un paquete con `cantidades[tamanio]` niveles de cada
+    tamaño, cuyos bytes (ya codificados) dan los trozos de
+    `bloques[tamanio]`. La huella se calcula mientras se escribe y el
+    encabezado se completa al final."""
+    tamanios = sorted(cantidades)
+    posicion = ENCABEZADO.size + ENTRADA.size * len(tamanios)
+    huella = hashlib.blake2b(digest_size=LARGO_HUELLA)
+    with open(ruta, "wb") as archivo:
+        archivo.write(bytes(ENCABEZADO.size))
+        for ancho, alto in tamanios:
+            entrada = ENTRADA.pack(ancho, alto, cantidades[ancho, alto], posicion)
+            huella.update(entrada)
+            archivo.write(entrada)
+            posicion += cantidades[ancho, alto] * bytes_por_nivel(ancho, alto)
+        for tamanio in tamanios:
+            for trozo in bloques[tamanio]:
+                huella.update(trozo)
+                archivo.write(trozo)
+        archivo.seek(0)
+        archivo.write(ENCABEZADO.pack(FIRMA, VERSION, len(tamanios), huella.digest()))
+
+
+def _codificar(descs: Iterable[List[str]]) -> Tuple[Dict[Tuple[int, int], bytearray], Dict[Tuple[int, int], int]]:
+    datos = {}
+    cantidades = {}
+    for desc in descs:
+        tamanio = (len(desc[0]), len(desc))
+        datos.setdefault(tamanio, bytearray()).extend(codificar_nivel(desc))
+        cantidades[tamanio] = cantidades.get(tamanio, 0) + 1
+    return datos, cantidades
+
+
+def escribir_paquete(ruta: str, descs: Iterable[List[str]]) -> Dict[Tuple[int, int], int]:
+    """Escribe un paquete con los niveles dados y devuelve cuántos niveles
+    quedaron de cada tamaño (ancho, alto). Dentro de cada tamaño los niveles
+    conservan el orden en que se recibieron. El paquete se escribe aparte y
+    reemplaza a `ruta` de una vez, así que nunca queda a medio escribir."""
+    datos, cantidades = _codificar(descs)
+    temporal = ruta + ".tmp"
+    _escribir(temporal, cantidades, {tamanio: [bloque] for tamanio, bloque in datos.items()})
+    os.replace(temporal, ruta)
+    return cantidades
+
+
+def agregar_al_paquete(ruta: str, descs: Iterable[List[str]]) -> Dict[Tuple[int, int], int]:
+    """Agrega los niveles dados al paquete `ruta` (o lo crea, si no existe),
+    cada uno después de los de su tamaño, así que los niveles anteriores
+    conservan su número dentro de su tamaño. Devuelve cuántos niveles
+    quedaron de cada tamaño.
+
+    Los niveles anteriores se copian ya codificados y de a trozos (ver
+    `PaqueteNiveles.trozos`), así que en memoria sólo quedan los nuevos. Como
+    en `escribir_paquete`, `ruta` se reemplaza de una vez al final."""
+    if not os.path.exists(ruta):
+        return escribir_paquete(ruta, descs)
+    nuevos, cantidades = _codificar(descs)
+    temporal = ruta + ".tmp"
+    with PaqueteNiveles(ruta) as paquete:
+        for tamanio in paquete.tamanios:
+            cantidades[tamanio] = cantidades.get(tamanio, 0) + paquete.cantidad(*tamanio)
+        bloques = {
+            tamanio: itertools.chain(paquete.trozos(*tamanio), [nuevos.get(tamanio, b"")])
+            for tamanio in cantidades
+        }
+        _escribir(temporal, cantidades, bloques)
+    os.replace(temporal, ruta)
+    return cantidades
+
+
+class PaqueteNiveles:
+    """Lector de un paquete de niveles. Al abrirlo sólo se lee el índice; cada
+    nivel se decodifica recién cuando se lo pide.
+
+    Se puede usar con `with`:
+
+    >>> with PaqueteNiveles("niveles.bin") as paquete:
+    ...     desc = paquete.nivel_al_azar(random)
+    """
+
+    def __init__(self, ruta: str):
+        self._archivo = open(ruta, "rb")
+        self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        firma, version, cantidad_tamanios = _ENCABEZADO_VERSION_1.unpack_from(self._mapa, 0)
+        if firma != FIRMA or version not in (1, VERSION):
+            self.cerrar()
+            raise ValueError(f"{ruta} no es un paquete de niveles válido")
+        # Huella del paquete (ver el formato), o None si es de la versión 1
+        self.huella: Optional[bytes] = None
+        encabezado = _ENCABEZADO_VERSION_1.size
+        if version == VERSION:
+            self.huella = ENCABEZADO.unpack_from(self._mapa, 0)[3]
+            encabezado = ENCABEZADO.size
+        self.tamanios = {}
+        self._acumulados = []
+        self._orden = []
+        total = 0
+        for i in range(cantidad_tamanios):
+            ancho, alto, cantidad, posicion = ENTRADA.unpack_from(
+                self._mapa, encabezado + i * ENTRADA.size
+            )
+            self.tamanios[ancho, alto] = (cantidad, posicion)
+            total += cantidad
+            self._acumulados.append(total)
+            self._orden.append((ancho, alto))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_excepcion):
+        self.cerrar()
+
+    def __len__(self) -> int:
+        return self._acumulados[-1] if self._acumulados else 0
+
+    def cerrar(self):
+        self._mapa.close()
+        self._archivo.close()
+
+    def cantidad(self, ancho: int, alto: int) -> int:
+        """Devuelve cuántos niveles de `ancho` x `alto` tiene el paquete."""
+        return self.tamanios.get((ancho, alto), (0, 0))[0]
+
+    def nivel(self, ancho: int, alto: int, numero: int) -> List[str]:
+        """Devuelve el nivel número `numero` de tamaño `ancho` x `alto`, en el
+        formato de `niveles.NIVELES`."""
+        cantidad, posicion = self.tamanios[ancho, alto]
+        if not 0 <= numero < cantidad:
+            raise IndexError(f"No hay nivel {numero} de {ancho}x{alto}")
+        tamanio = bytes_por_nivel(ancho, alto)
+        inicio = posicion + numero * tamanio
+        return decodificar_nivel(self._mapa[inicio:inicio + tamanio], ancho, alto)
+
+    def trozos(self, ancho: int, alto: int, desde: int = 0, hasta: Optional[int] = None) -> Iterator[bytes]:
+        """Devuelve, de a trozos de a lo sumo BYTES_POR_TROZO, los bytes
+        codificados de los niveles `desde` a `hasta` (sin incluirlo; por
+        defecto, hasta el último) de tamaño `ancho` x `alto`."""
+        cantidad, posicion = self.tamanios.get((ancho, alto), (0, 0))
+        tamanio = bytes_por_nivel(ancho, alto)
+        inicio = posicion + desde * tamanio
+        fin = posicion + (cantidad if hasta is None else hasta) * tamanio
+        for trozo in range(inicio, fin, BYTES_POR_TROZO):
+            yield self._mapa[trozo:min(trozo + BYTES_POR_TROZO, fin)]
+
+    def indice_de(self, ancho: int, alto: int, numero: int) -> int:
+        """Inversa de `nivel_por_indice`: devuelve el índice del nivel número
+        `numero` de tamaño `ancho` x `alto`."""
+        i = self._orden.index((ancho, alto))
+        return (self._acumulados[i - 1] if i else 0) + numero
+
+    def nivel_por_indice(self, indice: int) -> List[str]:
+        """Devuelve el nivel número `indice` contando todos los tamaños en el
+        orden del índice del paquete."""
+        i = bisect.bisect_right(self._acumulados, indice)
+        anterior = self._acumulados[i - 1] if i else 0
+        ancho, alto = self._orden[i]
+        return self.nivel(ancho, alto, indice - anterior)
+
+    def nivel_al_azar(self, azar) -> List[str]:
+        """Elige un nivel al azar entre todos los del paquete usando `azar`
+        (el módulo `random` o un `random.Random`)."""
+        return self.nivel_por_indice(azar.randrange(len(self)))
+
+    def grilla(self, ancho: int, alto: int, numero: int, representacion: str = unruly.LISTAS) -> Grilla:
+        """Devuelve el nivel pedido como grilla (ver `unruly.crear_grilla`)."""
+        return unruly.crear_grilla(self.nivel(ancho, alto, numero), representacion)
+
+
+def main():
+    ruta = sys.argv[1] if len(sys.argv) > 1 else "niveles.bin"
+    # Se importa acá porque indice_niveles usa este módulo
+    import indice_niveles
+
+    cantidades = escribir_paquete(ruta, niveles.NIVELES)
+    for (ancho, alto), cantidad in sorted(cantidades.items()):
+        print(f"{ancho}x{alto}: {cantidad} niveles")
+    print(f"Paquete escrito en {ruta}")
+    ruta_indice = indice_niveles.ruta_de_indice(ruta)
+    indice_niveles.indexar(ruta, ruta_indice)
+    print(f"Índice por tamaño y dificultad escrito en {ruta_indice}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Guardado y carga de partidas en curso.
+
+Formato (enteros little-endian):
+
+    Encabezado   "UNRG", versión (1 byte), 3 bytes de relleno, ancho
+                 (4 bytes), alto (4 bytes), número de nivel (4 bytes, con
+                 signo; -1 si no se sabe de qué nivel salió la partida),
+                 cantidad de jugadas hechas (4 bytes)
+    Casilleros   2 bits por casillero, como en los paquetes de niveles (ver
+                 `paquete_niveles.codificar_casilleros`)
+
+Tanto al guardar como al cargar los casilleros se convierten todos juntos,
+sin recorrerlos uno por uno en Python."""
+import struct
+from typing import NamedTuple
+
+import paquete_niveles
+import unruly
+from unruly import Grilla
+
+FIRMA = b"UNRG"
+VERSION = 1
+ENCABEZADO = struct.Struct("<4sB3xIIiI")
+SIN_NIVEL = -1
+
+
+class Partida(NamedTuple):
+    """Una partida en curso: la grilla, el número del nivel del que salió
+    (o SIN_NIVEL) y la cantidad de jugadas hechas."""
+    grilla: Grilla
+    nivel: int = SIN_NIVEL
+    jugadas: int = 0
+
+
+def partida_a_bytes(grilla: Grilla, nivel: int = SIN_NIVEL, jugadas: int = 0) -> bytes:
+    """Devuelve la partida codificada en el formato del módulo."""
+    ancho, alto = unruly.dimensiones(grilla)
+    texto = "".join(["".join(grilla[fil]) for fil in range(alto)])
+    return (
+        ENCABEZADO.pack(FIRMA, VERSION, ancho, alto, nivel, jugadas)
+        + paquete_niveles.codificar_casilleros(texto.encode("ascii"))
+    )
+
+
+def partida_desde_bytes(datos: bytes, representacion: str = unruly.LISTAS) -> Partida:
+    """Inversa de `partida_a_bytes`. La grilla se crea con la representación
+    pedida (ver `unruly.crear_grilla`)."""
+    if len(datos) < ENCABEZADO.size:
+        raise ValueError("Los datos no son una partida guardada")
+    firma, version, ancho, alto, nivel, jugadas = ENCABEZADO.unpack_from(datos)
+    casilleros = memoryview(datos)[ENCABEZADO.size:]
+    if firma != FIRMA or version != VERSION:
+        raise ValueError("Los datos no son una partida guardada")
+    if len(casilleros) != paquete_niveles.bytes_por_nivel(ancho, alto):
+        raise ValueError(f"Una partida de {ancho}x{alto} no puede tener {len(casilleros)} bytes")
+    texto = paquete_niveles.decodificar_casilleros(casilleros, ancho * alto).decode("ascii")
+    filas = [texto[fil * ancho:(fil + 1) * ancho] for fil in range(alto)]
+    return Partida(unruly.crear_grilla(filas, representacion), nivel, jugadas)
+
+
+def guardar_partida(ruta: str, grilla: Grilla, nivel: int = SIN_NIVEL, jugadas: int = 0):
+    """Guarda la partida en el archivo `ruta`."""
+    datos = partida_a_bytes(grilla, nivel, jugadas)
+    with open(ruta, "wb") as archivo:
+        archivo.write(datos)
+
+
+def cargar_partida(ruta: str, representacion: str = unruly.LISTAS) -> Partida:
+    """Carga una partida guardada con `guardar_partida`."""
+    with open(ruta, "rb") as archivo:
+        return partida_desde_bytes(archivo.read(), representacion)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Pistas para el jugador: casilleros vacíos cuyo valor está forzado por las
+reglas, junto con la regla que lo fuerza.
+
+Cada línea se analiza por separado con las mismas deducciones que usa
+`resolvedor.deducir_linea`. Un `MotorPistas` guarda la pista de cada línea
+y, después de un cambio, vuelve a analizar sólo la fila y la columna del
+casillero cambiado, así que pedir una pista luego de cada jugada no recorre
+la grilla entera."""
+import weakref
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import resolvedor
+import unruly
+from resolvedor import LIBRE
+from unruly import Grilla
+
+# Reglas, de la más sencilla a la más difícil de ver (las tres primeras son
+# las de `resolvedor.reglas_de_linea`)
+PAR = resolvedor.PAR
+HUECO = resolvedor.HUECO
+CUOTA = resolvedor.CUOTA
+LINEA = "linea"
+DESCRIPCION_REGLAS = {
+    PAR: "al lado de dos casilleros iguales va el valor opuesto",
+    HUECO: "entre dos casilleros iguales va el valor opuesto",
+    CUOTA: "la línea ya tiene la mitad de casilleros con el otro valor",
+    LINEA: "es el único valor con el que la línea se puede completar",
+}
+_PRIORIDAD = {PAR: 0, HUECO: 1, CUOTA: 2, LINEA: 3}
+
+
+class Pista(NamedTuple):
+    """Casillero (col, fil) que debe llevar `valor` según `regla`."""
+    col: int
+    fil: int
+    valor: str
+    regla: str
+
+
+def pista_de_linea(valores: Tuple[int, ...]) -> Optional[Tuple[int, int, str]]:
+    """Devuelve (posición, valor, regla) de un casillero forzado de la línea,
+    con valores 1, 0 o LIBRE, eligiendo la regla más sencilla que fuerce
+    alguno. Devuelve None si no hay casilleros forzados o si la línea ya no
+    tiene solución (en ese caso ninguna pista sería correcta)."""
+    reglas = resolvedor.reglas_de_linea(valores)
+    if reglas.contradiccion is not None:
+        return None
+    for regla, forzados in ((PAR, reglas.pares), (HUECO, reglas.huecos), (CUOTA, reglas.cuota)):
+        for posicion, valor in forzados.items():
+            return posicion, valor, regla
+    if LIBRE not in valores:
+        return None
+    posibles = resolvedor.valores_posibles(valores)
+    if posibles is None:
+        return None
+    for i, valor in enumerate(valores):
+        if valor == LIBRE and posibles[i] != 0b11:
+            return i, posibles[i] >> 1, LINEA
+    return None
+
+
+class MotorPistas:
+    """Mantiene la pista de cada línea de una grilla de `ancho` x `alto`.
+
+    Hay que avisarle cada cambio con `avisar_cambio`; para una
+    `unruly.GrillaIncremental` se puede usar `MotorPistas.de_grilla`, que se
+    suscribe a sus cambios. Las líneas cambiadas quedan pendientes hasta el
+    siguiente pedido de `pista`."""
+
+    def __init__(self, grilla: Grilla):
+        self.celdas, self.ancho, self.alto = resolvedor.celdas_desde_grilla(grilla)
+        self.lineas = resolvedor.geometria(self.ancho, self.alto)[0]
+        self.pendientes = set(range(self.alto + self.ancho))
+        self.pistas: Dict[int, Pista] = {}
+
+    @classmethod
+    def de_grilla(cls, grilla: unruly.GrillaIncremental) -> "MotorPistas":
+        """Crea un motor que se entera solo de los cambios de `grilla`."""
+        motor = cls(grilla)
+        grilla.observadores.append(motor.avisar_cambio)
+        return motor
+
+    def avisar_cambio(self, col: int, fil: int, _anterior: str, valor: str):
+        """Registra que en (col, fil) ahora está `valor` y deja pendientes la
+        fila y la columna del casillero."""
+        self.celdas[fil * self.ancho + col] = resolvedor.VALORES[valor]
+        self.pendientes.add(fil)
+        self.pendientes.add(self.alto + col)
+
+    def _analizar(self, linea: int):
+        celdas = self.celdas
+        indices = self.lineas[linea]
+        encontrada = pista_de_linea(tuple([celdas[i] for i in indices]))
+        if encontrada is None:
+            self.pistas.pop(linea, None)
+            return
+        posicion, valor, regla = encontrada
+        indice = indices[posicion]
+        self.pistas[linea] = Pista(
+            indice % self.ancho, indice // self.ancho, resolvedor.SIMBOLOS[valor], regla
+        )
+
+    def pista(self) -> Optional[Pista]:
+        """Devuelve la pista con la regla más sencilla entre las de todas las
+        líneas, o None si ninguna línea tiene casilleros forzados."""
+        for linea in self.pendientes:
+            self._analizar(linea)
+        self.pendientes.clear()
+        if not self.pistas:
+            return None
+        return min(self.pistas.values(), key=lambda pista: _PRIORIDAD[pista.regla])
+
+
+# Motor de cada GrillaIncremental que pidió pistas con `pista`. El motor no
+# guarda referencias a la grilla, así que la entrada desaparece con ella.
+_MOTORES = weakref.WeakKeyDictionary()
+
+
+def pista(grilla: Grilla) -> Optional[Pista]:
+    """Devuelve un casillero vacío cuyo valor está forzado por las reglas
+    (ver `Pista`), o None si no se encuentra ninguno mirando cada línea por
+    separado.
+
+    Para una `unruly.GrillaIncremental` se usa un motor que queda asociado a
+    la grilla, así que las llamadas siguientes sólo vuelven a analizar las
+    líneas que cambiaron; para las demás representaciones se analiza toda la
+    grilla."""
+    if not isinstance(grilla, unruly.GrillaIncremental):
+        return MotorPistas(grilla).pista()
+    motor = _MOTORES.get(grilla)
+    if motor is None:
+        motor = _MOTORES[grilla] = MotorPistas.de_grilla(grilla)
+    return motor.pista()
@@ -0,0 +1,529 @@
+# -*- coding: utf-8 -*-
+"""Resolución de grillas de Unruly por propagación de restricciones, con
+búsqueda con retroceso cuando la propagación no alcanza.
+
+Internamente la grilla se representa como una lista plana de casilleros
+(`celdas`), donde el casillero (col, fil) está en la posición
+`fil * ancho + col` y vale 1, 0 o LIBRE."""
+import random
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import unruly
+from unruly import Grilla
+
+LIBRE = -1
+# Nodos por casillero del primer intento de búsqueda (ver `resolver_celdas`)
+NODOS_POR_CASILLERO = 0.5
+# Cada cuántos nodos las búsquedas preguntan si se las debe detener
+NODOS_POR_CONSULTA = 256
+# Hasta este límite, `contar_soluciones` busca las soluciones una por una en
+# lugar de contarlas fila por fila
+LIMITE_ENUMERABLE = 16
+
+# Reglas sencillas de una línea (ver `reglas_de_linea`), y formas en que
+# una línea puede contradecirlas
+PAR = "par"
+HUECO = "hueco"
+CUOTA = "cuota"
+TERNA = "terna"
+OPUESTOS = "opuestos"
+
+# Valor de cada casillero de una grilla en `celdas`, y viceversa
+VALORES = {unruly.UNO: 1, unruly.CERO: 0, unruly.VACIO: LIBRE}
+SIMBOLOS = {1: unruly.UNO, 0: unruly.CERO, LIBRE: unruly.VACIO}
+
+Celdas = List[int]
+Geometria = Tuple[Tuple[Tuple[int, ...], ...], Tuple[Tuple[int, int], ...]]
+
+
+def celdas_desde_grilla(grilla: Grilla) -> Tuple[Celdas, int, int]:
+    """Devuelve los casilleros de `grilla` como lista plana, junto con su
+    ancho y alto."""
+    ancho, alto = unruly.dimensiones(grilla)
+    celdas = []
+    for fil in range(alto):
+        for col in range(ancho):
+            if unruly.posicion_hay_uno(grilla, col, fil):
+                celdas.append(1)
+            elif unruly.posicion_hay_cero(grilla, col, fil):
+                celdas.append(0)
+            else:
+                celdas.append(LIBRE)
+    return celdas, ancho, alto
+
+
+def grilla_desde_celdas(celdas: Celdas, ancho: int, alto: int) -> Grilla:
+    """Construye una grilla (representación de listas) a partir de una lista
+    plana de casilleros."""
+    return [
+        [SIMBOLOS[celdas[fil * ancho + col]] for col in range(ancho)]
+        for fil in range(alto)
+    ]
+
+
+@lru_cache(maxsize=32)
+def geometria(ancho: int, alto: int) -> Geometria:
+    """Devuelve las líneas de una grilla de `ancho` x `alto` y, para cada
+    casillero, las dos líneas que lo contienen.
+
+    Las líneas son tuplas de índices de casilleros: primero las `alto` filas
+    y después las `ancho` columnas."""
+    filas = tuple(
+        tuple(range(fil * ancho, (fil + 1) * ancho)) for fil in range(alto)
+    )
+    columnas = tuple(
+        tuple(range(col, ancho * alto, ancho)) for col in range(ancho)
+    )
+    lineas_de_celda = tuple(
+        (indice // ancho, alto + indice % ancho) for indice in range(ancho * alto)
+    )
+    return filas + columnas, lineas_de_celda
+
+
+class ReglasDeLinea(NamedTuple):
+    """Casilleros vacíos de una línea forzados por cada regla sencilla, como
+    diccionarios {posición: valor} en el orden de la línea (ver
+    `reglas_de_linea`). `contradiccion` es None, o CUOTA, TERNA u OPUESTOS si
+    la línea ya no tiene solución; en ese caso los forzados no valen nada."""
+    pares: Dict[int, int]
+    huecos: Dict[int, int]
+    cuota: Dict[int, int]
+    contradiccion: Optional[str]
+
+
+def reglas_de_linea(valores: Tuple[int, ...]) -> ReglasDeLinea:
+    """Aplica a una línea (con valores 1, 0 o LIBRE) las reglas sencillas de
+    Unruly, que son las que usan el resolvedor, las pistas, la detección de
+    callejones sin salida y la calificación de dificultad:
+
+        PAR     al lado de dos casilleros iguales va el valor opuesto
+        HUECO   entre dos casilleros iguales va el valor opuesto
+        CUOTA   si la línea ya tiene la mitad de unos (o de ceros), los vacíos
+                llevan el otro valor
+
+    La línea se contradice (ver `ReglasDeLinea`) si tiene más de la mitad de
+    unos o de ceros (CUOTA), tres casilleros iguales seguidos (TERNA), o dos
+    reglas fuerzan valores opuestos en un casillero (OPUESTOS)."""
+    largo = len(valores)
+    mitad = largo // 2
+    unos = valores.count(1)
+    ceros = valores.count(0)
+    if unos > mitad or ceros > mitad:
+        return ReglasDeLinea({}, {}, {}, CUOTA)
+    pares = {}
+    huecos = {}
+    contradiccion = None
+    for i in range(largo - 2):
+        a, b, c = valores[i], valores[i + 1], valores[i + 2]
+        if a == b == c:
+            if a != LIBRE:
+                return ReglasDeLinea({}, {}, {}, TERNA)
+            continue
+        if a == LIBRE and b == c:
+            forzados, posicion, valor = pares, i, 1 - b
+        elif c == LIBRE and a == b:
+            forzados, posicion, valor = pares, i + 2, 1 - a
+        elif b == LIBRE and a == c:
+            forzados, posicion, valor = huecos, i + 1, 1 - a
+        else:
+            continue
+        if pares.get(posicion, valor) != valor or huecos.get(posicion, valor) != valor:
+            contradiccion = OPUESTOS
+        forzados.setdefault(posicion, valor)
+    cuota = {}
+    if LIBRE in valores and (unos == mitad or ceros == mitad):
+        relleno = 0 if unos == mitad else 1
+        cuota = {i: relleno for i, valor in enumerate(valores) if valor == LIBRE}
+        if relleno ^ 1 in pares.values() or relleno ^ 1 in huecos.values():
+            contradiccion = OPUESTOS
+    return ReglasDeLinea(pares, huecos, cuota, contradiccion)
+
+
+def deducir_linea(celdas: Celdas, linea: Tuple[int, ...]) -> Optional[Dict[int, int]]:
+    """Aplica las deducciones de Unruly a una línea y devuelve los casilleros
+    forzados como diccionario {índice: valor}, o None si la línea ya no tiene
+    solución.
+
+    Primero se aplican las reglas sencillas (ver `reglas_de_linea`). Si no
+    fuerzan nada, se buscan los casilleros que tienen el mismo valor en todas
+    las formas válidas de completar la línea (ver `valores_posibles`)."""
+    valores = tuple([celdas[i] for i in linea])
+    reglas = reglas_de_linea(valores)
+    if reglas.contradiccion is not None:
+        return None
+    forzados = {}
+    for forzados_por_regla in reglas[:3]:
+        for posicion, valor in forzados_por_regla.items():
+            forzados[linea[posicion]] = valor
+    if forzados or LIBRE not in valores:
+        return forzados
+    posibles = valores_posibles(valores)
+    if posibles is None:
+        return None
+    for i, valor in enumerate(valores):
+        if valor == LIBRE and posibles[i] != 0b11:
+            forzados[linea[i]] = posibles[i] >> 1
+    return forzados
+
+
+@lru_cache(maxsize=32)
+def _cantidades_validas(largo: int) -> Tuple[int, ...]:
+    """Devuelve, para cada j de 0 a `largo`, una máscara de bits con las
+    cantidades de unos que puede tener una línea de `largo` casilleros luego
+    de sus primeros j casilleros sin pasarse de la mitad de unos ni de
+    ceros."""
+    mitad = largo // 2
+    return tuple(
+        ((1 << (min(j, mitad) + 1)) - 1) & ~((1 << max(0, j - mitad)) - 1)
+        for j in range(largo + 1)
+    )
+
+
+@lru_cache(maxsize=65536)
+def valores_posibles(valores: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+    """Devuelve, para cada casillero de la línea, una máscara con los valores
+    que toma en alguna forma válida de completarla (bit 0: el valor 0,
+    bit 1: el valor 1), o None si la línea no se puede completar.
+
+    Recorre la línea hacia adelante guardando, para cada par de últimos
+    valores, una máscara de bits con las cantidades de unos alcanzables; luego
+    la recorre hacia atrás quedándose sólo con los estados desde los que se
+    llega al final con la mitad de unos. Los resultados se guardan en un
+    caché, ya que durante la búsqueda las mismas líneas se repiten mucho."""
+    largo = len(valores)
+    mitad = largo // 2
+    validos = _cantidades_validas(largo)
+    capas = [{(LIBRE, LIBRE): 1}]
+    for i, valor in enumerate(valores):
+        opciones = (0, 1) if valor == LIBRE else (valor,)
+        siguiente = {}
+        for (penultimo, ultimo), cantidades in capas[-1].items():
+            for x in opciones:
+                if penultimo == ultimo == x:
+                    continue
+                nuevas = (cantidades << x) & validos[i + 1]
+                if nuevas:
+                    siguiente[ultimo, x] = siguiente.get((ultimo, x), 0) | nuevas
+        if not siguiente:
+            return None
+        capas.append(siguiente)
+    posibles = [0] * largo
+    finales = {patron: 1 << mitad for patron in capas[largo]}
+    for i in range(largo - 1, -1, -1):
+        opciones = (0, 1) if valores[i] == LIBRE else (valores[i],)
+        previos = {}
+        for (penultimo, ultimo), cantidades in capas[i].items():
+            alcanzan = 0
+            for x in opciones:
+                if penultimo == ultimo == x:
+                    continue
+                llegan = finales.get((ultimo, x), 0) >> x
+                if cantidades & llegan:
+                    posibles[i] |= 1 << x
+                alcanzan |= llegan
+            previos[penultimo, ultimo] = alcanzan
+        finales = previos
+    if not posibles[0]:
+        return None
+    return tuple(posibles)
+
+
+def linea_completable(valores: Tuple[int, ...]) -> bool:
+    """Indica si la línea se puede completar de alguna forma válida. Hace
+    sólo la recorrida hacia adelante de `valores_posibles`: como en el último
+    casillero la única cantidad de unos válida es la mitad, alcanza con que
+    quede algún estado."""
+    validos = _cantidades_validas(len(valores))
+    estados = {(LIBRE, LIBRE): 1}
+    for i, valor in enumerate(valores):
+        opciones = (0, 1) if valor == LIBRE else (valor,)
+        siguiente = {}
+        for (penultimo, ultimo), cantidades in estados.items():
+            for x in opciones:
+                if penultimo == ultimo == x:
+                    continue
+                nuevas = (cantidades << x) & validos[i + 1]
+                if nuevas:
+                    siguiente[ultimo, x] = siguiente.get((ultimo, x), 0) | nuevas
+        if not siguiente:
+            return False
+        estados = siguiente
+    return True
+
+
+def propagar(celdas: Celdas, ancho: int, alto: int, pendientes: Set[int]) -> bool:
+    """Aplica `deducir_linea` a las líneas pendientes, encolando las líneas de
+    cada casillero que se completa, hasta que no haya más deducciones.
+
+    Modifica `celdas` y devuelve False si se encontró una contradicción."""
+    lineas, lineas_de_celda = geometria(ancho, alto)
+    while pendientes:
+        forzados = deducir_linea(celdas, lineas[pendientes.pop()])
+        if forzados is None:
+            return False
+        for indice, valor in forzados.items():
+            if celdas[indice] == LIBRE:
+                celdas[indice] = valor
+                pendientes.update(lineas_de_celda[indice])
+            elif celdas[indice] != valor:
+                return False
+    return True
+
+
+def celda_mas_restringida(
+    celdas: Celdas, ancho: int, alto: int, azar: Optional[random.Random] = None
+) -> Optional[int]:
+    """Devuelve el índice del casillero vacío cuya fila y columna tienen menos
+    vacíos en total, o None si la grilla está completa. Si se pasa `azar`,
+    los empates se desempatan al azar; si no, gana el primero."""
+    vacios_fila = [0] * alto
+    vacios_columna = [0] * ancho
+    libres = [indice for indice, valor in enumerate(celdas) if valor == LIBRE]
+    if not libres:
+        return None
+    for indice in libres:
+        vacios_fila[indice // ancho] += 1
+        vacios_columna[indice % ancho] += 1
+    menor = ancho + alto + 1
+    mejores = []
+    for indice in libres:
+        vacios = vacios_fila[indice // ancho] + vacios_columna[indice % ancho]
+        if vacios < menor:
+            menor = vacios
+            mejores = [indice]
+        elif vacios == menor:
+            mejores.append(indice)
+    if azar is None:
+        return mejores[0]
+    return azar.choice(mejores)
+
+
+def buscar(
+    celdas: Celdas,
+    ancho: int,
+    alto: int,
+    limite: int,
+    azar: Optional[random.Random] = None,
+    detener: Optional[Callable[[], bool]] = None,
+) -> Tuple[Optional[Celdas], bool]:
+    """Búsqueda con retroceso sobre `celdas` (que no se modifica), propagando
+    en cada paso y visitando a lo sumo `limite` nodos. Sin `azar` se prueba
+    primero el 0 en el primer casillero más restringido; con `azar` se
+    desempatan ambas elecciones al azar. Si se pasa `detener`, se la llama
+    cada NODOS_POR_CONSULTA nodos y la búsqueda se corta si devuelve True.
+
+    Devuelve la solución encontrada (o None) y un booleano que indica si la
+    búsqueda se completó; si es False se cortó por llegar al límite o porque
+    `detener` lo pidió."""
+    _lineas, lineas_de_celda = geometria(ancho, alto)
+    pila = [(list(celdas), set(range(ancho + alto)))]
+    nodos = 0
+    while pila:
+        nodos += 1
+        if nodos > limite:
+            return None, False
+        if detener is not None and nodos % NODOS_POR_CONSULTA == 0 and detener():
+            return None, False
+        actuales, pendientes = pila.pop()
+        if not propagar(actuales, ancho, alto, pendientes):
+            continue
+        indice = celda_mas_restringida(actuales, ancho, alto, azar)
+        if indice is None:
+            return actuales, True
+        valores = [1, 0]
+        if azar is not None:
+            azar.shuffle(valores)
+        for valor in valores:
+            rama = list(actuales)
+            rama[indice] = valor
+            pila.append((rama, set(lineas_de_celda[indice])))
+    return None, True
+
+
+def resolver_celdas(
+    celdas: Celdas,
+    ancho: int,
+    alto: int,
+    azar: Optional[random.Random] = None,
+    detener: Optional[Callable[[], bool]] = None,
+) -> Optional[Celdas]:
+    """Devuelve una solución para los casilleros dados, o None si no existe
+    (o si `detener` devolvió True, ver `buscar`). No modifica `celdas`.
+
+    La búsqueda se reinicia con un límite de nodos cada vez mayor (y otro
+    orden de desempates), para no quedar atrapada explorando una mala
+    decisión temprana. Si no se pasa `azar`, el primer intento no usa azar y
+    los siguientes usan semillas fijas, así que el resultado es reproducible;
+    si se pasa, todos los intentos lo usan (por ejemplo, para obtener
+    soluciones distintas de una grilla vacía)."""
+    limite = max(1, int(ancho * alto * NODOS_POR_CASILLERO))
+    while True:
+        solucion, completa = buscar(celdas, ancho, alto, limite, azar, detener)
+        if completa or solucion is not None:
+            return solucion
+        if detener is not None and detener():
+            return None
+        if azar is None:
+            azar = random.Random(limite)
+        limite *= 2
+
+
+def enumerar_soluciones(
+    celdas: Celdas,
+    ancho: int,
+    alto: int,
+    maximo: int,
+    detener: Optional[Callable[[], bool]] = None,
+) -> List[Celdas]:
+    """Devuelve hasta `maximo` soluciones distintas de los casilleros dados,
+    recorriendo todo el árbol de búsqueda si hace falta (sin reinicios, ya
+    que para saber que no hay más hay que verlo entero). `detener` es como
+    en `buscar`; si corta la búsqueda, las soluciones pueden ser menos."""
+    _lineas, lineas_de_celda = geometria(ancho, alto)
+    soluciones = []
+    pila = [(list(celdas), set(range(ancho + alto)))]
+    nodos = 0
+    while pila and len(soluciones) < maximo:
+        nodos += 1
+        if detener is not None and nodos % NODOS_POR_CONSULTA == 0 and detener():
+            break
+        actuales, pendientes = pila.pop()
+        if not propagar(actuales, ancho, alto, pendientes):
+            continue
+        indice = celda_mas_restringida(actuales, ancho, alto)
+        if indice is None:
+            soluciones.append(actuales)
+            continue
+        for valor in (1, 0):
+            rama = list(actuales)
+            rama[indice] = valor
+            pila.append((rama, set(lineas_de_celda[indice])))
+    return soluciones
+
+
+def resolver(grilla: Grilla) -> Optional[Grilla]:
+    """Devuelve una nueva grilla (representación de listas) con una solución
+    de `grilla`, o None si la grilla no tiene solución.
+
+    Primero se aplican las deducciones de `deducir_linea` a todas las filas
+    y columnas hasta que no haya cambios; sólo si quedan vacíos se prueba un
+    valor en el casillero más restringido y se vuelve a propagar."""
+    celdas, ancho, alto = celdas_desde_grilla(grilla)
+    solucion = resolver_celdas(celdas, ancho, alto)
+    if solucion is None:
+        return None
+    return grilla_desde_celdas(solucion, ancho, alto)
+
+
+def contar_soluciones(grilla: Grilla, limite: Optional[int] = None) -> int:
+    """Devuelve la cantidad de soluciones de `grilla`. Si se da `limite`, la
+    cuenta se detiene al llegar a ese valor (por ejemplo, `limite=2` alcanza
+    para saber si la solución es única).
+
+    Primero se propaga (ver `propagar`). Con un `limite` de a lo sumo
+    LIMITE_ENUMERABLE, alcanza con buscar esas soluciones (ver
+    `enumerar_soluciones`), que en niveles reales es mucho más rápido que
+    contarlas todas.
+
+    Si no, se recorre la grilla fila por fila eligiendo, para cada una, una
+    de las líneas válidas compatibles con sus casilleros ya deducidos (ver
+    `unruly.completar_linea`). El estado de cada fila es el de todas las
+    columnas: la cantidad de unos de cada una (empaquetada en un único
+    entero, un campo de bits por columna) y las dos últimas filas elegidas,
+    que alcanzan para detectar tres casilleros iguales seguidos en una
+    columna. Las cantidades se acotan con los unos y ceros ya deducidos de
+    las filas que faltan, y la cantidad de formas de llegar a cada estado se
+    lleva capa por capa, así que no hay recursión.
+
+    Si la grilla es más ancha que alta se cuenta sobre la grilla transpuesta,
+    que tiene las mismas soluciones y menos líneas posibles por fila. Para
+    contar sin `limite` (o con uno mayor a LIMITE_ENUMERABLE), el lado más
+    corto no puede superar `unruly.LARGO_MAXIMO_TABLA`."""
+    celdas, ancho, alto = celdas_desde_grilla(grilla)
+    if ancho % 2 or alto % 2:
+        return 0
+    if not propagar(celdas, ancho, alto, set(range(ancho + alto))):
+        return 0
+    if LIBRE not in celdas:
+        return 1
+    if limite is not None and limite <= LIMITE_ENUMERABLE:
+        return len(enumerar_soluciones(celdas, ancho, alto, limite))
+    if ancho > alto:
+        celdas = [celdas[fil * ancho + col] for col in range(ancho) for fil in range(alto)]
+        ancho, alto = alto, ancho
+    if ancho > unruly.LARGO_MAXIMO_TABLA:
+        raise ValueError(
+            f"No se pueden contar soluciones de grillas de más de "
+            f"{unruly.LARGO_MAXIMO_TABLA} casilleros de lado corto"
+        )
+
+    candidatos = []
+    for fil in range(alto):
+        unos = llenos = 0
+        for col in range(ancho):
+            valor = celdas[fil * ancho + col]
+            if valor != LIBRE:
+                llenos |= 1 << col
+                unos |= valor << col
+        candidatos.append(unruly.completar_linea(ancho, unos, llenos))
+
+    mitad = alto // 2
+    bits = alto.bit_length() + 1
+    altos = sum(1 << (col * bits + bits - 1) for col in range(ancho))
+    todos = (1 << ancho) - 1
+    # Después de elegir la fila `fil`, la columna `col` necesita a lo sumo
+    # mitad - (unos deducidos debajo) unos y al menos mitad - (casilleros
+    # debajo que no son ceros deducidos). Sumar topes[fil] prende el bit alto
+    # de un campo sólo si pasa del máximo; restar minimos[fil] lo apaga sólo
+    # si no llega al mínimo.
+    topes = []
+    minimos = []
+    unos_debajo = [0] * ancho
+    no_ceros_debajo = [0] * ancho
+    for fil in range(alto - 1, -1, -1):
+        topes.append(sum(
+            ((1 << (bits - 1)) - 1 - (mitad - unos_debajo[col])) << (col * bits) for col in range(ancho)
+        ))
+        minimos.append(sum(
+            max(0, mitad - no_ceros_debajo[col]) << (col * bits) for col in range(ancho)
+        ))
+        for col in range(ancho):
+            valor = celdas[fil * ancho + col]
+            unos_debajo[col] += valor == 1
+            no_ceros_debajo[col] += valor != 0
+    topes.reverse()
+    minimos.reverse()
+    expandidas = {}
+    for fila in candidatos:
+        for linea in fila:
+            if linea not in expandidas:
+                expandidas[linea] = sum(
+                    1 << (col * bits) for col in range(ancho) if linea >> col & 1
+                )
+
+    # Cantidad de formas (hasta `limite`) de llegar a cada estado
+    # (penúltima fila, última fila, cantidades de unos)
+    estados = {(0, 0, 0): 1}
+    for fil in range(alto):
+        tope = topes[fil]
+        minimo = altos - minimos[fil]
+        siguientes = {}
+        for (penultima, ultima, cantidades), formas in estados.items():
+            for linea in candidatos[fil]:
+                if fil >= 2 and (
+                    linea & ultima & penultima
+                    or ~(linea | ultima | penultima) & todos
+                ):
+                    continue
+                nuevas = cantidades + expandidas[linea]
+                if (nuevas + tope) & altos or (nuevas + minimo) & altos != altos:
+                    continue
+                clave = (ultima, linea, nuevas)
+                total = siguientes.get(clave, 0) + formas
+                siguientes[clave] = total if limite is None else min(total, limite)
+        if not siguientes:
+            return 0
+        estados = siguientes
+    total = sum(estados.values())
+    return total if limite is None else min(total, limite)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Resolución de grillas grandes repartiendo la búsqueda entre procesos.
+
+Primero se propagan todas las líneas (ver `resolvedor.propagar`). Después
+se ramifica en los casilleros más restringidos, propagando cada rama, hasta
+tener unos SUBPROBLEMAS_POR_PROCESO subproblemas por proceso: grillas
+disjuntas entre sí (difieren en algún casillero elegido) cuyas soluciones
+son, en conjunto, las de la grilla original.
+
+Los subproblemas se envían a un `concurrent.futures.ProcessPoolExecutor`.
+Como hay varios por proceso, el que termina los suyos toma el siguiente de
+la cola, así que los procesos no quedan ociosos mientras otros tienen
+subproblemas difíciles. Apenas se juntan las soluciones pedidas (una para
+resolver, dos para saber si la solución es única) se cancelan los
+subproblemas que no empezaron y se avisa a los que están corriendo, que lo
+consultan cada `resolvedor.NODOS_POR_CONSULTA` nodos y terminan."""
+import collections
+import concurrent.futures
+import multiprocessing
+from typing import List, Optional, Tuple
+
+import resolvedor
+from resolvedor import Celdas
+from unruly import Grilla
+
+SUBPROBLEMAS_POR_PROCESO = 8
+
+# Evento compartido con el que se avisa a los procesos que dejen de buscar
+_detenido = None
+
+
+def dividir(celdas: Celdas, ancho: int, alto: int, cantidad: int) -> Tuple[List[Celdas], List[Celdas]]:
+    """Propaga `celdas` (que no se modifica) y la divide en al menos
+    `cantidad` subproblemas si se puede. Devuelve los subproblemas y las
+    soluciones que se encontraron al dividir, ambos en el orden en que los
+    visitaría `resolvedor.buscar`."""
+    _lineas, lineas_de_celda = resolvedor.geometria(ancho, alto)
+    inicial = list(celdas)
+    if not resolvedor.propagar(inicial, ancho, alto, set(range(ancho + alto))):
+        return [], []
+    frontera = collections.deque([inicial])
+    soluciones = []
+    while frontera and len(frontera) < cantidad:
+        actuales = frontera.popleft()
+        indice = resolvedor.celda_mas_restringida(actuales, ancho, alto)
+        if indice is None:
+            soluciones.append(actuales)
+            continue
+        for valor in (0, 1):
+            rama = list(actuales)
+            rama[indice] = valor
+            if resolvedor.propagar(rama, ancho, alto, set(lineas_de_celda[indice])):
+                frontera.append(rama)
+    return list(frontera), soluciones
+
+
+def _iniciar_proceso(evento):
+    global _detenido
+    _detenido = evento
+
+
+def _resolver_subproblema(celdas: Celdas, ancho: int, alto: int, maximo: int) -> List[Celdas]:
+    """Devuelve hasta `maximo` soluciones de un subproblema. Se usa desde los
+    procesos de `soluciones_celdas`."""
+    detener = None if _detenido is None else _detenido.is_set
+    if maximo == 1:
+        solucion = resolvedor.resolver_celdas(celdas, ancho, alto, detener=detener)
+        return [] if solucion is None else [solucion]
+    return resolvedor.enumerar_soluciones(celdas, ancho, alto, maximo, detener)
+
+
+def soluciones_celdas(
+    celdas: Celdas,
+    ancho: int,
+    alto: int,
+    maximo: int = 1,
+    procesos: Optional[int] = None,
+) -> List[Celdas]:
+    """Devuelve hasta `maximo` soluciones distintas de los casilleros dados,
+    buscando con `procesos` procesos (por defecto, uno por núcleo). Con un
+    solo proceso se busca en este, sin dividir la grilla."""
+    procesos = procesos or multiprocessing.cpu_count()
+    if procesos == 1:
+        return _resolver_subproblema(celdas, ancho, alto, maximo)[:maximo]
+    subproblemas, soluciones = dividir(celdas, ancho, alto, procesos * SUBPROBLEMAS_POR_PROCESO)
+    if len(soluciones) >= maximo or not subproblemas:
+        return soluciones[:maximo]
+    evento = multiprocessing.Event()
+    with concurrent.futures.ProcessPoolExecutor(
+        procesos, initializer=_iniciar_proceso, initargs=(evento,)
+    ) as pool:
+        futuros = [
+            pool.submit(_resolver_subproblema, subproblema, ancho, alto, maximo)
+            for subproblema in subproblemas
+        ]
+        for futuro in concurrent.futures.as_completed(futuros):
+            soluciones.extend(futuro.result())
+            if len(soluciones) >= maximo:
+                evento.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+                break
+    return soluciones[:maximo]
+
+
+def resolver(grilla: Grilla, procesos: Optional[int] = None) -> Optional[Grilla]:
+    """Como `resolvedor.resolver`, pero repartiendo la búsqueda entre
+    `procesos` procesos."""
+    celdas, ancho, alto = resolvedor.celdas_desde_grilla(grilla)
+    encontradas = soluciones_celdas(celdas, ancho, alto, 1, procesos)
+    if not encontradas:
+        return None
+    return resolvedor.grilla_desde_celdas(encontradas[0], ancho, alto)
+
+
+def soluciones(grilla: Grilla, maximo: int = 2, procesos: Optional[int] = None) -> List[Grilla]:
+    """Devuelve hasta `maximo` soluciones distintas de la grilla. Con el
+    `maximo` por defecto sirve para saber si la solución es única: lo es si
+    se obtiene exactamente una."""
+    celdas, ancho, alto = resolvedor.celdas_desde_grilla(grilla)
+    return [
+        resolvedor.grilla_desde_celdas(solucion, ancho, alto)
+        for solucion in soluciones_celdas(celdas, ancho, alto, maximo, procesos)
+    ]
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""Servidor de Unruly para muchos jugadores a la vez, con asyncio.
+
+Cada conexión TCP es una sesión con su propia grilla, creada con
+`unruly.crear_grilla` a partir de un nivel de `niveles.NIVELES`. Los
+mensajes son objetos JSON, uno por línea, en ambas direcciones.
+
+Al conectarse, el servidor envía:
+
+    {"sesion": 1, "nivel": 3, "ancho": 6, "alto": 6, "grilla": ["1 0 ...", ...]}
+
+Pedidos del cliente y respuestas:
+
+    {"accion": "jugar", "col": 0, "fil": 2, "valor": "1"}
+        -> {"ok": true, "terminada": false, "sin_salida": null}
+    {"accion": "grilla"}    -> {"ok": true, "grilla": [...]}
+    {"accion": "pista"}     -> {"ok": true, "pista": {"col": ..., "fil": ...,
+                                "valor": ..., "regla": ...}}
+    {"accion": "deshacer"} o {"accion": "rehacer"}
+                            -> {"ok": true, "movimiento": [col, fil, anterior, nuevo]}
+    {"accion": "metricas"}  -> {"ok": true, "metricas": {...}}
+
+`valor` es "1", "0" o " " (vacío). `sin_salida` es null o el motivo por el
+que la grilla ya no tiene solución (ver `viabilidad`). Un pedido inválido
+se responde con {"ok": false, "error": "..."} sin cerrar la conexión.
+
+Todas las respuestas salen del estado incremental de la sesión, sin recorrer
+la grilla, así que ninguna sesión demora a las demás.
+
+Las sesiones se guardan en un `sesiones.AlmacenSesiones`: las que no entran
+en memoria, o no se usan hace INACTIVIDAD segundos, se bajan a disco en el
+formato de `partida` y se vuelven a cargar en su próximo pedido (sin el
+historial para deshacer). `metricas` informa el estado del almacén.
+
+Uso: python servidor.py [--host 127.0.0.1] [--puerto 8765] [--maximo-en-memoria 10000]"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+from typing import Any, Dict, Optional
+
+import historial
+import niveles
+import partida
+import pistas
+import sesiones
+import unruly
+import viabilidad
+from unruly import Grilla
+
+HOST = "127.0.0.1"
+PUERTO = 8765
+VALORES = (unruly.UNO, unruly.CERO, unruly.VACIO)
+# Largo máximo de una línea sin terminar; más que eso se considera abuso
+LARGO_MAXIMO_PEDIDO = 1 << 16
+# Segundos sin pedidos luego de los cuales una sesión se baja a disco, y
+# cada cuánto se buscan esas sesiones
+INACTIVIDAD = 300
+REVISION_DE_INACTIVAS = 30
+
+Mensaje = Dict[str, Any]
+
+
+class Sesion:
+    """Partida de una conexión: la grilla incremental y su historial. Si no
+    se da la grilla, se empieza el nivel."""
+
+    def __init__(self, numero: int, nivel: int, grilla: Optional[Grilla] = None, jugadas: int = 0):
+        self.numero = numero
+        self.nivel = nivel
+        if grilla is None:
+            grilla = unruly.crear_grilla(niveles.NIVELES[nivel], unruly.INCREMENTAL)
+        self.grilla = grilla
+        self.historial = historial.Historial(self.grilla)
+        self.jugadas_previas = jugadas
+
+    @property
+    def jugadas(self) -> int:
+        return self.jugadas_previas + self.historial.posicion
+
+    def estado(self) -> Mensaje:
+        ancho, alto = unruly.dimensiones(self.grilla)
+        return {
+            "sesion": self.numero,
+            "nivel": self.nivel,
+            "ancho": ancho,
+            "alto": alto,
+            "grilla": ["".join(fila) for fila in self.grilla],
+        }
+
+
+def sesion_a_bytes(sesion: Sesion) -> bytes:
+    return partida.partida_a_bytes(sesion.grilla, sesion.nivel, sesion.jugadas)
+
+
+def sesion_desde_bytes(numero: int, datos: bytes) -> Sesion:
+    grilla, nivel, jugadas = partida.partida_desde_bytes(datos, unruly.INCREMENTAL)
+    return Sesion(numero, nivel, grilla, jugadas)
+
+
+def _jugar(sesion: Sesion, pedido: Mensaje) -> Mensaje:
+    col, fil, valor = pedido.get("col"), pedido.get("fil"), pedido.get("valor")
+    ancho, alto = unruly.dimensiones(sesion.grilla)
+    if type(col) is not int or type(fil) is not int or not (0 <= col < ancho and 0 <= fil < alto):
+        return {"ok": False, "error": f"Posición inválida: ({col}, {fil})"}
+    if valor not in VALORES:
+        return {"ok": False, "error": f"Valor inválido: {valor!r}"}
+    sesion.historial.cambiar(col, fil, valor)
+    callejon = viabilidad.sin_salida(sesion.grilla)
+    return {
+        "ok": True,
+        "terminada": unruly.grilla_terminada(sesion.grilla),
+        "sin_salida": None if callejon is None else callejon._asdict(),
+    }
+
+
+def _movimiento(movimiento: Optional[historial.Movimiento]) -> Mensaje:
+    return {"ok": True, "movimiento": None if movimiento is None else list(movimiento)}
+
+
+def procesar(sesion: Sesion, pedido: Mensaje) -> Mensaje:
+    """Devuelve la respuesta a un pedido de la sesión."""
+    accion = pedido.get("accion") if isinstance(pedido, dict) else None
+    if accion == "jugar":
+        return _jugar(sesion, pedido)
+    if accion == "grilla":
+        return {"ok": True, "grilla": ["".join(fila) for fila in sesion.grilla]}
+    if accion == "pista":
+        pista = pistas.pista(sesion.grilla)
+        return {"ok": True, "pista": None if pista is None else pista._asdict()}
+    if accion == "deshacer":
+        return _movimiento(sesion.historial.deshacer())
+    if accion == "rehacer":
+        return _movimiento(sesion.historial.rehacer())
+    return {"ok": False, "error": f"Acción desconocida: {accion!r}"}
+
+
+class _Conexion(asyncio.Protocol):
+    """Conexión de una sesión. Se usa un protocolo en lugar de streams para
+    no pagar una corrutina por cada mensaje: cada línea recibida se responde
+    en el momento."""
+
+    def __init__(self, servidor: "Servidor"):
+        self.servidor = servidor
+        self.transporte = None
+        self.numero = None
+        self.pendiente = b""
+
+    def connection_made(self, transporte: asyncio.Transport):
+        self.transporte = transporte
+        sesion = self.servidor.abrir_sesion()
+        self.numero = sesion.numero
+        transporte.write(json.dumps(sesion.estado()).encode() + b"\n")
+
+    def data_received(self, datos: bytes):
+        lineas = (self.pendiente + datos).split(b"\n")
+        self.pendiente = lineas.pop()
+        if len(self.pendiente) > LARGO_MAXIMO_PEDIDO:
+            self.transporte.close()
+            return
+        respuestas = []
+        sesion = None
+        for linea in lineas:
+            if not linea.strip():
+                continue
+            try:
+                pedido = json.loads(linea)
+            except ValueError:
+                respuesta = {"ok": False, "error": "El pedido no es JSON"}
+            else:
+                if isinstance(pedido, dict) and pedido.get("accion") == "metricas":
+                    respuesta = {"ok": True, "metricas": self.servidor.sesiones.metricas()}
+                else:
+                    sesion = sesion or self.servidor.sesiones.obtener(self.numero)
+                    respuesta = procesar(sesion, pedido)
+            respuestas.append(json.dumps(respuesta).encode())
+        if respuestas:
+            respuestas.append(b"")
+            self.transporte.write(b"\n".join(respuestas))
+
+    def connection_lost(self, _excepcion):
+        self.servidor.sesiones.descartar(self.numero)
+
+
+class Servidor:
+    """Acepta conexiones y atiende una sesión por cada una. Los niveles se
+    eligen con `azar`; `maximo_en_memoria` y `carpeta` son los del almacén
+    de sesiones."""
+
+    def __init__(
+        self,
+        azar: Optional[random.Random] = None,
+        maximo_en_memoria: int = sesiones.MAXIMO_EN_MEMORIA,
+        carpeta: Optional[str] = None,
+    ):
+        self.azar = azar or random.Random()
+        self.sesiones = sesiones.AlmacenSesiones(
+            sesion_a_bytes, sesion_desde_bytes, maximo_en_memoria, carpeta
+        )
+        self._numeros = itertools.count(1)
+
+    def abrir_sesion(self) -> Sesion:
+        numero = next(self._numeros)
+        sesion = Sesion(numero, self.azar.randrange(len(niveles.NIVELES)))
+        self.sesiones.agregar(numero, sesion)
+        return sesion
+
+    async def desalojar_inactivas(self):
+        """Baja a disco periódicamente las sesiones inactivas."""
+        while True:
+            await asyncio.sleep(REVISION_DE_INACTIVAS)
+            self.sesiones.desalojar_inactivas(INACTIVIDAD)
+
+    async def iniciar(self, host: str = HOST, puerto: int = PUERTO) -> asyncio.AbstractServer:
+        """Empieza a escuchar en `host`:`puerto` (con puerto 0 se elige uno
+        libre) y devuelve el servidor de asyncio."""
+        bucle = asyncio.get_running_loop()
+        return await bucle.create_server(lambda: _Conexion(self), host, puerto, backlog=4096)
+
+
+async def servir(host: str, puerto: int, maximo_en_memoria: int):
+    atendedor = Servidor(maximo_en_memoria=maximo_en_memoria)
+    servidor = await atendedor.iniciar(host, puerto)
+    print(f"Escuchando en {host}:{servidor.sockets[0].getsockname()[1]}", flush=True)
+    limpieza = asyncio.create_task(atendedor.desalojar_inactivas())
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        limpieza.cancel()
+        atendedor.sesiones.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de Unruly")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--maximo-en-memoria", type=int, default=sesiones.MAXIMO_EN_MEMORIA)
+    argumentos = parser.parse_args()
+    try:
+        asyncio.run(servir(argumentos.host, argumentos.puerto, argumentos.maximo_en_memoria))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
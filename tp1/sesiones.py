@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Almacén de sesiones con una cantidad máxima en memoria.
+
+Las sesiones se guardan por número. Cuando hay más de `maximo_en_memoria`,
+la usada hace más tiempo se baja a disco en forma compacta (con la función
+`a_bytes` que recibe el almacén, por ejemplo el formato de `partida`), y se
+vuelve a cargar sola la próxima vez que se la pide. También se pueden bajar
+a disco todas las que no se usan hace cierto tiempo (`desalojar_inactivas`).
+
+`metricas` informa cuántas sesiones hay en memoria y en disco, cuántas se
+bajaron y se volvieron a cargar, y cuánto tardó cargarlas."""
+import collections
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+
+MAXIMO_EN_MEMORIA = 10000
+# Cantidad de tiempos de carga que se guardan para calcular percentiles
+MUESTRAS_DE_CARGA = 1000
+
+
+class AlmacenSesiones:
+    """Sesiones por número, con las `maximo_en_memoria` usadas más
+    recientemente en memoria y las demás en archivos de `carpeta` (por
+    defecto, una carpeta temporal que se borra con `cerrar`).
+
+    `a_bytes(sesion)` codifica una sesión y `desde_bytes(numero, datos)` la
+    reconstruye."""
+
+    def __init__(
+        self,
+        a_bytes: Callable[[Any], bytes],
+        desde_bytes: Callable[[int, bytes], Any],
+        maximo_en_memoria: int = MAXIMO_EN_MEMORIA,
+        carpeta: Optional[str] = None,
+        reloj: Callable[[], float] = time.monotonic,
+    ):
+        self.a_bytes = a_bytes
+        self.desde_bytes = desde_bytes
+        self.maximo_en_memoria = maximo_en_memoria
+        self._carpeta = carpeta
+        self._carpeta_temporal = carpeta is None
+        self.reloj = reloj
+        # Número -> [sesión, momento de su último uso], de la usada hace más
+        # tiempo a la más reciente
+        self.en_memoria = collections.OrderedDict()
+        # Número -> tamaño en bytes de la sesión en disco
+        self.en_disco: Dict[int, int] = {}
+        self.bytes_en_disco = 0
+        self.desalojos = 0
+        self.cargas = 0
+        self.tiempos_de_carga = collections.deque(maxlen=MUESTRAS_DE_CARGA)
+        self.tiempo_maximo_de_carga = 0.0
+
+    def __len__(self) -> int:
+        return len(self.en_memoria) + len(self.en_disco)
+
+    def __contains__(self, numero: int) -> bool:
+        return numero in self.en_memoria or numero in self.en_disco
+
+    @property
+    def carpeta(self) -> str:
+        if self._carpeta is None:
+            self._carpeta = tempfile.mkdtemp(prefix="sesiones-")
+        return self._carpeta
+
+    def _ruta(self, numero: int) -> str:
+        return os.path.join(self.carpeta, f"{numero}.bin")
+
+    def agregar(self, numero: int, sesion):
+        """Agrega una sesión (o reemplaza la que tenía ese número)."""
+        self.descartar(numero)
+        self.en_memoria[numero] = [sesion, self.reloj()]
+        self._limitar()
+
+    def obtener(self, numero: int):
+        """Devuelve la sesión, cargándola de disco si hace falta. Lanza
+        KeyError si no hay una sesión con ese número."""
+        entrada = self.en_memoria.get(numero)
+        if entrada is not None:
+            self.en_memoria.move_to_end(numero)
+            entrada[1] = self.reloj()
+            return entrada[0]
+        if numero not in self.en_disco:
+            raise KeyError(numero)
+        inicio = time.perf_counter()
+        ruta = self._ruta(numero)
+        with open(ruta, "rb") as archivo:
+            sesion = self.desde_bytes(numero, archivo.read())
+        os.remove(ruta)
+        self.bytes_en_disco -= self.en_disco.pop(numero)
+        self.en_memoria[numero] = [sesion, self.reloj()]
+        tiempo = time.perf_counter() - inicio
+        self.cargas += 1
+        self.tiempos_de_carga.append(tiempo)
+        self.tiempo_maximo_de_carga = max(self.tiempo_maximo_de_carga, tiempo)
+        self._limitar()
+        return sesion
+
+    def descartar(self, numero: int):
+        """Elimina la sesión, esté en memoria o en disco."""
+        if self.en_memoria.pop(numero, None) is None and numero in self.en_disco:
+            self.bytes_en_disco -= self.en_disco.pop(numero)
+            os.remove(self._ruta(numero))
+
+    def desalojar(self, numero: int):
+        """Baja a disco una sesión que está en memoria."""
+        sesion, _ = self.en_memoria.pop(numero)
+        datos = self.a_bytes(sesion)
+        with open(self._ruta(numero), "wb") as archivo:
+            archivo.write(datos)
+        self.en_disco[numero] = len(datos)
+        self.bytes_en_disco += len(datos)
+        self.desalojos += 1
+
+    def _limitar(self):
+        while len(self.en_memoria) > self.maximo_en_memoria:
+            self.desalojar(next(iter(self.en_memoria)))
+
+    def desalojar_inactivas(self, segundos: float) -> int:
+        """Baja a disco las sesiones que no se usan hace más de `segundos` y
+        devuelve cuántas fueron. Como están ordenadas por último uso, sólo
+        recorre las que baja."""
+        limite = self.reloj() - segundos
+        cantidad = 0
+        while self.en_memoria:
+            numero, (_, ultimo_uso) = next(iter(self.en_memoria.items()))
+            if ultimo_uso > limite:
+                break
+            self.desalojar(numero)
+            cantidad += 1
+        return cantidad
+
+    def metricas(self) -> Dict[str, float]:
+        """Devuelve las métricas del almacén; los tiempos están en segundos y
+        los percentiles corresponden a las últimas MUESTRAS_DE_CARGA cargas."""
+        tiempos = sorted(self.tiempos_de_carga)
+
+        def percentil(p):
+            return tiempos[min(len(tiempos) - 1, int(len(tiempos) * p / 100))] if tiempos else 0.0
+
+        return {
+            "en_memoria": len(self.en_memoria),
+            "maximo_en_memoria": self.maximo_en_memoria,
+            "en_disco": len(self.en_disco),
+            "bytes_en_disco": self.bytes_en_disco,
+            "desalojos": self.desalojos,
+            "cargas": self.cargas,
+            "carga_p50": percentil(50),
+            "carga_p99": percentil(99),
+            "carga_maxima": self.tiempo_maximo_de_carga,
+        }
+
+    def cerrar(self):
+        """Descarta todas las sesiones y, si la carpeta era temporal, la
+        borra."""
+        for numero in list(self.en_disco):
+            self.descartar(numero)
+        self.en_memoria.clear()
+        if self._carpeta_temporal and self._carpeta is not None:
+            shutil.rmtree(self._carpeta, ignore_errors=True)
+            self._carpeta = None
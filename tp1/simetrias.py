@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Simetrías de las grillas de Unruly.
+
+Las reglas del juego no cambian si se rota o refleja la grilla (las 8
+simetrías del cuadrado) ni si se intercambian los unos con los ceros, así
+que cada grilla tiene hasta 16 variantes equivalentes. La forma canónica es
+la menor de ellas, comparando (ancho, alto, casilleros fila por fila), y
+sirve para reconocer grillas equivalentes.
+
+Una `Simetria` se aplica en este orden: primero se transpone la grilla,
+después se invierte el orden de las filas y el de los casilleros de cada
+fila, y por último se intercambian los unos con los ceros."""
+import hashlib
+import struct
+from typing import List, NamedTuple
+
+import paquete_niveles
+import unruly
+
+# Bytes de las claves de `clave_canonica`
+LARGO_CLAVE = 16
+
+_DIMENSIONES = struct.Struct("<II")
+_INTERCAMBIO = bytes.maketrans(
+    (unruly.UNO + unruly.CERO).encode("ascii"), (unruly.CERO + unruly.UNO).encode("ascii")
+)
+
+
+class Simetria(NamedTuple):
+    transponer: bool = False
+    invertir_filas: bool = False
+    invertir_columnas: bool = False
+    intercambiar: bool = False
+
+
+IDENTIDAD = Simetria()
+SIMETRIAS = tuple(
+    Simetria(transponer, invertir_filas, invertir_columnas, intercambiar)
+    for transponer in (False, True)
+    for invertir_filas in (False, True)
+    for invertir_columnas in (False, True)
+    for intercambiar in (False, True)
+)
+
+
+# (invertir_filas, invertir_columnas, intercambiar) de cada variante que
+# arma `forma_canonica` para una orientación
+_VARIANTES = tuple(
+    (invertir_filas, invertir_columnas, intercambiar)
+    for intercambiar in (False, True)
+    for invertir_filas, invertir_columnas in ((False, False), (True, True), (False, True), (True, False))
+)
+
+
+class FormaCanonica(NamedTuple):
+    """Forma canónica de una grilla: sus dimensiones, sus casilleros fila
+    por fila y la simetría que lleva de la grilla original a esta forma."""
+    ancho: int
+    alto: int
+    casilleros: bytes
+    simetria: Simetria
+
+    def descripcion(self) -> List[str]:
+        texto = self.casilleros.decode("ascii")
+        return [texto[fil * self.ancho:(fil + 1) * self.ancho] for fil in range(self.alto)]
+
+
+def _intercambiar(texto: str) -> str:
+    return texto.encode("ascii").translate(_INTERCAMBIO).decode("ascii")
+
+
+def _invertir(filas: List[str], invertir_filas: bool, invertir_columnas: bool) -> List[str]:
+    if invertir_filas:
+        filas = filas[::-1]
+    if invertir_columnas:
+        filas = [fila[::-1] for fila in filas]
+    return filas
+
+
+def _transponer(filas: List[str]) -> List[str]:
+    return ["".join(columna) for columna in zip(*filas)]
+
+
+def transformar(desc: List[str], simetria: Simetria) -> List[str]:
+    """Devuelve la descripción de la grilla `desc` (en el formato de
+    `unruly.crear_grilla`) transformada por `simetria`."""
+    filas = list(desc)
+    if simetria.transponer:
+        filas = _transponer(filas)
+    filas = _invertir(filas, simetria.invertir_filas, simetria.invertir_columnas)
+    if simetria.intercambiar:
+        filas = [_intercambiar(fila) for fila in filas]
+    return filas
+
+
+def destransformar(desc: List[str], simetria: Simetria) -> List[str]:
+    """Inversa de `transformar`: devuelve la grilla que `simetria` lleva a
+    `desc`."""
+    filas = list(desc)
+    if simetria.intercambiar:
+        filas = [_intercambiar(fila) for fila in filas]
+    filas = _invertir(filas, simetria.invertir_filas, simetria.invertir_columnas)
+    if simetria.transponer:
+        filas = _transponer(filas)
+    return filas
+
+
+def forma_canonica(desc: List[str]) -> FormaCanonica:
+    """Devuelve la forma canónica de `desc`.
+
+    Las variantes se arman como cadenas de bytes con operaciones sobre
+    cadenas enteras, sin recorrer los casilleros uno por uno: invertir la
+    grilla entera invierte a la vez el orden de las filas y el de cada fila,
+    y las columnas de la grilla transpuesta son cortes de la original con
+    paso `ancho`. Como primero se comparan las dimensiones, en una grilla no
+    cuadrada sólo se consideran las variantes con la menor de ellas como
+    ancho."""
+    ancho, alto = len(desc[0]), len(desc)
+    orientaciones = []
+    if ancho <= alto:
+        orientaciones.append((
+            False, ancho, alto,
+            "".join(desc).encode("ascii"), "".join(reversed(desc)).encode("ascii"),
+        ))
+    if alto <= ancho:
+        texto = "".join(desc).encode("ascii")
+        columnas = [texto[col::ancho] for col in range(ancho)]
+        orientaciones.append((True, alto, ancho, b"".join(columnas), b"".join(reversed(columnas))))
+    mejor = None
+    for transponer, ancho_variante, alto_variante, derecho, filas_invertidas in orientaciones:
+        candidatas = [derecho, derecho[::-1], filas_invertidas[::-1], filas_invertidas]
+        candidatas += [casilleros.translate(_INTERCAMBIO) for casilleros in candidatas]
+        indice = min(range(len(candidatas)), key=candidatas.__getitem__)
+        if mejor is None or candidatas[indice] < mejor.casilleros:
+            mejor = FormaCanonica(
+                ancho_variante, alto_variante, candidatas[indice],
+                Simetria(transponer, *_VARIANTES[indice]),
+            )
+    return mejor
+
+
+def empaquetar(forma: FormaCanonica) -> bytes:
+    """Devuelve la forma canónica en forma compacta: las dimensiones y los
+    casilleros a 2 bits (ver `paquete_niveles.codificar_casilleros`)."""
+    return _DIMENSIONES.pack(forma.ancho, forma.alto) + paquete_niveles.codificar_casilleros(
+        forma.casilleros
+    )
+
+
+def clave_de_forma(forma: FormaCanonica) -> bytes:
+    """Devuelve un hash de LARGO_CLAVE bytes de una forma canónica."""
+    return hashlib.blake2b(empaquetar(forma), digest_size=LARGO_CLAVE).digest()
+
+
+def clave_canonica(desc: List[str]) -> bytes:
+    """Devuelve un hash de LARGO_CLAVE bytes de la forma canónica de `desc`:
+    es el mismo para todas las grillas equivalentes."""
+    return clave_de_forma(forma_canonica(desc))
+
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """Lógica del juego Unruly"""
-from typing import List, Tuple, Any
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Set, Tuple, Any
 
 Grilla = Any
 #constantes globales 
@@ -8,22 +9,25 @@ UNO= "1"
 CERO= "0"
 VACIO= " "
 
+_VACIO_BYTES = VACIO.encode("ascii")
+_UNO_BYTES = UNO.encode("ascii")
+_TRES_UNOS = _UNO_BYTES * 3
+_TRES_CEROS = CERO.encode("ascii") * 3
 
-def crear_grilla(desc: List[str])-> Grilla: 
-    filas= len(desc) 
-    columnas= len(desc[0]) 
-    grilla=[] 
-    for fila in range (filas):
-        fila_nueva=([])
-        for columna in range (columnas):
-            valor_de_la_celda=desc[fila][columna]
-            fila_nueva.append(valor_de_la_celda)
-        grilla.append(fila_nueva)
-    for fila in grilla:
-        print("".join(fila))
-    return grilla
-    
-"""Crea una grilla a partir de la descripción del estado inicial.
+# Las tablas de líneas válidas (ver `lineas_validas`) sólo se arman hasta
+# este largo, y se guardan a lo sumo las de TABLAS_EN_CACHE largos distintos
+LARGO_MAXIMO_TABLA = 24
+TABLAS_EN_CACHE = 8
+
+# Representaciones posibles de la grilla (ver `crear_grilla`)
+LISTAS = "listas"
+INCREMENTAL = "incremental"
+BITS = "bits"
+COLUMNAS = "columnas"
+
+
+def crear_grilla(desc: List[str], representacion: str = LISTAS, mostrar: bool = False)-> Grilla: 
+    """Crea una grilla a partir de la descripción del estado inicial.
 
     La descripción es una lista de cadenas, cada cadena representa una
     fila y cada caracter una celda. Se puede asumir que la cantidad de las
@@ -45,8 +49,52 @@ def crear_grilla(desc: List[str])-> Grilla:
         ' 1  1 ',
         '  1  0',
     ])
+
+    La descripción también puede ser un texto o `bytes` con una fila por
+    línea, una lista de filas en `bytes`, o un archivo abierto (en modo texto
+    o binario) con una fila por línea; las líneas vacías se ignoran.
+
+    Con `representacion=INCREMENTAL` se devuelve una `GrillaIncremental`, que
+    se usa con las mismas funciones de este módulo pero responde
+    `grilla_terminada` en tiempo constante. Con `representacion=BITS` se
+    devuelve una `GrillaBits`, que guarda cada fila y cada columna como un par
+    de máscaras de bits. Con `representacion=COLUMNAS` se devuelve una
+    `GrillaColumnas`, que además de las filas guarda una copia de cada
+    columna.
+
+    Si `mostrar` es True se imprime la grilla creada.
     """
+    filas = _filas_de_descripcion(desc)
+    if representacion == INCREMENTAL:
+        grilla = GrillaIncremental(filas)
+    elif representacion == BITS:
+        grilla = GrillaBits(filas)
+    elif representacion == COLUMNAS:
+        grilla = GrillaColumnas(filas)
+    else:
+        grilla = [list(fila) for fila in filas]
+    if mostrar:
+        for fila in filas:
+            print(fila)
+    return grilla
+
 
+def _filas_de_descripcion(desc) -> List[str]:
+    """Devuelve las filas de una descripción (en cualquiera de las formas que
+    acepta `crear_grilla`) como lista de cadenas."""
+    if isinstance(desc, (bytes, bytearray)):
+        desc = desc.decode("ascii")
+    if isinstance(desc, str):
+        desc = desc.splitlines()
+    elif hasattr(desc, "read"):
+        desc = [linea.rstrip(b"\r\n" if isinstance(linea, bytes) else "\r\n") for linea in desc]
+    filas = []
+    for fila in desc:
+        if isinstance(fila, (bytes, bytearray)):
+            fila = fila.decode("ascii")
+        if fila:
+            filas.append(fila)
+    return filas
 
 
 def dimensiones(grilla: Grilla) -> Tuple[int, int]:
@@ -59,30 +107,42 @@ def dimensiones(grilla: Grilla) -> Tuple[int, int]:
 def posicion_es_vacia(grilla: Grilla, col: int, fil: int) -> bool:
     """Devuelve un booleano indicando si la posición de la grilla dada por las
     coordenadas `col` y `fil` está vacía"""
+    if type(grilla) is not list:
+        return grilla.valor(col, fil) == VACIO
     return grilla[fil][col] == VACIO
 
 
 def posicion_hay_uno(grilla: Grilla, col: int, fil: int) -> bool:
     """Devuelve un booleano indicando si la posición de la grilla dada por las
     coordenadas `col` y `fil` está el valor 1"""
+    if type(grilla) is not list:
+        return grilla.valor(col, fil) == UNO
     return grilla[fil][col]== UNO
 
 
 def posicion_hay_cero(grilla: Grilla, col: int, fil: int) -> bool:
     """Devuelve un booleano indicando si la posición de la grilla dada por las
     coordenadas `col` y `fil` está el valor 0"""
+    if type(grilla) is not list:
+        return grilla.valor(col, fil) == CERO
     return grilla [fil][col] == CERO
 
 
 def cambiar_a_uno(grilla: Grilla, col: int, fil: int):
     """Modifica la grilla, colocando el valor 1 en la posición de la grilla
     dada por las coordenadas `col` y `fil`"""
+    if type(grilla) is not list:
+        grilla.cambiar(col, fil, UNO)
+        return
     grilla[fil][col]= UNO
 
 
 def cambiar_a_cero(grilla: Grilla, col: int, fil: int):
     """Modifica la grilla, colocando el valor 0 en la posición de la grilla
     dada por las coordenadas `col` y `fil`"""
+    if type(grilla) is not list:
+        grilla.cambiar(col, fil, CERO)
+        return
     grilla[fil][col]= CERO
 
 
@@ -90,6 +150,9 @@ def cambiar_a_cero(grilla: Grilla, col: int, fil: int):
 def cambiar_a_vacio(grilla: Grilla, col: int, fil: int):
     """Modifica la grilla, eliminando el valor de la posición de la grilla
     dada por las coordenadas `col` y `fil`"""
+    if type(grilla) is not list:
+        grilla.cambiar(col, fil, VACIO)
+        return
     grilla[fil][col]= VACIO
 
 def es_valida(valor_de_la_celda) -> bool:
@@ -103,7 +166,65 @@ def es_valida(valor_de_la_celda) -> bool:
     for i in range (len(valor_de_la_celda)-2):
         if valor_de_la_celda[i] == valor_de_la_celda[i+1] == valor_de_la_celda [i+2]:
             return False
-    return True 
+    return True
+
+
+@lru_cache(maxsize=TABLAS_EN_CACHE)
+def lineas_validas(largo: int) -> FrozenSet[int]:
+    """Devuelve el conjunto de todas las líneas válidas de `largo` casilleros,
+    cada una empaquetada como un entero cuyo bit `i` vale 1 si el casillero
+    `i` está ocupado por un 1.
+
+    Las tablas se arman la primera vez que se piden y se guardan en un caché
+    que conserva sólo las de los últimos largos usados."""
+    mitad = largo // 2
+    lineas = []
+
+    def extender(i, linea, penultimo, ultimo, unos):
+        if i == largo:
+            lineas.append(linea)
+            return
+        for valor in (0, 1):
+            if penultimo == ultimo == valor:
+                continue
+            if unos + valor > mitad or i + 1 - unos - valor > mitad:
+                continue
+            extender(i + 1, linea | (valor << i), ultimo, valor, unos + valor)
+
+    if largo % 2 == 0:
+        extender(0, 0, None, None, 0)
+    return frozenset(lineas)
+
+
+def completar_linea(largo: int, unos: int, llenos: int) -> List[int]:
+    """Devuelve las líneas válidas de `largo` casilleros (empaquetadas como en
+    `lineas_validas`) que coinciden con una línea parcialmente llena, dada
+    por la máscara `llenos` de casilleros ocupados y la máscara `unos` de
+    casilleros ocupados por un 1."""
+    unos &= llenos
+    return [linea for linea in lineas_validas(largo) if linea & llenos == unos]
+
+
+def _bytes_es_valida(casilleros: bytes) -> bool:
+    """Equivalente a `es_valida` para una línea dada como `bytes` o
+    `bytearray`. Usa sólo búsquedas y conteos sobre los bytes, sin armar
+    ninguna estructura nueva."""
+    return (
+        _VACIO_BYTES not in casilleros
+        and casilleros.count(_UNO_BYTES) * 2 == len(casilleros)
+        and _TRES_UNOS not in casilleros
+        and _TRES_CEROS not in casilleros
+    )
+
+
+def _linea_en_tabla(casilleros: str) -> bool:
+    """Equivalente a `es_valida` para una línea dada como cadena y de largo a
+    lo sumo LARGO_MAXIMO_TABLA, buscándola en la tabla de líneas válidas.
+    Una línea con algo que no sea UNO o CERO no es válida (y no se le pasa a
+    `int`, que acepta también otros caracteres, como "_")."""
+    if casilleros.count(UNO) + casilleros.count(CERO) != len(casilleros):
+        return False
+    return int(casilleros[::-1], 2) in lineas_validas(len(casilleros))
 
 def fila_es_valida(grilla: Grilla, fil: int) -> bool:
     """Devuelve un booleano indicando si la fila de la grilla denotada por el
@@ -114,7 +235,11 @@ def fila_es_valida(grilla: Grilla, fil: int) -> bool:
         - La fila tiene la misma cantidad de unos y ceros
         - La fila no contiene tres casilleros consecutivos del mismo valor
     """
+    if type(grilla) is not list:
+        return grilla.fila_es_valida(fil)
     valor_de_la_celda= grilla[fil]
+    if len(valor_de_la_celda) <= LARGO_MAXIMO_TABLA:
+        return _linea_en_tabla("".join(valor_de_la_celda))
     return es_valida (valor_de_la_celda)
 
     
@@ -125,6 +250,10 @@ def columna_es_valida(grilla: Grilla, col: int) -> bool:
 
     Las condiciones para que una columna sea válida son las mismas que las
     condiciones de las filas."""
+    if type(grilla) is not list:
+        return grilla.columna_es_valida(col)
+    if len(grilla) <= LARGO_MAXIMO_TABLA:
+        return _linea_en_tabla("".join([fila[col] for fila in grilla]))
     valor_de_la_celda=[fila[col]for fila in grilla] 
     return es_valida (valor_de_la_celda)
 
@@ -137,12 +266,450 @@ def grilla_terminada(grilla: Grilla) -> bool:
 
     Una grilla se considera terminada si todas sus filas y columnas son
     válidas."""
+    if type(grilla) is not list:
+        return grilla.terminada()
     for i in range (len(grilla)): 
         if not fila_es_valida(grilla, i):
             return False 
     for j in range (len(grilla[0])):
         if not columna_es_valida(grilla, j):
             return False
-    return True 
-
-
+    return True
+
+
+def grilla_terminada_por_filas(filas: Iterable[str]) -> bool:
+    """Equivalente a `grilla_terminada` para una grilla que se recibe fila
+    por fila, por ejemplo un archivo abierto con una fila por línea (los
+    saltos de línea finales y las líneas vacías se ignoran, como en
+    `crear_grilla`). Las filas también pueden ser `bytes`, como las de un
+    archivo abierto en modo binario.
+
+    Cada fila se valida apenas llega y la lectura se corta en la primera fila
+    inválida o en el primer trío de casilleros iguales en una columna. De las
+    columnas sólo se guardan las dos últimas filas y la cantidad de unos de
+    cada una, así que la memoria usada no depende de la cantidad de filas.
+
+    Las filas se manejan como máscaras de bits (ver `linea_bits_es_valida`).
+    La cantidad de unos de cada columna se lleva con contadores "en rebanadas":
+    `planos[j]` tiene prendido el bit `col` si el bit `j` de la cantidad de
+    unos de la columna `col` vale 1, por lo que sumar una fila cuesta unas
+    pocas operaciones sobre enteros, sin recorrer las columnas."""
+    ancho = None
+    todos = 0
+    alto = 0
+    penultima = ultima = 0
+    planos = []
+    for fila in filas:
+        if isinstance(fila, (bytes, bytearray)):
+            fila = fila.decode("ascii")
+        elif not isinstance(fila, str):
+            fila = "".join(fila)
+        fila = fila.rstrip("\r\n")
+        if not fila:
+            continue
+        if ancho is None:
+            ancho = len(fila)
+            todos = (1 << ancho) - 1
+        if len(fila) != ancho or fila.count(UNO) + fila.count(CERO) != ancho:
+            return False
+        unos = int(fila[::-1], 2)
+        if not linea_bits_es_valida(unos, todos, ancho):
+            return False
+        if alto >= 2 and (
+            unos & ultima & penultima or ~(unos | ultima | penultima) & todos
+        ):
+            return False
+        penultima, ultima = ultima, unos
+        alto += 1
+        acarreo = unos
+        for j, plano in enumerate(planos):
+            planos[j] = plano ^ acarreo
+            acarreo &= plano
+            if not acarreo:
+                break
+        if acarreo:
+            planos.append(acarreo)
+    if ancho is None or alto % 2:
+        return False
+    mitad = alto // 2
+    for j in range(max(len(planos), mitad.bit_length())):
+        plano = planos[j] if j < len(planos) else 0
+        if plano != (todos if mitad >> j & 1 else 0):
+            return False
+    return True
+
+
+Casillero = Tuple[int, int]
+
+
+class Violaciones(NamedTuple):
+    """Reglas que no se cumplen en una grilla (ver `violaciones`).
+
+    `filas` y `columnas` asocian el índice de cada línea que tiene más unos o
+    más ceros que la mitad de sus casilleros con su cantidad de (unos, ceros).
+    `ternas` tiene las coordenadas (col, fil) de cada trío de casilleros
+    consecutivos con el mismo valor."""
+    filas: Dict[int, Tuple[int, int]]
+    columnas: Dict[int, Tuple[int, int]]
+    ternas: Set[Tuple[Casillero, Casillero, Casillero]]
+
+
+def violaciones(grilla: Grilla) -> Violaciones:
+    """Devuelve las reglas que no se cumplen en la grilla: las filas y
+    columnas que ya no pueden quedar balanceadas y los tríos de casilleros
+    consecutivos iguales. Los vacíos no se consideran violaciones.
+
+    Para una `GrillaIncremental` la respuesta sale de su estado, que se
+    actualiza con cada cambio; para las demás representaciones se recorre
+    toda la grilla."""
+    if not isinstance(grilla, GrillaIncremental):
+        grilla = GrillaIncremental(list(grilla))
+    return grilla.violaciones()
+
+
+class GrillaIncremental:
+    """Grilla que mantiene, para cada fila y columna, la cantidad de unos,
+    ceros y vacíos, y las ternas de casilleros consecutivos del mismo valor.
+
+    Cada cambio hecho con `cambiar_a_uno`, `cambiar_a_cero` o
+    `cambiar_a_vacio` actualiza ese estado mirando sólo los dos casilleros
+    vecinos hacia cada lado, por lo que `fila_es_valida`, `columna_es_valida`,
+    `grilla_terminada` y `violaciones` no necesitan recorrer la grilla.
+
+    Las filas se pueden leer con `grilla[fil][col]`, pero **no** se deben
+    modificar directamente: los contadores quedarían desactualizados.
+
+    Las funciones de `observadores` se llaman luego de cada cambio como
+    `observador(col, fil, anterior, valor)`, para que otros módulos (por
+    ejemplo `pistas`) sigan la grilla sin recorrerla entera."""
+
+    def __init__(self, desc: List[str]):
+        self.filas = [list(fila) for fila in desc]
+        self.alto = len(self.filas)
+        self.ancho = len(self.filas[0])
+        self.unos_fila = [0] * self.alto
+        self.ceros_fila = [0] * self.alto
+        self.vacios_fila = [0] * self.alto
+        self.unos_columna = [0] * self.ancho
+        self.ceros_columna = [0] * self.ancho
+        self.vacios_columna = [0] * self.ancho
+        self.triples_fila = [0] * self.alto
+        self.triples_columna = [0] * self.ancho
+        # Cada terna se guarda como (col, fil, horizontal), con la posición de
+        # su primer casillero
+        self.ternas = set()
+        self.observadores = []
+        for fil, fila in enumerate(self.filas):
+            for col, valor in enumerate(fila):
+                self._contar(col, fil, valor, 1)
+        for fil in range(self.alto):
+            for col in range(self.ancho - 2):
+                if self._terna_horizontal(col, fil):
+                    self.triples_fila[fil] += 1
+                    self.ternas.add((col, fil, True))
+        for col in range(self.ancho):
+            for fil in range(self.alto - 2):
+                if self._terna_vertical(col, fil):
+                    self.triples_columna[col] += 1
+                    self.ternas.add((col, fil, False))
+        self.filas_excedidas = {
+            fil for fil in range(self.alto) if self._fila_excedida(fil)
+        }
+        self.columnas_excedidas = {
+            col for col in range(self.ancho) if self._columna_excedida(col)
+        }
+        self.vacios = sum(self.vacios_fila)
+        self.triples = sum(self.triples_fila) + sum(self.triples_columna)
+        self.desbalanceadas = sum(
+            1 for fil in range(self.alto)
+            if self.unos_fila[fil] != self.ceros_fila[fil]
+        ) + sum(
+            1 for col in range(self.ancho)
+            if self.unos_columna[col] != self.ceros_columna[col]
+        )
+
+    def __len__(self) -> int:
+        return self.alto
+
+    def __getitem__(self, fil: int) -> List[str]:
+        return self.filas[fil]
+
+    def __iter__(self):
+        return iter(self.filas)
+
+    def __repr__(self) -> str:
+        return f"GrillaIncremental({[''.join(fila) for fila in self.filas]!r})"
+
+    def valor(self, col: int, fil: int) -> str:
+        return self.filas[fil][col]
+
+    def _contar(self, col: int, fil: int, valor: str, delta: int):
+        """Suma `delta` a los contadores de `valor` en la fila y columna de la
+        posición dada."""
+        if valor == UNO:
+            self.unos_fila[fil] += delta
+            self.unos_columna[col] += delta
+        elif valor == CERO:
+            self.ceros_fila[fil] += delta
+            self.ceros_columna[col] += delta
+        else:
+            self.vacios_fila[fil] += delta
+            self.vacios_columna[col] += delta
+
+    def _terna_horizontal(self, col: int, fil: int) -> bool:
+        """Indica si los casilleros (col, fil), (col+1, fil) y (col+2, fil)
+        están ocupados por el mismo valor."""
+        fila = self.filas[fil]
+        return fila[col] != VACIO and fila[col] == fila[col + 1] == fila[col + 2]
+
+    def _terna_vertical(self, col: int, fil: int) -> bool:
+        """Indica si los casilleros (col, fil), (col, fil+1) y (col, fil+2)
+        están ocupados por el mismo valor."""
+        filas = self.filas
+        valor = filas[fil][col]
+        return valor != VACIO and valor == filas[fil + 1][col] == filas[fil + 2][col]
+
+    def _ternas_alrededor(self, col: int, fil: int) -> Set[Tuple[int, int, bool]]:
+        """Devuelve las ternas (como en `self.ternas`) que contienen a la
+        posición dada."""
+        ternas = set()
+        for c in range(max(0, col - 2), min(col, self.ancho - 3) + 1):
+            if self._terna_horizontal(c, fil):
+                ternas.add((c, fil, True))
+        for f in range(max(0, fil - 2), min(fil, self.alto - 3) + 1):
+            if self._terna_vertical(col, f):
+                ternas.add((col, f, False))
+        return ternas
+
+    def _fila_excedida(self, fil: int) -> bool:
+        mitad = self.ancho // 2
+        return self.unos_fila[fil] > mitad or self.ceros_fila[fil] > mitad
+
+    def _columna_excedida(self, col: int) -> bool:
+        mitad = self.alto // 2
+        return self.unos_columna[col] > mitad or self.ceros_columna[col] > mitad
+
+    def _desbalanceadas_en(self, col: int, fil: int) -> int:
+        """Devuelve cuántas de las dos líneas que pasan por la posición dada
+        tienen distinta cantidad de unos que de ceros."""
+        return (
+            (self.unos_fila[fil] != self.ceros_fila[fil])
+            + (self.unos_columna[col] != self.ceros_columna[col])
+        )
+
+    def cambiar(self, col: int, fil: int, valor: str):
+        """Coloca `valor` en la posición dada, actualizando los contadores."""
+        anterior = self.filas[fil][col]
+        if anterior == valor:
+            return
+        ternas = self._ternas_alrededor(col, fil)
+        desbalanceadas = self._desbalanceadas_en(col, fil)
+        self._contar(col, fil, anterior, -1)
+        self.filas[fil][col] = valor
+        self._contar(col, fil, valor, 1)
+        nuevas = self._ternas_alrededor(col, fil)
+        for c, f, horizontal in ternas - nuevas:
+            self._sumar_terna(c, f, horizontal, -1)
+        for c, f, horizontal in nuevas - ternas:
+            self._sumar_terna(c, f, horizontal, 1)
+        self.ternas -= ternas
+        self.ternas |= nuevas
+        self.desbalanceadas += self._desbalanceadas_en(col, fil) - desbalanceadas
+        if self._fila_excedida(fil):
+            self.filas_excedidas.add(fil)
+        else:
+            self.filas_excedidas.discard(fil)
+        if self._columna_excedida(col):
+            self.columnas_excedidas.add(col)
+        else:
+            self.columnas_excedidas.discard(col)
+        if anterior == VACIO:
+            self.vacios -= 1
+        elif valor == VACIO:
+            self.vacios += 1
+        for observador in self.observadores:
+            observador(col, fil, anterior, valor)
+
+    def _sumar_terna(self, col: int, fil: int, horizontal: bool, delta: int):
+        if horizontal:
+            self.triples_fila[fil] += delta
+        else:
+            self.triples_columna[col] += delta
+        self.triples += delta
+
+    def violaciones(self) -> Violaciones:
+        ternas = set()
+        for col, fil, horizontal in self.ternas:
+            if horizontal:
+                ternas.add(((col, fil), (col + 1, fil), (col + 2, fil)))
+            else:
+                ternas.add(((col, fil), (col, fil + 1), (col, fil + 2)))
+        return Violaciones(
+            filas={
+                fil: (self.unos_fila[fil], self.ceros_fila[fil])
+                for fil in self.filas_excedidas
+            },
+            columnas={
+                col: (self.unos_columna[col], self.ceros_columna[col])
+                for col in self.columnas_excedidas
+            },
+            ternas=ternas,
+        )
+
+    def fila_es_valida(self, fil: int) -> bool:
+        return (
+            self.vacios_fila[fil] == 0
+            and self.unos_fila[fil] == self.ceros_fila[fil]
+            and self.triples_fila[fil] == 0
+        )
+
+    def columna_es_valida(self, col: int) -> bool:
+        return (
+            self.vacios_columna[col] == 0
+            and self.unos_columna[col] == self.ceros_columna[col]
+            and self.triples_columna[col] == 0
+        )
+
+    def terminada(self) -> bool:
+        return self.vacios == 0 and self.desbalanceadas == 0 and self.triples == 0
+
+
+def linea_bits_es_valida(unos: int, llenos: int, largo: int) -> bool:
+    """Equivalente a `es_valida` para una línea de `largo` casilleros
+    representada con dos máscaras de bits: `llenos` tiene un 1 en cada
+    casillero ocupado, y `unos` tiene un 1 en cada casillero ocupado por un 1
+    (el bit `i` corresponde al casillero `i`)."""
+    todos = (1 << largo) - 1
+    if llenos != todos:
+        return False
+    if unos.bit_count() * 2 != largo:
+        return False
+    ceros = ~unos & todos
+    return not (unos & (unos >> 1) & (unos >> 2)) and not (
+        ceros & (ceros >> 1) & (ceros >> 2)
+    )
+
+
+class GrillaBits:
+    """Grilla que guarda cada fila como dos enteros usados como máscaras de
+    bits (casilleros ocupados y casilleros con un 1), más una copia
+    transpuesta con las mismas máscaras para cada columna.
+
+    Usa dos bits por casillero (cuatro contando la copia de columnas) y
+    valida una fila o columna con un conteo de bits y unos pocos
+    desplazamientos, sin recorrer los casilleros uno por uno.
+
+    `grilla[fil]` devuelve la fila como cadena, en el mismo formato que
+    recibe `crear_grilla`."""
+
+    def __init__(self, desc: List[str]):
+        self.alto = len(desc)
+        self.ancho = len(desc[0])
+        self.unos_fila = [0] * self.alto
+        self.llenos_fila = [0] * self.alto
+        self.unos_columna = [0] * self.ancho
+        self.llenos_columna = [0] * self.ancho
+        for fil, fila in enumerate(desc):
+            for col in range(self.ancho):
+                self._poner(col, fil, fila[col])
+
+    def __len__(self) -> int:
+        return self.alto
+
+    def __getitem__(self, fil: int) -> str:
+        return "".join(self.valor(col, fil) for col in range(self.ancho))
+
+    def __iter__(self):
+        return (self[fil] for fil in range(self.alto))
+
+    def __repr__(self) -> str:
+        return f"GrillaBits({list(self)!r})"
+
+    def valor(self, col: int, fil: int) -> str:
+        if not (self.llenos_fila[fil] >> col) & 1:
+            return VACIO
+        if (self.unos_fila[fil] >> col) & 1:
+            return UNO
+        return CERO
+
+    def _poner(self, col: int, fil: int, valor: str):
+        bit_fila = 1 << col
+        bit_columna = 1 << fil
+        if valor == VACIO:
+            self.llenos_fila[fil] &= ~bit_fila
+            self.llenos_columna[col] &= ~bit_columna
+        else:
+            self.llenos_fila[fil] |= bit_fila
+            self.llenos_columna[col] |= bit_columna
+        if valor == UNO:
+            self.unos_fila[fil] |= bit_fila
+            self.unos_columna[col] |= bit_columna
+        else:
+            self.unos_fila[fil] &= ~bit_fila
+            self.unos_columna[col] &= ~bit_columna
+
+    def cambiar(self, col: int, fil: int, valor: str):
+        self._poner(col, fil, valor)
+
+    def fila_es_valida(self, fil: int) -> bool:
+        return linea_bits_es_valida(
+            self.unos_fila[fil], self.llenos_fila[fil], self.ancho
+        )
+
+    def columna_es_valida(self, col: int) -> bool:
+        return linea_bits_es_valida(
+            self.unos_columna[col], self.llenos_columna[col], self.alto
+        )
+
+    def terminada(self) -> bool:
+        return all(
+            self.fila_es_valida(fil) for fil in range(self.alto)
+        ) and all(
+            self.columna_es_valida(col) for col in range(self.ancho)
+        )
+
+
+class GrillaColumnas:
+    """Grilla que guarda las filas como listas (igual que la representación
+    de listas) y además una copia de cada columna como `bytearray`.
+
+    `cambiar_a_uno`, `cambiar_a_cero` y `cambiar_a_vacio` actualizan ambas
+    copias, así `columna_es_valida` valida la columna ya armada en lugar de
+    construir una lista nueva en cada llamada. Las filas se pueden leer con
+    `grilla[fil][col]`, pero **no** se deben modificar directamente."""
+
+    def __init__(self, desc: List[str]):
+        self.filas = [list(fila) for fila in desc]
+        self.columnas = [
+            bytearray("".join(columna), "ascii") for columna in zip(*desc)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.filas)
+
+    def __getitem__(self, fil: int) -> List[str]:
+        return self.filas[fil]
+
+    def __iter__(self):
+        return iter(self.filas)
+
+    def __repr__(self) -> str:
+        return f"GrillaColumnas({[''.join(fila) for fila in self.filas]!r})"
+
+    def valor(self, col: int, fil: int) -> str:
+        return self.filas[fil][col]
+
+    def cambiar(self, col: int, fil: int, valor: str):
+        self.filas[fil][col] = valor
+        self.columnas[col][fil] = ord(valor)
+
+    def fila_es_valida(self, fil: int) -> bool:
+        return fila_es_valida(self.filas, fil)
+
+    def columna_es_valida(self, col: int) -> bool:
+        return _bytes_es_valida(self.columnas[col])
+
+    def terminada(self) -> bool:
+        return all(
+            fila_es_valida(self.filas, fil) for fil in range(len(self.filas))
+        ) and all(_bytes_es_valida(columna) for columna in self.columnas)
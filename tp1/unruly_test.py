@@ -1,10 +1,36 @@
 # -*- coding: utf-8 -*-
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
 import pprint
+import random
 import sys
+import tempfile
 import traceback
 from typing import List
 
+import cache_resultados
+import deduplicar
+import dificultad
+import generador
+import historial
+import indice_niveles
+import main as juego
+import niveles
+import paquete_niveles
+import partida
+import pistas
+import resolvedor
+import resolvedor_paralelo
+import servidor
+import sesiones
+import simetrias
 import unruly
+import viabilidad
 
 # Si las pruebas se ven mal en tu terminal, probá cambiando el valor
 # de esta constante a True para desactivar los colores ANSI.
@@ -414,6 +440,1082 @@ def test_13_colocar_y_terminar_una_grilla():
     )
 
 
+def test_14_grilla_incremental():
+    """Crea la misma grilla con la representación de listas y con la
+    incremental, aplica una secuencia fija de cambios aleatorios y se asegura
+    que ambas coincidan en `fila_es_valida`, `columna_es_valida` y
+    `grilla_terminada` después de cada cambio."""
+    desc = [
+        "10010101",
+        "11001010",
+        "00110101",
+        "01101001",
+        "10010110",
+        "11001001",
+        "00110110",
+        "01101010",
+    ]
+    grilla = unruly.crear_grilla(desc)
+    incremental = unruly.crear_grilla(desc, representacion=unruly.INCREMENTAL)
+    assert unruly.grilla_terminada(incremental) is True
+    cambios = (unruly.cambiar_a_uno, unruly.cambiar_a_cero, unruly.cambiar_a_vacio)
+    azar = random.Random(14)
+    for _ in range(300):
+        cambiar = azar.choice(cambios)
+        x = azar.randrange(8)
+        y = azar.randrange(8)
+        cambiar(grilla, x, y)
+        cambiar(incremental, x, y)
+        validar_estado(["".join(fila) for fila in grilla], incremental)
+        for i in range(8):
+            assert unruly.fila_es_valida(incremental, i) == unruly.fila_es_valida(grilla, i), (
+                f"Fila {i} difiere luego de {cambiar.__name__}({x}, {y})"
+            )
+            assert unruly.columna_es_valida(incremental, i) == unruly.columna_es_valida(grilla, i), (
+                f"Columna {i} difiere luego de {cambiar.__name__}({x}, {y})"
+            )
+        assert unruly.grilla_terminada(incremental) == unruly.grilla_terminada(grilla), (
+            f"grilla_terminada difiere luego de {cambiar.__name__}({x}, {y}):\n"
+            f"{pprint.pformat(grilla)}"
+        )
+
+
+def test_15_grilla_bits():
+    """Repite las pruebas de representación, cambios y validación usando la
+    representación de máscaras de bits."""
+    desc_inicial = [
+        "  01",
+        "101 ",
+        "  0 ",
+        " 10 ",
+    ]
+    desc_esperada = [
+        " 001",
+        "1 1 ",
+        "  0 ",
+        " 10 ",
+    ]
+    grilla = unruly.crear_grilla(desc_inicial, representacion=unruly.BITS)
+    validar_estado(desc_inicial, grilla)
+    unruly.cambiar_a_cero(grilla, 1, 0)
+    unruly.cambiar_a_vacio(grilla, 1, 1)
+    unruly.cambiar_a_uno(grilla, 2, 1)
+    validar_estado(desc_esperada, grilla)
+
+    desc = [
+        "1101001100",
+        " 101001110",
+        "0011100010",
+        " 1001110 1",
+        "11011110 1",
+        "0010010101",
+        "0010000110",
+        "1101110011",
+    ]
+    listas = unruly.crear_grilla(desc)
+    bits = unruly.crear_grilla(desc, representacion=unruly.BITS)
+    for fila in range(8):
+        assert unruly.fila_es_valida(bits, fila) == unruly.fila_es_valida(listas, fila), (
+            f"Fila {fila} difiere:\n{pprint.pformat(bits)}"
+        )
+    for columna in range(10):
+        assert unruly.columna_es_valida(bits, columna) == unruly.columna_es_valida(listas, columna), (
+            f"Columna {columna} difiere:\n{pprint.pformat(bits)}"
+        )
+
+    desc_inicial = [
+        "101101",
+        "011010",
+        "100101",
+        "000011",
+        "101110",
+        "010101",
+    ]
+    grilla = unruly.crear_grilla(desc_inicial, representacion=unruly.BITS)
+    assert not unruly.grilla_terminada(grilla)
+    unruly.cambiar_a_cero(grilla, 5, 0)
+    unruly.cambiar_a_cero(grilla, 3, 4)
+    unruly.cambiar_a_uno(grilla, 1, 3)
+    assert unruly.grilla_terminada(grilla), (
+        f"Grilla final no se consideró como terminada:\n"
+        f"{pprint.pformat(grilla)}"
+    )
+
+
+def test_16_validacion_en_lote():
+    """Valida en lote (con NumPy) todos los niveles de `niveles.NIVELES`,
+    agrupados por dimensiones, junto con grillas terminadas y mal terminadas,
+    y se asegura que el resultado coincida con `grilla_terminada` y con
+    `fila_es_valida` / `columna_es_valida` para cada grilla."""
+    import validacion_lote
+
+    descs = list(niveles.NIVELES) + [
+        [
+            "101100",
+            "011010",
+            "100101",
+            "010011",
+            "101010",
+            "010101",
+        ],
+        [
+            "101100",
+            "011011",
+            "100101",
+            "010101",
+            "101010",
+            "110100",
+        ],
+        [
+            "10010101",
+            "11001010",
+            "00110101",
+            "01101001",
+            "10010110",
+            "11001001",
+            "00110110",
+            "01101010",
+        ],
+    ]
+    por_dimensiones = {}
+    for desc in descs:
+        por_dimensiones.setdefault((len(desc[0]), len(desc)), []).append(desc)
+
+    for lote in por_dimensiones.values():
+        arreglo = validacion_lote.grillas_a_arreglo(lote)
+        terminadas, filas, columnas = validacion_lote.grillas_terminadas(
+            arreglo, mascaras=True
+        )
+        for k, desc in enumerate(lote):
+            grilla = unruly.crear_grilla(desc)
+            ancho, alto = unruly.dimensiones(grilla)
+            assert bool(terminadas[k]) == unruly.grilla_terminada(grilla), (
+                f"Resultado distinto para la grilla:\n{pprint.pformat(grilla)}"
+            )
+            for fila in range(alto):
+                assert bool(filas[k, fila]) == unruly.fila_es_valida(grilla, fila)
+            for columna in range(ancho):
+                assert bool(columnas[k, columna]) == unruly.columna_es_valida(grilla, columna)
+
+
+def test_17_resolver_niveles():
+    """Resuelve todos los niveles de `niveles.NIVELES` y se asegura que cada
+    solución esté terminada y respete los casilleros iniciales. También se
+    asegura que una grilla sin solución devuelva None."""
+    for desc in niveles.NIVELES:
+        solucion = resolvedor.resolver(desc)
+        assert solucion is not None, f"No se encontró solución para {desc}"
+        assert unruly.grilla_terminada(solucion), (
+            f"Solución inválida para {desc}:\n{pprint.pformat(solucion)}"
+        )
+        for y, fila in enumerate(desc):
+            for x, c in enumerate(fila):
+                assert c == " " or solucion[y][x] == c, (
+                    f"La solución cambió el casillero ({x}, {y}) de {desc}"
+                )
+
+    # Cada fila y columna se puede completar por separado, pero no todas a
+    # la vez.
+    sin_solucion = [
+        " 11 ",
+        "  10",
+        "    ",
+        "   0",
+    ]
+    assert resolvedor.resolver(sin_solucion) is None
+    rectangular = resolvedor.resolver([" " * 10] * 6)
+    assert rectangular is not None and unruly.grilla_terminada(rectangular)
+
+
+def test_18_tablas_de_lineas_validas():
+    """Se asegura que la tabla de líneas válidas de cada largo contenga
+    exactamente las líneas que acepta `es_valida`, y que `completar_linea`
+    devuelva sólo las líneas compatibles con los casilleros ocupados."""
+    for largo in range(2, 13, 2):
+        esperadas = set()
+        for valores in itertools.product((0, 1), repeat=largo):
+            if unruly.es_valida([str(v) for v in valores]):
+                esperadas.add(sum(v << i for i, v in enumerate(valores)))
+        assert unruly.lineas_validas(largo) == esperadas, (
+            f"Tabla incorrecta para largo {largo}"
+        )
+
+    # Casilleros 0 y 1 ocupados por un 1: el casillero 2 tiene que ser 0
+    completadas = unruly.completar_linea(6, 0b000011, 0b000011)
+    assert completadas, "No se encontraron líneas para completar 11????"
+    for linea in completadas:
+        assert linea & 0b111 == 0b011 and linea in unruly.lineas_validas(6)
+
+    # Filas más largas que las tablas usan la validación sin tabla
+    largo = unruly.LARGO_MAXIMO_TABLA + 2
+    grilla = unruly.crear_grilla(["01" * (largo // 2), "10" * (largo // 2)])
+    assert unruly.fila_es_valida(grilla, 0) and unruly.fila_es_valida(grilla, 1)
+
+    # Las líneas con otros caracteres no son válidas (ni se buscan en la tabla)
+    grilla = [list("1x01"), list("0_10"), list("1010"), list("0101")]
+    assert not unruly.fila_es_valida(grilla, 0) and not unruly.fila_es_valida(grilla, 1)
+    assert not unruly.columna_es_valida(grilla, 1)
+
+
+def test_19_contar_soluciones():
+    """Compara `contar_soluciones` con una cuenta por fuerza bruta sobre
+    grillas chicas (cuadradas y rectangulares), con y sin límite."""
+
+    def fuerza_bruta(desc):
+        ancho = len(desc[0])
+        filas = []
+        for fila in desc:
+            filas.append([
+                linea for linea in unruly.lineas_validas(ancho)
+                if all(c == " " or (linea >> i & 1) == int(c) for i, c in enumerate(fila))
+            ])
+        cantidad = 0
+        for lineas in itertools.product(*filas):
+            grilla = [["1" if linea >> i & 1 else "0" for i in range(ancho)] for linea in lineas]
+            if unruly.grilla_terminada(grilla):
+                cantidad += 1
+        return cantidad
+
+    descripciones = [
+        ["    ", "    ", "    ", "    "],
+        ["      ", "      ", "      ", "      "],
+        ["1 0 ", "    ", " 1  ", "    "],
+        ["  1 0 ", " 0    ", "    1 ", "1     ", "  0   ", "     1"],
+        ["    ", " 1  ", "  0 ", "    ", "1   ", "    "],
+        list(niveles.NIVELES[0]),
+    ]
+    for desc in descripciones:
+        esperada = fuerza_bruta(desc)
+        obtenida = resolvedor.contar_soluciones(desc)
+        assert obtenida == esperada, (
+            f"Se contaron {obtenida} soluciones en vez de {esperada} para {desc}"
+        )
+        assert resolvedor.contar_soluciones(desc, limite=2) == min(esperada, 2)
+        limite = resolvedor.LIMITE_ENUMERABLE + 1
+        assert resolvedor.contar_soluciones(desc, limite=limite) == min(esperada, limite)
+
+    # Niveles generados, cuya cuenta fila por fila tiene que coincidir con la
+    # búsqueda, y grillas vacías grandes y muy altas, que sólo se pueden
+    # verificar con un límite chico
+    azar = random.Random(19)
+    for _ in range(3):
+        desc = generador.generar_nivel(10, 10, azar)
+        assert resolvedor.contar_soluciones(desc) == 1
+        desc[0] = " " * 10
+        celdas, ancho, alto = resolvedor.celdas_desde_grilla(desc)
+        esperada = len(resolvedor.enumerar_soluciones(celdas, ancho, alto, 1000))
+        assert resolvedor.contar_soluciones(desc, limite=1000) == esperada
+        assert resolvedor.contar_soluciones(desc) >= esperada
+    assert resolvedor.contar_soluciones([" " * 14] * 14, limite=2) == 2
+    assert resolvedor.contar_soluciones([" " * 4] * 200, limite=2) == 2
+
+
+def test_20_generar_niveles():
+    """Genera niveles de varios tamaños y se asegura que tengan el formato de
+    `niveles.NIVELES`, que tengan solución única y que la misma semilla
+    produzca siempre los mismos niveles."""
+    for ancho, alto in ((4, 4), (6, 6), (8, 6)):
+        generados = generador.generar_niveles(ancho, alto, 5, semilla=20, procesos=1)
+        assert len(generados) == 5
+        for desc in generados:
+            assert len(desc) == alto and all(len(fila) == ancho for fila in desc)
+            assert set("".join(desc)) <= {" ", "0", "1"}
+            assert resolvedor.contar_soluciones(desc, limite=2) == 1, (
+                "El nivel generado no tiene solución única:\n" + "\n".join(desc)
+            )
+        repetidos = generador.generar_niveles(ancho, alto, 5, semilla=20, procesos=1)
+        assert repetidos == generados
+
+
+def test_21_paquete_de_niveles():
+    """Convierte `niveles.NIVELES` a un paquete de niveles, lo vuelve a abrir
+    y se asegura que cada nivel se lea igual que el original, tanto por
+    tamaño y número como como grilla."""
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "niveles.bin")
+        cantidades = paquete_niveles.escribir_paquete(ruta, niveles.NIVELES)
+        assert sum(cantidades.values()) == len(niveles.NIVELES)
+        numeros = {}
+        with paquete_niveles.PaqueteNiveles(ruta) as paquete:
+            assert len(paquete) == len(niveles.NIVELES)
+            for desc in niveles.NIVELES:
+                ancho, alto = len(desc[0]), len(desc)
+                numero = numeros.get((ancho, alto), 0)
+                numeros[ancho, alto] = numero + 1
+                leido = paquete.nivel(ancho, alto, numero)
+                assert leido == desc, f"Se leyó {leido} en vez de {desc}"
+                validar_estado(desc, paquete.grilla(ancho, alto, numero))
+            assert paquete.nivel_al_azar(random.Random(21)) in niveles.NIVELES
+
+
+def test_22_grilla_terminada_por_filas():
+    """Valida grillas terminadas y mal terminadas leyéndolas fila por fila
+    (como lista de cadenas y como archivo de texto y binario), y se asegura
+    que la lectura se corte en la primera fila inválida."""
+    terminadas = [
+        [
+            "10010101",
+            "11001010",
+            "00110101",
+            "01101001",
+            "10010110",
+            "11001001",
+            "00110110",
+            "01101010",
+        ],
+        [
+            "10110100",
+            "01001011",
+            "01101100",
+            "10110010",
+            "01001011",
+            "10010101",
+        ],
+    ]
+    mal_terminadas = [
+        ["101100", "011010", "100101", "010101", "1010 0", "010101"],
+        ["101100", "011011", "100101", "010101", "101010", "110100"],
+        ["101100", "011011", "100101", "010101", "101010", "010101"],
+        ["1010", "0101", "1010"],
+        ["0101", "0101", "1010", "1010"],
+    ]
+    for desc in terminadas + mal_terminadas:
+        esperado = unruly.grilla_terminada([list(fila) for fila in desc])
+        assert unruly.grilla_terminada_por_filas(desc) is esperado, (
+            f"Se esperaba {esperado} para {desc}"
+        )
+        archivo = io.StringIO("\n".join(desc) + "\n")
+        assert unruly.grilla_terminada_por_filas(archivo) is esperado
+        binario = io.BytesIO(("\r\n".join(desc) + "\r\n").encode("ascii"))
+        assert unruly.grilla_terminada_por_filas(binario) is esperado
+        # Las líneas vacías se ignoran, como en `crear_grilla`
+        con_vacias = io.StringIO("\n" + "\n".join(desc) + "\n\n")
+        assert unruly.grilla_terminada_por_filas(con_vacias) is esperado
+
+    leidas = []
+
+    def filas():
+        for fila in ["1010", "1110", "0101", "0011"]:
+            leidas.append(fila)
+            yield fila
+
+    assert unruly.grilla_terminada_por_filas(filas()) is False
+    assert leidas == ["1010", "1110"], f"Se leyeron de más: {leidas}"
+
+
+def test_23_violaciones():
+    """Se asegura que `violaciones` encuentre las filas y columnas excedidas y
+    los tríos de casilleros iguales de una grilla conocida, y que el estado
+    de una grilla incremental coincida con recorrer toda la grilla luego de
+    cada cambio."""
+    desc = [
+        "1110",
+        "1 0 ",
+        "1 0 ",
+        "0 0 ",
+    ]
+    encontradas = unruly.violaciones(unruly.crear_grilla(desc))
+    assert encontradas.filas == {0: (3, 1)}, encontradas.filas
+    assert encontradas.columnas == {0: (3, 1), 2: (1, 3)}, encontradas.columnas
+    assert encontradas.ternas == {
+        ((0, 0), (1, 0), (2, 0)),
+        ((0, 0), (0, 1), (0, 2)),
+        ((2, 1), (2, 2), (2, 3)),
+    }, encontradas.ternas
+
+    grilla = unruly.crear_grilla(["      "] * 6)
+    incremental = unruly.crear_grilla(["      "] * 6, representacion=unruly.INCREMENTAL)
+    cambios = (unruly.cambiar_a_uno, unruly.cambiar_a_cero, unruly.cambiar_a_vacio)
+    azar = random.Random(23)
+    for _ in range(300):
+        cambiar = azar.choice(cambios)
+        x = azar.randrange(6)
+        y = azar.randrange(6)
+        cambiar(grilla, x, y)
+        cambiar(incremental, x, y)
+        esperadas = unruly.violaciones(grilla)
+        obtenidas = unruly.violaciones(incremental)
+        assert obtenidas == esperadas, (
+            f"Violaciones distintas luego de {cambiar.__name__}({x}, {y}):\n"
+            f"{pprint.pformat(grilla)}\n{obtenidas}\n{esperadas}"
+        )
+
+
+def test_24_crear_grilla_desde_texto_bytes_y_archivos():
+    """Crea la misma grilla a partir de una lista de cadenas, de un texto, de
+    `bytes`, de una lista de `bytes` y de archivos abiertos en modo texto y
+    binario, y se asegura que `crear_grilla` no imprima nada salvo que se lo
+    pida."""
+    desc = [
+        "  01",
+        "101 ",
+        "  0 ",
+        " 10 ",
+    ]
+    texto = "\n".join(desc) + "\n"
+    variantes = [
+        desc,
+        texto,
+        texto.encode("ascii"),
+        [fila.encode("ascii") for fila in desc],
+        io.StringIO(texto),
+        io.BytesIO(texto.replace("\n", "\r\n").encode("ascii")),
+    ]
+    for variante in variantes:
+        salida = io.StringIO()
+        with contextlib.redirect_stdout(salida):
+            grilla = unruly.crear_grilla(variante)
+        assert salida.getvalue() == "", f"crear_grilla imprimió {salida.getvalue()!r}"
+        validar_estado(desc, grilla)
+
+    salida = io.StringIO()
+    with contextlib.redirect_stdout(salida):
+        unruly.crear_grilla(desc, mostrar=True)
+    assert salida.getvalue() == texto
+
+
+def test_25_grilla_con_columnas():
+    """Aplica una secuencia fija de cambios aleatorios a una grilla con copia
+    de las columnas y a una de listas, y se asegura que coincidan en el
+    estado y en las validaciones luego de cada cambio."""
+    desc = [
+        "101100",
+        "011010",
+        "100101",
+        "000011",
+        "101110",
+        "010101",
+    ]
+    grilla = unruly.crear_grilla(desc)
+    columnas = unruly.crear_grilla(desc, representacion=unruly.COLUMNAS)
+    validar_estado(desc, columnas)
+    cambios = (unruly.cambiar_a_uno, unruly.cambiar_a_cero, unruly.cambiar_a_vacio)
+    azar = random.Random(25)
+    for _ in range(200):
+        cambiar = azar.choice(cambios)
+        x = azar.randrange(6)
+        y = azar.randrange(6)
+        cambiar(grilla, x, y)
+        cambiar(columnas, x, y)
+        validar_estado(["".join(fila) for fila in grilla], columnas)
+        for i in range(6):
+            assert unruly.fila_es_valida(columnas, i) == unruly.fila_es_valida(grilla, i)
+            assert unruly.columna_es_valida(columnas, i) == unruly.columna_es_valida(grilla, i), (
+                f"Columna {i} difiere luego de {cambiar.__name__}({x}, {y})"
+            )
+        assert unruly.grilla_terminada(columnas) == unruly.grilla_terminada(grilla)
+
+    columnas = unruly.crear_grilla(desc, representacion=unruly.COLUMNAS)
+    unruly.cambiar_a_cero(columnas, 5, 0)
+    unruly.cambiar_a_cero(columnas, 3, 4)
+    unruly.cambiar_a_uno(columnas, 1, 3)
+    assert unruly.grilla_terminada(columnas)
+
+
+def test_26_pistas():
+    """Pide pistas mientras juega un nivel y se asegura que cada una sea
+    correcta, que sea la misma que se obtiene analizando toda la grilla y
+    que las reglas de una línea sean las esperadas."""
+    assert pistas.pista_de_linea((1, 1, -1, -1)) == (2, 0, pistas.PAR)
+    assert pistas.pista_de_linea((0, -1, 0, -1)) == (1, 1, pistas.HUECO)
+    assert pistas.pista_de_linea((1, -1, -1, 1, 0, 1)) == (1, 0, pistas.CUOTA)
+    assert pistas.pista_de_linea((-1, 1, -1, -1, -1, 1)) == (0, 0, pistas.LINEA)
+    assert pistas.pista_de_linea((-1, -1, -1, -1)) is None
+    assert pistas.pista_de_linea((1, 1, 1, -1)) is None
+    assert pistas.pista_de_linea((0, 0, -1, 1, 1, -1)) is None
+
+    desc = [
+        "     00 ",
+        " 1     1",
+        "  0 0   ",
+        "0   0   ",
+        "0 00    ",
+        "     1  ",
+        "        ",
+        " 11  1 1",
+    ]
+    solucion = resolvedor.resolver(desc)
+    grilla = unruly.crear_grilla(desc, representacion=unruly.INCREMENTAL)
+    pista = pistas.pista(grilla)
+    assert pista is not None, "Debería haber una pista al empezar"
+    azar = random.Random(26)
+    while pista is not None:
+        assert unruly.posicion_es_vacia(grilla, pista.col, pista.fil)
+        assert pista.valor == solucion[pista.fil][pista.col], (
+            f"La pista {pista} no coincide con la solución"
+        )
+        completa = pistas.pista([list(fila) for fila in grilla])
+        assert completa is not None and completa.regla == pista.regla
+        # Un cambio equivocado y deshecho no debería afectar a las pistas
+        x, y = azar.randrange(8), azar.randrange(8)
+        anterior = grilla[y][x]
+        unruly.cambiar_a_uno(grilla, x, y)
+        pistas.pista(grilla)
+        unruly.cambiar_a_cero(grilla, x, y)
+        pistas.pista(grilla)
+        {unruly.UNO: unruly.cambiar_a_uno, unruly.CERO: unruly.cambiar_a_cero}.get(
+            anterior, unruly.cambiar_a_vacio
+        )(grilla, x, y)
+        if pista.valor == unruly.UNO:
+            unruly.cambiar_a_uno(grilla, pista.col, pista.fil)
+        else:
+            unruly.cambiar_a_cero(grilla, pista.col, pista.fil)
+        pista = pistas.pista(grilla)
+    assert pistas.pista([list(fila) for fila in grilla]) is None
+    assert unruly.grilla_terminada(grilla), "Con las pistas se debería terminar el nivel"
+
+
+def test_27_deteccion_de_callejones_sin_salida():
+    """Se asegura que se detecten las líneas y las grillas que ya no se
+    pueden completar, y que luego de cada cambio aleatorio lo que se informa
+    sea cierto y coincida con analizar toda la grilla."""
+    assert viabilidad.motivo_de_linea((1, -1, 1, 1)) == viabilidad.CUOTA
+    assert viabilidad.motivo_de_linea((0, 0, 0, -1, -1, -1)) == viabilidad.TERNA
+    assert viabilidad.motivo_de_linea((1, 1, 0, -1, -1, 1)) == viabilidad.SIN_LINEA
+    assert viabilidad.motivo_de_linea((1, 1, 0, -1, -1, -1)) is None
+
+    callejon = viabilidad.sin_salida(["100 ", "   1", " 0 0", "1   "])
+    assert callejon == viabilidad.Callejon(viabilidad.CONTRADICCION, None, 0), callejon
+
+    desc = [
+        "     00 ",
+        " 1     1",
+        "  0 0   ",
+        "0   0   ",
+        "0 00    ",
+        "     1  ",
+        "        ",
+        " 11  1 1",
+    ]
+    grilla = unruly.crear_grilla(desc, representacion=unruly.INCREMENTAL)
+    assert viabilidad.sin_salida(grilla) is None
+    unruly.cambiar_a_cero(grilla, 0, 5)
+    assert viabilidad.sin_salida(grilla) == viabilidad.Callejon(viabilidad.TERNA, None, 0)
+    unruly.cambiar_a_vacio(grilla, 0, 5)
+    assert viabilidad.sin_salida(grilla) is None
+
+    cambios = (unruly.cambiar_a_uno, unruly.cambiar_a_cero, unruly.cambiar_a_vacio)
+    azar = random.Random(27)
+    for _ in range(200):
+        azar.choice(cambios)(grilla, azar.randrange(8), azar.randrange(8))
+        callejon = viabilidad.sin_salida(grilla)
+        completa = viabilidad.sin_salida([list(fila) for fila in grilla])
+        if callejon is not None:
+            assert resolvedor.resolver(grilla) is None, (
+                f"{callejon} para una grilla con solución: {grilla}"
+            )
+        if completa is not None and completa.motivo != viabilidad.CONTRADICCION:
+            assert callejon is not None and callejon.motivo != viabilidad.CONTRADICCION
+
+
+def test_28_historial_de_jugadas():
+    """Hace jugadas aleatorias con un historial, las deshace, las rehace y
+    salta a jugadas anteriores, y se asegura que la grilla y su estado
+    incremental queden como en cada momento del juego."""
+    desc = [
+        "     00 ",
+        " 1     1",
+        "  0 0   ",
+        "0   0   ",
+        "0 00    ",
+        "     1  ",
+        "        ",
+        " 11  1 1",
+    ]
+    grilla = unruly.crear_grilla(desc, representacion=unruly.INCREMENTAL)
+    jugadas = historial.Historial(grilla, intervalo=16)
+    assert not jugadas.puede_deshacer() and jugadas.deshacer() is None
+    assert jugadas.cambiar(5, 0, unruly.CERO) is None, "El casillero ya tenía un 0"
+
+    estados = [["".join(fila) for fila in grilla]]
+    azar = random.Random(28)
+    while len(estados) <= 200:
+        x, y = azar.randrange(8), azar.randrange(8)
+        if jugadas.cambiar(x, y, azar.choice([unruly.UNO, unruly.CERO, unruly.VACIO])):
+            estados.append(["".join(fila) for fila in grilla])
+    assert len(jugadas) == 200 and len(jugadas.instantaneas) == 13
+
+    for posicion in range(200, 150, -1):
+        validar_estado(estados[posicion], grilla)
+        jugadas.deshacer()
+    for posicion in range(150, 170):
+        jugadas.rehacer()
+        validar_estado(estados[posicion + 1], grilla)
+    for posicion in (3, 199, 100, 0, 200, 64, 65, 47):
+        jugadas.ir_a(posicion)
+        assert jugadas.posicion == posicion
+        validar_estado(estados[posicion], grilla)
+        esperada = unruly.GrillaIncremental(estados[posicion])
+        assert grilla.violaciones() == esperada.violaciones()
+        assert grilla.terminada() == esperada.terminada()
+
+    # Una jugada nueva descarta las que se podían rehacer
+    jugadas.ir_a(40)
+    nueva = jugadas.cambiar(0, 0, unruly.VACIO) or jugadas.cambiar(0, 0, unruly.UNO)
+    assert nueva is not None
+    assert len(jugadas) == 41 and not jugadas.puede_rehacer()
+    assert len(jugadas.instantaneas) == 3
+    jugadas.ir_a(32)
+    validar_estado(estados[32], grilla)
+
+
+def test_29_guardar_y_cargar_partidas():
+    """Guarda y carga partidas de distintos tamaños y representaciones, y se
+    asegura que se recuperen la grilla, el nivel y las jugadas."""
+    desc = [
+        "1 0 1 ",
+        "  0 0 ",
+        "      ",
+        "011010",
+    ]
+    for representacion in (unruly.LISTAS, unruly.INCREMENTAL, unruly.BITS, unruly.COLUMNAS):
+        grilla = unruly.crear_grilla(desc, representacion)
+        datos = partida.partida_a_bytes(grilla, nivel=12, jugadas=34)
+        assert len(datos) == partida.ENCABEZADO.size + 6
+        cargada = partida.partida_desde_bytes(datos, representacion)
+        validar_estado(desc, cargada.grilla)
+        assert (cargada.nivel, cargada.jugadas) == (12, 34)
+        assert type(cargada.grilla) is type(grilla)
+
+    azar = random.Random(29)
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "partida.bin")
+        for ancho, alto in ((1, 1), (7, 3), (4, 9), (64, 50)):
+            desc = [
+                "".join(azar.choice("10 ") for _ in range(ancho)) for _ in range(alto)
+            ]
+            partida.guardar_partida(ruta, unruly.crear_grilla(desc))
+            grilla, nivel, jugadas = partida.cargar_partida(ruta)
+            validar_estado(desc, grilla)
+            assert (nivel, jugadas) == (partida.SIN_NIVEL, 0)
+
+    for datos in (b"", b"UNRP" + bytes(20), partida.partida_a_bytes([["1", "0"]])[:-1]):
+        with contextlib.suppress(ValueError):
+            partida.partida_desde_bytes(datos)
+            raise AssertionError(f"{datos!r} no debería cargarse como partida")
+
+
+def test_30_jugadas_sin_interfaz():
+    """Aplica jugadas escritas como texto sin interfaz y se asegura que se
+    apliquen las válidas, se cuenten las inválidas y se detecte cuándo queda
+    terminada la grilla."""
+    desc = [
+        "1  1",
+        " 1 0",
+        "0 1 ",
+        "0 1 ",
+    ]
+    grilla = unruly.crear_grilla(desc, representacion=unruly.INCREMENTAL)
+    jugadas = io.StringIO(
+        "1 0 0\n"
+        "\n"
+        "2 0 x\n"
+        "9 0 1\n"
+        "0 1 1\n"
+        "2 1 0\n"
+        "1 2 0\n"
+        "3 2 -\n"
+        "3 2 1\n"
+        "uno dos tres\n"
+        "1 3 1\n"
+        "3 3 0\n"
+        "2 0 0\n"
+        "0 0 vacio\n"
+    )
+    salida = io.StringIO()
+    resumen = juego.aplicar_jugadas(grilla, jugadas, cada=2, salida=salida)
+    assert resumen.jugadas == 9 and resumen.invalidas == 3
+    assert resumen.terminada_en == 9, resumen
+    assert unruly.grilla_terminada(grilla)
+    assert jugadas.readline() == "0 0 vacio\n", "No debería seguir luego de terminar"
+    assert salida.getvalue().count("jugadas/s") == 4
+
+
+def test_31_servidor():
+    """Levanta el servidor en un puerto libre de localhost, conecta dos
+    clientes a la vez y se asegura que cada uno juegue su propia partida
+    hasta terminarla, con las jugadas inválidas rechazadas."""
+
+    async def pedir(lector, escritor, pedido):
+        escritor.write((pedido if isinstance(pedido, bytes) else json.dumps(pedido).encode()) + b"\n")
+        return json.loads(await lector.readline())
+
+    async def jugar_partida(puerto):
+        lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+        estado = json.loads(await lector.readline())
+        assert estado["grilla"] == niveles.NIVELES[estado["nivel"]]
+        for pedido in (
+            b"no es json",
+            {"accion": "volar"},
+            {"accion": "jugar", "col": estado["ancho"], "fil": 0, "valor": "1"},
+            {"accion": "jugar", "col": 0, "fil": 0, "valor": "2"},
+            {"accion": "jugar", "col": "0", "fil": 0, "valor": "1"},
+        ):
+            respuesta = await pedir(lector, escritor, pedido)
+            assert respuesta["ok"] is False and respuesta["error"], respuesta
+
+        solucion = resolvedor.resolver(estado["grilla"])
+        vacios = [
+            (col, fil)
+            for fil, fila in enumerate(estado["grilla"])
+            for col, valor in enumerate(fila)
+            if valor == unruly.VACIO
+        ]
+        for i, (col, fil) in enumerate(vacios):
+            pedido = {"accion": "jugar", "col": col, "fil": fil, "valor": solucion[fil][col]}
+            respuesta = await pedir(lector, escritor, pedido)
+            assert respuesta == {
+                "ok": True, "terminada": i == len(vacios) - 1, "sin_salida": None
+            }, respuesta
+        respuesta = await pedir(lector, escritor, {"accion": "grilla"})
+        assert respuesta["grilla"] == ["".join(fila) for fila in solucion]
+        respuesta = await pedir(lector, escritor, {"accion": "deshacer"})
+        assert respuesta["movimiento"] == [col, fil, unruly.VACIO, solucion[fil][col]]
+        respuesta = await pedir(lector, escritor, {"accion": "pista"})
+        assert respuesta["pista"]["col"] == col and respuesta["pista"]["fil"] == fil
+        escritor.close()
+        await escritor.wait_closed()
+        return estado["sesion"]
+
+    async def probar():
+        atendedor = servidor.Servidor(random.Random(31))
+        escucha = await atendedor.iniciar("127.0.0.1", 0)
+        puerto = escucha.sockets[0].getsockname()[1]
+        async with escucha:
+            sesiones = await asyncio.gather(jugar_partida(puerto), jugar_partida(puerto))
+            assert sorted(sesiones) == [1, 2]
+            for _ in range(100):
+                if not atendedor.sesiones:
+                    break
+                await asyncio.sleep(0.01)
+            assert not atendedor.sesiones, "Las sesiones cerradas deberían descartarse"
+
+    asyncio.run(probar())
+
+
+def test_32_almacen_de_sesiones():
+    """Se asegura que el almacén de sesiones mantenga en memoria sólo las
+    usadas más recientemente, baje las demás a disco y las recupere intactas,
+    y que el servidor siga las partidas aunque se bajen a disco."""
+    ahora = [0.0]
+    with tempfile.TemporaryDirectory() as carpeta:
+        almacen = sesiones.AlmacenSesiones(
+            lambda texto: texto.encode(),
+            lambda numero, datos: datos.decode(),
+            maximo_en_memoria=2,
+            carpeta=carpeta,
+            reloj=lambda: ahora[0],
+        )
+        for numero in range(1, 5):
+            ahora[0] += 1
+            almacen.agregar(numero, f"sesión {numero}")
+        assert list(almacen.en_memoria) == [3, 4] and sorted(almacen.en_disco) == [1, 2]
+        assert len(almacen) == 4 and 1 in almacen and 5 not in almacen
+        assert almacen.obtener(1) == "sesión 1"
+        assert list(almacen.en_memoria) == [4, 1], "La sesión 3 era la menos usada"
+        almacen.descartar(2)
+        almacen.descartar(3)
+        assert sorted(os.listdir(carpeta)) == []
+        with contextlib.suppress(KeyError):
+            almacen.obtener(2)
+            raise AssertionError("La sesión 2 se descartó")
+
+        ahora[0] = 100
+        almacen.obtener(1)
+        assert almacen.desalojar_inactivas(50) == 1 and list(almacen.en_disco) == [4]
+        metricas = almacen.metricas()
+        assert metricas["en_memoria"] == 1 and metricas["en_disco"] == 1
+        assert metricas["desalojos"] == 4 and metricas["cargas"] == 1
+        assert metricas["bytes_en_disco"] == len("sesión 4".encode())
+        assert 0 < metricas["carga_p50"] <= metricas["carga_maxima"]
+        almacen.cerrar()
+
+    atendedor = servidor.Servidor(random.Random(32), maximo_en_memoria=1)
+    primera = atendedor.abrir_sesion()
+    respuesta = servidor.procesar(primera, {"accion": "jugar", "col": 1, "fil": 0, "valor": "0"})
+    assert respuesta["ok"]
+    atendedor.abrir_sesion()
+    assert atendedor.sesiones.en_disco, "La primera sesión debería estar en disco"
+    recuperada = atendedor.sesiones.obtener(primera.numero)
+    assert recuperada is not primera and recuperada.jugadas == 1
+    assert recuperada.nivel == primera.nivel
+    validar_estado(["".join(fila) for fila in primera.grilla], recuperada.grilla)
+    atendedor.sesiones.cerrar()
+
+
+def test_33_resolvedor_paralelo():
+    """Se asegura que los subproblemas en que se divide una grilla repartan
+    sus soluciones sin repetirlas ni perder ninguna, y que la búsqueda (en un
+    solo proceso) encuentre las soluciones pedidas y se detenga cuando se le
+    avisa."""
+    descripciones = [
+        ["    ", "    ", "    ", "    "],
+        ["      ", "      ", "      ", "      "],
+        ["  1 0 ", " 0    ", "    1 ", "1     ", "  0   ", "     1"],
+        ["    ", " 1  ", "  0 ", "    ", "1   ", "    "],
+        ["1 1 ", "1   ", "    ", "    "],
+        list(niveles.NIVELES[0]),
+    ]
+    for desc in descripciones:
+        celdas, ancho, alto = resolvedor.celdas_desde_grilla(desc)
+        esperada = resolvedor.contar_soluciones(desc)
+        todas = resolvedor.enumerar_soluciones(celdas, ancho, alto, esperada + 1)
+        assert len(todas) == esperada, f"Se enumeraron {len(todas)} soluciones en vez de {esperada}"
+        for cantidad in (1, 4, 16):
+            subproblemas, encontradas = resolvedor_paralelo.dividir(celdas, ancho, alto, cantidad)
+            for subproblema in subproblemas:
+                encontradas += resolvedor.enumerar_soluciones(subproblema, ancho, alto, esperada + 1)
+            assert sorted(encontradas) == sorted(todas), (
+                f"Dividir {desc} en {cantidad} subproblemas cambió sus soluciones"
+            )
+        obtenidas = resolvedor_paralelo.soluciones(desc, procesos=1)
+        assert len(obtenidas) == min(esperada, 2)
+        assert all(unruly.grilla_terminada(solucion) for solucion in obtenidas)
+        solucion = resolvedor_paralelo.resolver(desc, procesos=1)
+        assert (solucion is None) == (esperada == 0)
+
+    vacia = [resolvedor.LIBRE] * 64
+    detenida = resolvedor.enumerar_soluciones(vacia, 8, 8, 1000, detener=lambda: True)
+    assert len(detenida) < resolvedor.NODOS_POR_CONSULTA
+
+
+def test_34_cache_de_resultados():
+    """Se asegura que las 16 variantes equivalentes de una grilla tengan la
+    misma forma canónica, que la cache devuelva las mismas respuestas que
+    `resolvedor` para todas ellas sin volver a resolverlas, y que al
+    llenarse borre las entradas usadas hace más tiempo."""
+    for desc in niveles.NIVELES[:10]:
+        forma = simetrias.forma_canonica(desc)
+        assert simetrias.transformar(desc, forma.simetria) == forma.descripcion()
+        for simetria in simetrias.SIMETRIAS:
+            variante = simetrias.transformar(desc, simetria)
+            assert simetrias.destransformar(variante, simetria) == list(desc)
+            assert simetrias.clave_canonica(variante) == simetrias.clave_canonica(desc)
+    assert simetrias.clave_canonica(["1 0 ", "    ", " 1  ", "    "]) != (
+        simetrias.clave_canonica(["1 1 ", "    ", " 1  ", "    "])
+    )
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "resultados.sqlite")
+        with cache_resultados.CacheResultados(ruta) as cache:
+            for desc in niveles.NIVELES[:10]:
+                esperada = resolvedor.contar_soluciones(desc)
+                for simetria in simetrias.SIMETRIAS:
+                    variante = simetrias.transformar(desc, simetria)
+                    solucion = cache.resolver(variante)
+                    assert unruly.grilla_terminada(solucion)
+                    assert all(
+                        c in (unruly.VACIO, solucion[fil][col])
+                        for fil, fila in enumerate(variante)
+                        for col, c in enumerate(fila)
+                    ), f"{solucion} no es solución de {variante}"
+                    assert cache.contar_soluciones(variante, limite=1) == 1
+                    assert cache.contar_soluciones(variante) == esperada
+            metricas = cache.metricas()
+            assert metricas["entradas"] == 10
+            # Cada nivel se resuelve una vez y se cuenta dos (con y sin límite)
+            assert metricas["consultas"] - metricas["aciertos"] == 30
+        with cache_resultados.CacheResultados(ruta) as cache:
+            assert cache.contar_soluciones(niveles.NIVELES[0]) == 1
+            assert cache.metricas()["aciertos"] == 1, "La cache no se guardó en el archivo"
+        tamanio_entrada = cache_resultados.BYTES_POR_ENTRADA
+        with cache_resultados.CacheResultados(ruta, tamanio_maximo=4 * tamanio_entrada) as cache:
+            assert cache.metricas()["bytes"] <= 4 * tamanio_entrada
+            assert cache.contar_soluciones(niveles.NIVELES[0]) == 1
+            assert cache.metricas()["aciertos"] == 1, "El nivel usado último no debió borrarse"
+
+
+def test_35_deduplicar_grillas_equivalentes():
+    """Deduplica un flujo con los niveles de `niveles.NIVELES`, sus variantes
+    equivalentes y grillas repetidas, guardando pocas claves en memoria para
+    que el conjunto baje claves a disco y funda sus tramos, y se asegura que
+    quede exactamente la primera aparición de cada grilla."""
+    azar = random.Random(35)
+    lineas = []
+    for desc in niveles.NIVELES:
+        lineas.append(json.dumps(desc) + "\n")
+        for _ in range(3):
+            variante = simetrias.transformar(desc, azar.choice(simetrias.SIMETRIAS))
+            lineas.append(json.dumps(variante) + "\n")
+    azar.shuffle(lineas)
+    lineas.insert(5, "\n")
+    primeras = {}
+    for linea in lineas:
+        if linea.strip():
+            primeras.setdefault(simetrias.clave_canonica(json.loads(linea)), linea)
+    esperadas = list(primeras.values())
+    # Los niveles de `niveles.NIVELES` no son equivalentes entre sí
+    assert len(primeras) == len(set(map(tuple, niveles.NIVELES)))
+
+    for maximo_en_memoria in (2, 1000):
+        claves = deduplicar.ConjuntoClaves(maximo_en_memoria)
+        salida = io.StringIO()
+        resumen = deduplicar.deduplicar(lineas, salida, claves)
+        assert resumen == (len(lineas) - 1, len(primeras))
+        assert salida.getvalue().splitlines(keepends=True) == esperadas
+        assert len(claves) == len(primeras)
+        assert all(clave in claves for clave in primeras)
+        assert bytes(deduplicar.LARGO_CLAVE) not in claves
+        if maximo_en_memoria == 2:
+            assert claves.en_disco and len(claves.tramos) <= deduplicar.MAXIMO_TRAMOS
+        # Un segundo paso con las mismas claves no deja pasar ninguna grilla
+        assert deduplicar.deduplicar(lineas, io.StringIO(), claves).unicas == 0
+        claves.cerrar()
+
+    with contextlib.suppress(ValueError):
+        deduplicar.deduplicar(['["10", "0"]'], io.StringIO(), deduplicar.ConjuntoClaves())
+        raise AssertionError("Se aceptó una grilla con filas de distinto largo")
+    for invalida in ('["1x", "01"]', '["1é", "01"]'):
+        try:
+            deduplicar.deduplicar(['["10", "01"]', invalida], io.StringIO(), deduplicar.ConjuntoClaves())
+        except ValueError as error:
+            assert "2" in str(error), f"No se informó la línea: {error}"
+        else:
+            raise AssertionError(f"Se aceptó la grilla {invalida}")
+
+
+def test_36_dificultad():
+    """Califica niveles y se asegura que cada casillero vacío lo complete
+    exactamente una técnica, que los niveles con más de una solución
+    necesiten adivinar, que la solución conocida no cambie la calificación,
+    y que `main` elija niveles de la franja pedida a partir del índice."""
+    completa = ["0110", "0011", "1001", "1100"]
+    assert dificultad.calificar(completa) == (0, dificultad.FACIL, (0, 0, 0, 0), (0, 0, 0, 0))
+    # Alcanza con ver el par "00" de la segunda fila
+    assert dificultad.calificar(["0110", "00 1", "1001", "1100"]) == (
+        1, dificultad.FACIL, (1, 0, 0, 0), (1, 0, 0, 0)
+    )
+    # Ninguna ventana sirve, pero varias líneas ya tienen la mitad de un valor
+    assert dificultad.calificar(["01 0", "0  1", "1  1", "1100"]) == (
+        2, dificultad.MEDIO, (0, 1, 0, 0), (0, 5, 0, 0)
+    )
+
+    for desc in niveles.NIVELES:
+        calificacion = dificultad.calificar(desc)
+        assert sum(calificacion.casilleros) == "".join(desc).count(unruly.VACIO)
+        assert calificacion.puntaje == sum(
+            peso * pasos for peso, pasos in zip(dificultad.PESOS, calificacion.pasos)
+        )
+        adivinados = calificacion.pasos[dificultad.TECNICAS.index(dificultad.ADIVINAR)]
+        if resolvedor.contar_soluciones(desc, limite=2) > 1:
+            assert adivinados and calificacion.franja == dificultad.MUY_DIFICIL
+
+    azar = random.Random(36)
+    for _ in range(10):
+        nivel, solucion = generador.generar_celdas(6, 6, azar)
+        assert dificultad.calificar_celdas(nivel, 6, 6, solucion) == dificultad.calificar_celdas(nivel, 6, 6)
+    with contextlib.suppress(ValueError):
+        dificultad.calificar(["111 ", "    ", "    ", "    "])
+        raise AssertionError("Se calificó un nivel sin solución")
+
+    franjas = {}
+    for numero, desc in enumerate(niveles.NIVELES):
+        franjas.setdefault(dificultad.calificar(desc).franja, []).append(numero)
+    ruta_paquete = juego.RUTA_PAQUETE
+    with tempfile.TemporaryDirectory() as carpeta:
+        juego.RUTA_PAQUETE = os.path.join(carpeta, "no_existe.bin")
+        try:
+            for franja, numeros in franjas.items():
+                for _ in range(5):
+                    numero, nivel = juego.elegir_nivel(franja)
+                    assert numero in numeros and nivel == niveles.NIVELES[numero]
+        finally:
+            juego.RUTA_PAQUETE = ruta_paquete
+
+
+def test_37_indice_de_niveles():
+    """Arma el índice de un paquete, le agrega niveles y se asegura que
+    `actualizar` sólo califique los nuevos, que guardar y cargar el índice no
+    lo cambie, y que cada nivel elegido sea del tamaño y la franja pedidos."""
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_paquete = os.path.join(carpeta, "niveles.bin")
+        ruta_indice = os.path.join(carpeta, "niveles.idx")
+        mitad = len(niveles.NIVELES) // 2
+        paquete_niveles.escribir_paquete(ruta_paquete, niveles.NIVELES[:mitad])
+        indice = indice_niveles.indexar(ruta_paquete, ruta_indice)
+        assert len(indice) == mitad
+
+        azar = random.Random(37)
+        nuevos = [generador.generar_nivel(6, 6, azar) for _ in range(10)]
+        agregados = niveles.NIVELES[mitad:] + nuevos
+        paquete_niveles.agregar_al_paquete(ruta_paquete, agregados)
+        with paquete_niveles.PaqueteNiveles(ruta_paquete) as paquete:
+            assert indice.actualizar(paquete) == len(agregados)
+            assert indice.actualizar(paquete) == 0
+            for (ancho, alto, franja), numeros in indice.cubetas.items():
+                for numero in numeros:
+                    nivel = paquete.nivel(ancho, alto, numero)
+                    assert dificultad.calificar(nivel).franja == franja
+                    assert paquete.nivel_por_indice(paquete.indice_de(ancho, alto, numero)) == nivel
+        assert len(indice) == len(niveles.NIVELES) + len(nuevos)
+        assert sorted(
+            dificultad.calificar(desc).franja for desc in niveles.NIVELES + nuevos
+        ) == sorted(franja for (_, _, franja), numeros in indice.cubetas.items() for _ in numeros)
+
+        indice.guardar(ruta_indice)
+        cargado = indice_niveles.IndiceNiveles.cargar(ruta_indice)
+        assert cargado.cubetas == indice.cubetas and cargado.vistos == indice.vistos
+        assert indice_niveles.indexar(ruta_paquete, ruta_indice).cubetas == indice.cubetas
+
+        for (ancho, alto, franja), numeros in indice.cubetas.items():
+            assert indice.cantidad(ancho, alto, franja) == len(numeros)
+            for _ in range(5):
+                assert indice.elegir(azar, ancho, alto, franja) in [(ancho, alto, numero) for numero in numeros]
+                elegido_ancho, _, _ = indice.elegir(azar, franja=franja)
+                assert indice.cantidad(elegido_ancho, None, franja)
+        assert indice.elegir(azar, 3, 3) is None
+        assert indice.cantidad() == len(indice)
+
+        # Un paquete rehecho con menos niveles, o con la misma cantidad de
+        # niveles pero otros, se vuelve a indexar
+        paquete_niveles.escribir_paquete(ruta_paquete, nuevos[:3])
+        indice = indice_niveles.indexar(ruta_paquete, ruta_indice)
+        assert indice.vistos == {(6, 6): 3} and len(indice) == 3
+        distintos = nuevos[3:6]
+        paquete_niveles.escribir_paquete(ruta_paquete, distintos)
+        with paquete_niveles.PaqueteNiveles(ruta_paquete) as paquete:
+            assert not indice.al_dia(paquete)
+        indice = indice_niveles.indexar(ruta_paquete, ruta_indice)
+        esperado = indice_niveles.IndiceNiveles()
+        for desc in distintos:
+            esperado.agregar(desc)
+        assert indice.cubetas == esperado.cubetas
+
+        # Agregar niveles con `agregar_niveles` deja el índice al día
+        indice = indice_niveles.agregar_niveles(ruta_paquete, nuevos[6:], ruta_indice)
+        with paquete_niveles.PaqueteNiveles(ruta_paquete) as paquete:
+            assert indice.al_dia(paquete) and len(paquete) == 7
+            assert indice_niveles.IndiceNiveles.cargar(ruta_indice).al_dia(paquete)
+            # `al_dia` sólo compara la huella del encabezado, sin leer niveles
+            paquete.trozos = None
+            assert indice.al_dia(paquete) and indice.huella_paquete == paquete.huella
+        assert sorted(os.listdir(carpeta)) == ["niveles.bin", "niveles.idx"]
+
+        ruta = juego.RUTA_PAQUETE, juego.RUTA_INDICE
+        juego.RUTA_PAQUETE, juego.RUTA_INDICE = ruta_paquete, ruta_indice
+        try:
+            numero, nivel = juego.elegir_nivel(medidas=(6, 6))
+            assert nivel in nuevos[3:] and juego.nivel_numero(numero) == nivel
+            # Elegir no arma el índice: si no está al día, no se lo usa
+            paquete_niveles.escribir_paquete(ruta_paquete, nuevos[:7])
+            assert juego.indice_de_niveles() is None
+            with open(ruta_indice, "wb") as archivo:
+                archivo.write(b"no es un indice")
+            assert juego.indice_de_niveles() is None
+            with contextlib.suppress(ValueError):
+                indice_niveles.IndiceNiveles.cargar(ruta_indice)
+                raise AssertionError("Se cargó un archivo que no es un índice")
+        finally:
+            juego.RUTA_PAQUETE, juego.RUTA_INDICE = ruta
+
+    # Las medidas de la línea de comandos se validan al leerlas
+    assert juego.medidas("8x6") == (8, 6) and juego.medidas("10X10") == (10, 10)
+    for invalidas in ("8", "8x", "8x8x8", "ax8", "0x8", "-1x8"):
+        with contextlib.suppress(argparse.ArgumentTypeError):
+            juego.medidas(invalidas)
+            raise AssertionError(f"Se aceptaron las medidas {invalidas!r}")
+
+
 # Sólo se van a correr aquellos tests que estén mencionados dentro de la
 # siguiente constante
 TESTS = (
@@ -430,6 +1532,30 @@ TESTS = (
     test_11_grillas_correctamente_terminadas,
     test_12_grillas_incompletas_o_mal_terminadas,
     test_13_colocar_y_terminar_una_grilla,
+    test_14_grilla_incremental,
+    test_15_grilla_bits,
+    test_16_validacion_en_lote,
+    test_17_resolver_niveles,
+    test_18_tablas_de_lineas_validas,
+    test_19_contar_soluciones,
+    test_20_generar_niveles,
+    test_21_paquete_de_niveles,
+    test_22_grilla_terminada_por_filas,
+    test_23_violaciones,
+    test_24_crear_grilla_desde_texto_bytes_y_archivos,
+    test_25_grilla_con_columnas,
+    test_26_pistas,
+    test_27_deteccion_de_callejones_sin_salida,
+    test_28_historial_de_jugadas,
+    test_29_guardar_y_cargar_partidas,
+    test_30_jugadas_sin_interfaz,
+    test_31_servidor,
+    test_32_almacen_de_sesiones,
+    test_33_resolvedor_paralelo,
+    test_34_cache_de_resultados,
+    test_35_deduplicar_grillas_equivalentes,
+    test_36_dificultad,
+    test_37_indice_de_niveles,
 )
 
 # El código que viene abajo tiene algunas *magias* para simplificar la corrida
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Validación de muchas grillas de Unruly a la vez usando NumPy.
+
+Las grillas se representan como un arreglo `int8` de forma (K, alto, ancho),
+donde cada casillero vale 1, 0 o -1 (vacío). Todas las grillas del lote deben
+tener las mismas dimensiones."""
+from typing import List, Tuple, Union
+
+import numpy as np
+
+import unruly
+
+VACIO = -1
+
+
+def grillas_a_arreglo(descs: List[List[str]]) -> np.ndarray:
+    """Convierte una lista de descripciones (en el formato que recibe
+    `unruly.crear_grilla`) en un arreglo `int8` de forma (K, alto, ancho)."""
+    texto = "".join("".join(desc) for desc in descs).encode("ascii")
+    alto = len(descs[0])
+    ancho = len(descs[0][0])
+    celdas = np.frombuffer(texto, dtype=np.uint8).reshape(len(descs), alto, ancho)
+    arreglo = np.full(celdas.shape, VACIO, dtype=np.int8)
+    arreglo[celdas == ord(unruly.UNO)] = 1
+    arreglo[celdas == ord(unruly.CERO)] = 0
+    return arreglo
+
+
+def lineas_validas(lineas: np.ndarray) -> np.ndarray:
+    """Equivalente vectorizado de `unruly.es_valida`: recibe un arreglo cuyo
+    último eje recorre los casilleros de cada línea y devuelve un arreglo
+    booleano con una posición menos, indicando qué líneas son válidas."""
+    largo = lineas.shape[-1]
+    sin_vacios = (lineas != VACIO).all(axis=-1)
+    balanceadas = (lineas == 1).sum(axis=-1, dtype=np.int32) * 2 == largo
+    ternas = (lineas[..., :-2] == lineas[..., 1:-1]) & (
+        lineas[..., 1:-1] == lineas[..., 2:]
+    )
+    return sin_vacios & balanceadas & ~ternas.any(axis=-1)
+
+
+def grillas_terminadas(
+    grillas: np.ndarray, mascaras: bool = False
+) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Equivalente vectorizado de `unruly.grilla_terminada` para un lote de
+    grillas de forma (K, alto, ancho).
+
+    Devuelve un arreglo booleano de K posiciones. Si `mascaras` es True,
+    devuelve además las máscaras de filas válidas (K, alto) y de columnas
+    válidas (K, ancho)."""
+    filas = lineas_validas(grillas)
+    columnas = lineas_validas(np.swapaxes(grillas, 1, 2))
+    terminadas = filas.all(axis=1) & columnas.all(axis=1)
+    if mascaras:
+        return terminadas, filas, columnas
+    return terminadas
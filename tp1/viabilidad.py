@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Detección temprana de grillas que ya no se pueden completar.
+
+Un `MotorViabilidad` guarda, para cada línea, si por sí sola ya no tiene
+solución. Después de cada cambio vuelve a analizar sólo la fila y la columna
+del casillero cambiado, y propaga las deducciones de `resolvedor` a partir
+de ellas buscando una contradicción. La propagación se corta luego de
+analizar PROPAGACION_MAXIMA casilleros para que el chequeo siga siendo
+barato en grillas grandes: lo que informa siempre es cierto, pero puede no
+darse cuenta de algunas grillas sin solución hasta unas jugadas después."""
+import weakref
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import resolvedor
+import unruly
+from resolvedor import LIBRE
+from unruly import Grilla
+
+CUOTA = resolvedor.CUOTA
+TERNA = resolvedor.TERNA
+SIN_LINEA = "sin_linea"
+CONTRADICCION = "contradiccion"
+DESCRIPCION_MOTIVOS = {
+    CUOTA: "tiene más de la mitad de unos o de ceros",
+    TERNA: "tiene tres casilleros consecutivos iguales",
+    SIN_LINEA: "no se puede completar de ninguna forma válida",
+    CONTRADICCION: "las deducciones a partir de la última jugada llevan a una contradicción",
+}
+# Cantidad máxima de casilleros que se analizan al propagar en cada chequeo
+# (alcanza para propagar por toda una grilla de 30x30)
+PROPAGACION_MAXIMA = 2048
+
+
+class Callejon(NamedTuple):
+    """Motivo por el que la grilla ya no tiene solución, y la fila o la
+    columna (la otra queda en None) donde se lo encontró."""
+    motivo: str
+    fil: Optional[int]
+    col: Optional[int]
+
+
+def motivo_de_linea(valores: Tuple[int, ...]) -> Optional[str]:
+    """Devuelve por qué la línea (con valores 1, 0 o LIBRE) ya no se puede
+    completar, o None si todavía se puede."""
+    contradiccion = resolvedor.reglas_de_linea(valores).contradiccion
+    if contradiccion in (CUOTA, TERNA):
+        return contradiccion
+    if contradiccion is not None or LIBRE in valores and not resolvedor.linea_completable(valores):
+        return SIN_LINEA
+    return None
+
+
+class MotorViabilidad:
+    """Sigue los cambios de una grilla e informa si ya no tiene solución.
+
+    Como `pistas.MotorPistas`, hay que avisarle cada cambio con
+    `avisar_cambio`, o crearlo con `MotorViabilidad.de_grilla` para una
+    `unruly.GrillaIncremental`."""
+
+    def __init__(self, grilla: Grilla):
+        self.celdas, self.ancho, self.alto = resolvedor.celdas_desde_grilla(grilla)
+        self.lineas, self.lineas_de_celda = resolvedor.geometria(self.ancho, self.alto)
+        self.pendientes = set(range(self.alto + self.ancho))
+        self.sin_solucion: Dict[int, str] = {}
+        # Líneas analizadas que todavía no se propagaron, porque había otra
+        # línea sin solución
+        self.por_propagar = set()
+        # Líneas desde las que se llegó a la última contradicción; se vuelven
+        # a propagar mientras no haya otra explicación
+        self.origen_contradiccion = set()
+
+    @classmethod
+    def de_grilla(cls, grilla: unruly.GrillaIncremental) -> "MotorViabilidad":
+        """Crea un motor que se entera solo de los cambios de `grilla`."""
+        motor = cls(grilla)
+        grilla.observadores.append(motor.avisar_cambio)
+        return motor
+
+    def avisar_cambio(self, col: int, fil: int, _anterior: str, valor: str):
+        """Registra que en (col, fil) ahora está `valor` y deja pendientes la
+        fila y la columna del casillero."""
+        self.celdas[fil * self.ancho + col] = resolvedor.VALORES[valor]
+        self.pendientes.add(fil)
+        self.pendientes.add(self.alto + col)
+
+    def _callejon(self, motivo: str, linea: int) -> Callejon:
+        if linea < self.alto:
+            return Callejon(motivo, linea, None)
+        return Callejon(motivo, None, linea - self.alto)
+
+    def _propagar(self, pendientes: set) -> Optional[int]:
+        """Propaga las deducciones a partir de las líneas pendientes sin
+        modificar la grilla y devuelve la línea donde aparece una
+        contradicción, o None si no aparece ninguna.
+
+        Los casilleros deducidos se guardan aparte, por línea y posición, y
+        se aplican sobre una copia de cada línea que se analiza."""
+        celdas, ancho, alto = self.celdas, self.ancho, self.alto
+        deducidas: Dict[int, Dict[int, int]] = {}
+        analizados = 0
+        while pendientes and analizados < PROPAGACION_MAXIMA:
+            linea = pendientes.pop()
+            indices = self.lineas[linea]
+            analizados += len(indices)
+            valores = [celdas[i] for i in indices]
+            for posicion, valor in deducidas.get(linea, {}).items():
+                valores[posicion] = valor
+            forzados = resolvedor.deducir_linea(valores, range(len(valores)))
+            if forzados is None:
+                return linea
+            for posicion, valor in forzados.items():
+                if valores[posicion] == LIBRE:
+                    fil, col = divmod(indices[posicion], ancho)
+                    deducidas.setdefault(fil, {})[col] = valor
+                    deducidas.setdefault(alto + col, {})[fil] = valor
+                    pendientes.add(fil)
+                    pendientes.add(alto + col)
+                elif valores[posicion] != valor:
+                    return linea
+        return None
+
+    def revisar(self) -> Optional[Callejon]:
+        """Devuelve por qué la grilla ya no se puede completar, o None si no
+        se encontró ningún motivo."""
+        celdas = self.celdas
+        for linea in self.pendientes:
+            motivo = motivo_de_linea(tuple([celdas[i] for i in self.lineas[linea]]))
+            if motivo is None:
+                self.sin_solucion.pop(linea, None)
+            else:
+                self.sin_solucion[linea] = motivo
+        self.por_propagar |= self.pendientes
+        self.pendientes = set()
+        if self.sin_solucion:
+            linea, motivo = next(iter(self.sin_solucion.items()))
+            return self._callejon(motivo, linea)
+        origen = self.por_propagar | self.origen_contradiccion
+        self.por_propagar = set()
+        linea = self._propagar(set(origen))
+        if linea is None:
+            self.origen_contradiccion = set()
+            return None
+        self.origen_contradiccion = origen
+        return self._callejon(CONTRADICCION, linea)
+
+
+_MOTORES = weakref.WeakKeyDictionary()
+
+
+def sin_salida(grilla: Grilla) -> Optional[Callejon]:
+    """Devuelve por qué la grilla ya no se puede completar (ver `Callejon`),
+    o None si no se encontró ningún motivo.
+
+    Como `pistas.pista`, para una `unruly.GrillaIncremental` se usa un motor
+    asociado a la grilla que sólo vuelve a analizar las líneas cambiadas
+    desde la llamada anterior; para las demás se analiza toda la grilla."""
+    if not isinstance(grilla, unruly.GrillaIncremental):
+        return MotorViabilidad(grilla).revisar()
+    motor = _MOTORES.get(grilla)
+    if motor is None:
+        motor = _MOTORES[grilla] = MotorViabilidad.de_grilla(grilla)
+    return motor.revisar()